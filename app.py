@@ -9,11 +9,12 @@ import json
 # Import our modules
 from backend.models import db, Certificate, Institution, VerificationLog, Admin
 try:
-    from backend.ocr_utils import process_certificate_file
+    from backend.ocr_utils import process_certificate_file, OCR_ENGINE_VERSION
     OCR_AVAILABLE = True
 except ImportError as e:
     print(f"Warning: OCR functionality not available: {e}")
     OCR_AVAILABLE = False
+    OCR_ENGINE_VERSION = 'unavailable'
     def process_certificate_file(filepath, file_type):
         return {
             'extracted_text': 'OCR not available - please install tesseract',
@@ -27,6 +28,7 @@ except ImportError as e:
         }
 
 from backend.validation import validate_certificate_data
+from backend.ocr_cache import OCRResultCache
 
 app = Flask(__name__)
 
@@ -39,12 +41,23 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# OCR result cache (in-memory LRU in front of an on-disk store)
+app.config['OCR_CACHE_DIR'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'ocr')
+app.config['OCR_CACHE_MEMORY_ITEMS'] = 256
+app.config['OCR_CACHE_MAX_BYTES'] = 256 * 1024 * 1024  # 256MB on disk
+
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf', 'tiff', 'bmp'}
 
 # Initialize database
 db.init_app(app)
 
+ocr_cache = OCRResultCache(
+    app.config['OCR_CACHE_DIR'],
+    max_memory_items=app.config['OCR_CACHE_MEMORY_ITEMS'],
+    max_disk_bytes=app.config['OCR_CACHE_MAX_BYTES']
+)
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -159,8 +172,18 @@ def verify_certificate():
         # Determine file type
         file_ext = filename.rsplit('.', 1)[1].lower()
         
-        # Process the certificate using OCR
-        ocr_result = process_certificate_file(filepath, file_ext)
+        # Reuse the OCR result of an identical earlier upload when we have one
+        cache_key = ocr_cache.make_key(file_hash, OCR_ENGINE_VERSION)
+        ocr_result = ocr_cache.get(cache_key)
+        cache_hit = ocr_result is not None
+        
+        if not cache_hit:
+            # Process the certificate using OCR
+            ocr_result = process_certificate_file(filepath, file_ext)
+            
+            # Failed or unavailable OCR is not worth remembering
+            if OCR_AVAILABLE and ocr_result.get('confidence_score', 0) > 0:
+                ocr_cache.set(cache_key, ocr_result)
         
         # Validate the certificate
         validation_result = validate_certificate_data(
@@ -178,6 +201,7 @@ def verify_certificate():
             'ocr_confidence': ocr_result['confidence_score'],
             'extracted_details': ocr_result['parsed_details'],
             'validation_result': validation_result,
+            'cache_hit': cache_hit,
             'timestamp': datetime.now().isoformat()
         }
         
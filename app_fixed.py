@@ -1,40 +1,84 @@
-from flask import Flask, request, jsonify, render_template, redirect, url_for
+from flask import Flask, Request, Response, request, jsonify, render_template, redirect, url_for, stream_with_context
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import RequestEntityTooLarge
 import os
 import hashlib
-from datetime import datetime, date
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, date, timedelta
 import json
+import math
+import time
 
 # Import our modules
 from backend.models import db, Certificate, Institution, VerificationLog, Admin
-try:
-    from backend.enhanced_ocr import process_certificate_file_enhanced as process_certificate_file
-    OCR_AVAILABLE = True
-    print("✅ Enhanced OCR loaded successfully!")
-except ImportError as e:
-    print(f"Warning: Enhanced OCR not available, falling back to basic: {e}")
-    try:
-        from backend.ocr_utils import process_certificate_file
-        OCR_AVAILABLE = True
-    except ImportError:
-        print(f"Warning: No OCR functionality available: {e}")
-        OCR_AVAILABLE = False
-        def process_certificate_file(filepath, file_type):
-            return {
-                'extracted_text': 'OCR not available - please install tesseract',
-                'parsed_details': {
-                    'student_name': None,
-                    'certificate_number': None,
-                    'institution_name': 'Manual entry required',
-                    'graduation_year': None
-                },
-                'confidence_score': 0.0
-            }
-
-from backend.validation import validate_certificate_data
+from backend.validation import validate_certificate_data, prepare_certificate_search
+from backend.ocr_cache import OCRResultCache
+from backend.admission import AdmissionController, OverloadedError
+from backend.quality_tiers import QualityTierSelector, FAST, FULL
+from backend.deadline import Deadline
+from backend.engine_registry import warm_engines, warmup_enabled
+from backend.ocr_loader import LazyOCR
+from backend.job_queue import JobQueue
+from backend.job_worker import JobWorkerPool, work
+from backend.upload_store import UploadStore, UploadGarbageCollector, record_upload
+
+# The OCR stack is imported on the first verification, not at start-up
+ocr_loader = LazyOCR()
+
+def process_certificate_file(filepath, file_type, progress=None, quality=FULL, deadline=None):
+    return ocr_loader.process_certificate_file(filepath, file_type, progress, quality, deadline)
+
+class HashingUploadFile:
+    """Temporary file for one multipart upload that hashes everything written to it
+    
+    Werkzeug's form parser writes each uploaded file into the stream returned by
+    Request._get_file_stream. Using this class there means the SHA-256 is known
+    as soon as parsing ends, and storing the upload is a rename, not a copy.
+    """
+    
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=directory, prefix='.incoming-', suffix='.part')
+        self._file = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+    
+    def write(self, data):
+        self._hash.update(data)
+        return self._file.write(data)
+    
+    def hexdigest(self):
+        return self._hash.hexdigest()
+    
+    def discard(self):
+        """Delete the file unless it has been moved into place"""
+        self._file.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+    
+    def __getattr__(self, name):
+        # read, seek, tell, close, ... come from the underlying file
+        return getattr(self._file, name)
+
+class UploadRequest(Request):
+    """Request that hashes uploads while they are parsed and allows larger batch uploads"""
+    
+    @property
+    def max_content_length(self):
+        if self.endpoint == 'verify_batch':
+            return app.config['BATCH_MAX_CONTENT_LENGTH']
+        return super().max_content_length
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        upload = HashingUploadFile(app.config['UPLOAD_FOLDER'])
+        if not hasattr(self, 'upload_files'):
+            self.upload_files = []
+        self.upload_files.append(upload)
+        return upload
 
 app = Flask(__name__)
+app.request_class = UploadRequest
 
 # Configuration
 app.config['SECRET_KEY'] = 'your-secret-key-here'  # Change this in production
@@ -46,23 +90,133 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# OCR result cache (in-memory LRU in front of an on-disk store)
+app.config['OCR_CACHE_DIR'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'ocr')
+app.config['OCR_CACHE_MEMORY_ITEMS'] = 256
+app.config['OCR_CACHE_MAX_BYTES'] = 256 * 1024 * 1024  # 256MB on disk
+
+# Admission control for OCR in this process: at most OCR_MAX_CONCURRENT runs at once,
+# up to OCR_ADMISSION_QUEUE waiting; uploads that would wait longer than
+# OCR_ADMISSION_MAX_WAIT seconds are answered 503 with Retry-After
+app.config['OCR_MAX_CONCURRENT'] = int(os.environ.get('OCR_MAX_CONCURRENT', max(1, (os.cpu_count() or 1) // 2)))
+app.config['OCR_ADMISSION_QUEUE'] = int(os.environ.get('OCR_ADMISSION_QUEUE', 16))
+app.config['OCR_ADMISSION_MAX_WAIT'] = float(os.environ.get('OCR_ADMISSION_MAX_WAIT', 30))
+
+# OCR quality tiers: with OCR_FAST_TIER_BACKLOG or more uploads waiting, OCR only the
+# best preprocessing variant, re-running in full below OCR_ESCALATE_BELOW confidence
+app.config['OCR_FAST_TIER_BACKLOG'] = int(os.environ.get('OCR_FAST_TIER_BACKLOG', 2))  # 0 disables the fast tier
+app.config['OCR_ESCALATE_BELOW'] = float(os.environ.get('OCR_ESCALATE_BELOW', 60))
+
+# Time budget for the OCR of one upload; recognition still running after it is
+# killed and the best result so far is returned, flagged partial
+app.config['OCR_DEADLINE_SECONDS'] = float(os.environ.get('OCR_DEADLINE_SECONDS', 60))
+
+# Batch verification (POST /api/verify/batch)
+app.config['BATCH_MAX_CONTENT_LENGTH'] = 512 * 1024 * 1024  # 512MB per batch request
+app.config['BATCH_CONCURRENCY'] = min(4, os.cpu_count() or 1)  # certificates verified at once
+
+# Queue for asynchronous verifications (POST /api/verify?async=1)
+app.config['JOB_QUEUE_PATH'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database', 'jobs.db')
+app.config['JOB_EVENTS_POLL_INTERVAL'] = 0.25  # seconds between progress checks of an event stream
+app.config['JOB_EVENTS_KEEPALIVE'] = 15  # seconds of silence before an event stream sends a comment
+
+# Uploads are copied (and hashed) in chunks of this size
+app.config['UPLOAD_CHUNK_SIZE'] = 1024 * 1024  # 1MB
+
+# Retention of stored uploads (uploads/ab/cd/<sha256>), applied by a background job
+app.config['UPLOAD_MAX_BYTES'] = 2 * 1024 * 1024 * 1024  # 2GB on disk
+app.config['UPLOAD_MAX_AGE_DAYS'] = 90  # since the file was last uploaded
+app.config['UPLOAD_GC_INTERVAL'] = 3600  # seconds between runs
+
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'pdf', 'tiff', 'bmp'}
 
 # Initialize database
 db.init_app(app)
 
+ocr_cache = OCRResultCache(
+    app.config['OCR_CACHE_DIR'],
+    max_memory_items=app.config['OCR_CACHE_MEMORY_ITEMS'],
+    max_disk_bytes=app.config['OCR_CACHE_MAX_BYTES']
+)
+
+job_queue = JobQueue(app.config['JOB_QUEUE_PATH'])
+
+ocr_admission = AdmissionController(
+    app.config['OCR_MAX_CONCURRENT'],
+    max_queue=app.config['OCR_ADMISSION_QUEUE'],
+    max_wait=app.config['OCR_ADMISSION_MAX_WAIT']
+)
+
+def ocr_backlog():
+    """Uploads waiting for OCR: this process's admission queue plus queued jobs"""
+    return ocr_admission.queue_depth + job_queue.depth()
+
+quality_tiers = QualityTierSelector(
+    ocr_backlog,
+    fast_at_backlog=app.config['OCR_FAST_TIER_BACKLOG'],
+    escalate_below=app.config['OCR_ESCALATE_BELOW']
+)
+
+upload_store = UploadStore(app.config['UPLOAD_FOLDER'])
+
+# Shared by all batch requests so concurrent batches cannot oversubscribe the OCR engines
+batch_executor = ThreadPoolExecutor(max_workers=app.config['BATCH_CONCURRENCY'],
+                                    thread_name_prefix='verify-batch')
+
 def allowed_file(filename):
     """Check if file extension is allowed"""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def calculate_file_hash(filepath):
-    """Calculate SHA-256 hash of uploaded file"""
+def receive_upload(stream, max_bytes=None):
+    """Get an upload into a temporary file in UPLOAD_FOLDER along with its SHA-256
+    
+    Returns (temp_path, sha256); store_upload() moves the file into place once
+    we know it is new. Request uploads were already hashed while being parsed;
+    other streams (such as ZIP members) are copied and hashed in a single pass.
+    Raises RequestEntityTooLarge if the stream exceeds max_bytes.
+    """
+    if isinstance(stream, HashingUploadFile):
+        stream.close()
+        # Batch requests may be far larger than one file, so the parser's limit is not enough
+        if max_bytes is not None and os.path.getsize(stream.path) > max_bytes:
+            stream.discard()
+            raise RequestEntityTooLarge()
+        return stream.path, stream.hexdigest()
+    
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=app.config['UPLOAD_FOLDER'], prefix='.incoming-', suffix='.part')
+    
     hash_sha256 = hashlib.sha256()
-    with open(filepath, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_sha256.update(chunk)
-    return hash_sha256.hexdigest()
+    chunk_size = app.config['UPLOAD_CHUNK_SIZE']
+    written = 0
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: stream.read(chunk_size), b''):
+                written += len(chunk)
+                if max_bytes is not None and written > max_bytes:
+                    raise RequestEntityTooLarge()
+                hash_sha256.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    
+    return temp_path, hash_sha256.hexdigest()
+
+def store_upload(temp_path, file_hash, filename, prefix=''):
+    """Move a received upload into the content-addressed store and index it
+    
+    Identical content is kept once, however often it is uploaded. Returns
+    (filepath, unique_filename); the unique filename is what verification logs
+    record, and resolve_upload() maps it back to the file.
+    """
+    size_bytes = os.path.getsize(temp_path)
+    filepath, _ = upload_store.put(temp_path, file_hash)
+    
+    unique_filename = datetime.now().strftime('%Y%m%d_%H%M%S_') + prefix + filename
+    record_upload(file_hash, unique_filename, filename, size_bytes)
+    return filepath, unique_filename
 
 def get_client_ip():
     """Get client IP address"""
@@ -81,6 +235,206 @@ class DateTimeEncoder(json.JSONEncoder):
 
 app.json_encoder = DateTimeEncoder
 
+def report_progress(progress, event, data):
+    if progress:
+        progress(event, data)
+
+def run_verification(filepath, filename, unique_filename, file_hash, file_ext, client_ip, progress=None,
+                     admission_wait=None):
+    """OCR (or reuse a cached result for) a saved upload and validate it
+    
+    progress, if given, is called as progress(event, data) at every stage:
+    'cache', the OCR events ('ocr_variant', 'partial', 'parsed') and 'matched'.
+    OCR runs once ocr_admission grants a slot; admission_wait overrides how long
+    to wait for one (math.inf never gives up), and OverloadedError is raised
+    when it cannot be had in time. quality_tiers then picks the full or the
+    fast OCR path from the backlog at that moment, and OCR_DEADLINE_SECONDS
+    bounds the OCR from then on (results cut short are flagged 'partial').
+    """
+    
+    # Reuse the OCR result of an identical earlier upload when we have one
+    ocr_loader.load()
+    cache_key = ocr_cache.make_key(file_hash, ocr_loader.engine_version)
+    ocr_result = ocr_cache.get(cache_key)
+    cache_hit = ocr_result is not None
+    report_progress(progress, 'cache', {'hit': cache_hit})
+    
+    if not cache_hit:
+        # Process the certificate using OCR
+        with ocr_admission.slot(admission_wait):
+            # The budget starts once OCR may run, so time spent queued does not eat into it
+            deadline = Deadline(app.config['OCR_DEADLINE_SECONDS'])
+            tier = quality_tiers.choose()
+            report_progress(progress, 'tier', {'tier': tier})
+            ocr_result = process_certificate_file(filepath, file_ext, progress, tier, deadline)
+            
+            # A weak fast-path result is not returned; the upload gets the full sweep
+            # with whatever budget is left
+            if tier == FAST and not ocr_result.get('partial') and quality_tiers.should_escalate(ocr_result):
+                report_progress(progress, 'escalated', {'confidence_score': ocr_result['confidence_score']})
+                full_result = process_certificate_file(filepath, file_ext, progress, FULL, deadline)
+                if not full_result.get('partial') or full_result['confidence_score'] > ocr_result['confidence_score']:
+                    ocr_result = dict(full_result, escalated=True)
+                    tier = FULL
+            ocr_result['quality_tier'] = tier
+        
+        if ocr_result.get('partial'):
+            report_progress(progress, 'deadline_exceeded', {'seconds': deadline.seconds})
+        
+        # Failed, unavailable or cut-short OCR is not worth remembering, and neither is
+        # the fast tier: the key has no tier, so it would stand in for a full sweep for good
+        if (ocr_loader.available and ocr_result.get('confidence_score', 0) > 0
+                and not ocr_result.get('partial') and ocr_result['quality_tier'] == FULL):
+            ocr_cache.set(cache_key, ocr_result)
+    else:
+        report_progress(progress, 'parsed', {
+            'details': ocr_result['parsed_details'],
+            'confidence_score': ocr_result['confidence_score']
+        })
+    
+    # Validate the certificate
+    validation_result = validate_certificate_data(
+        ocr_result['parsed_details'], 
+        file_hash, 
+        unique_filename, 
+        client_ip
+    )
+    report_progress(progress, 'matched', {
+        'status': validation_result['status'],
+        'confidence_score': validation_result['confidence_score']
+    })
+    
+    # Combine results
+    response = {
+        'success': True,
+        'filename': filename,
+        'file_hash': file_hash,
+        'ocr_confidence': ocr_result['confidence_score'],
+        'extracted_details': ocr_result['parsed_details'],
+        'validation_result': validation_result,
+        'cache_hit': cache_hit,
+        'quality_tier': ocr_result.get('quality_tier'),
+        'partial': ocr_result.get('partial', False),
+        'timestamp': datetime.now().isoformat()
+    }
+    
+    return response
+
+def iter_batch_uploads():
+    """Yield (filename, stream) for every uploaded file, expanding ZIP archives
+    
+    Streams are read lazily: Werkzeug spools large uploads to disk and ZIP members
+    are decompressed one at a time, so a batch never has to fit in memory. A
+    stream of None marks an archive that could not be read.
+    """
+    uploads = request.files.getlist('certificates') + request.files.getlist('certificate')
+    
+    for file in uploads:
+        if not file.filename:
+            continue
+        
+        if not file.filename.lower().endswith('.zip'):
+            yield file.filename, file.stream
+            continue
+        
+        try:
+            with zipfile.ZipFile(file.stream) as archive:
+                for member in archive.infolist():
+                    name = os.path.basename(member.filename)
+                    # Skip folders and OS metadata such as __MACOSX/._name and .DS_Store
+                    if member.is_dir() or not name or name.startswith('.') or '__MACOSX' in member.filename:
+                        continue
+                    with archive.open(member) as stream:
+                        yield name, stream
+        except zipfile.BadZipFile:
+            yield file.filename, None
+
+def save_batch_item(index, name, stream, client_ip):
+    """Store one batch file; returns its verification payload, or an error line"""
+    filename = secure_filename(name)
+    
+    if stream is None:
+        return {'success': False, 'index': index, 'filename': name, 'error': 'Not a valid ZIP archive'}
+    
+    if not filename or not allowed_file(filename):
+        return {
+            'success': False,
+            'index': index,
+            'filename': name,
+            'error': f'File type not allowed. Supported types: {ALLOWED_EXTENSIONS}'
+        }
+    
+    # ZIP members are checked as they are inflated, so an archive bomb stops at the limit
+    try:
+        temp_path, file_hash = receive_upload(stream, max_bytes=app.config['MAX_CONTENT_LENGTH'])
+    except RequestEntityTooLarge:
+        return {'success': False, 'index': index, 'filename': filename, 'error': 'File too large. Maximum size is 16MB.'}
+    
+    filepath, unique_filename = store_upload(temp_path, file_hash, filename, prefix=f"{index}_")
+    
+    return {
+        'filepath': filepath,
+        'filename': filename,
+        'unique_filename': unique_filename,
+        'file_hash': file_hash,
+        'file_ext': filename.rsplit('.', 1)[1].lower(),
+        'client_ip': client_ip
+    }
+
+def run_batch_item(index, payload):
+    """Verify one stored batch file; failures become an error line for that file only"""
+    try:
+        with app.app_context():
+            # Batches are already bounded by BATCH_CONCURRENCY: wait for OCR rather than fail
+            return dict(run_verification(admission_wait=math.inf, **payload), index=index)
+    except Exception as e:
+        app.logger.error(f'Batch verification error for {payload["filename"]}: {str(e)}')
+        return {
+            'success': False,
+            'index': index,
+            'filename': payload['filename'],
+            'error': 'An error occurred during verification. Please try again.'
+        }
+
+def process_verification_job(payload, progress=None):
+    """Run one queued verification inside an application context"""
+    with app.app_context():
+        # Queued jobs have already waited their turn; they are never turned away
+        return run_verification(progress=progress, admission_wait=math.inf, **payload)
+
+def run_job_worker(stop_event=None):
+    """Entry point of an OCR worker process: drain the verification queue"""
+    print(f"👷 OCR job worker {os.getpid()} started")
+    if warmup_enabled() and ocr_loader.load():
+        warm_engines()
+    work(job_queue, process_verification_job, stop_event)
+
+def start_upload_gc():
+    """Start the background retention job for stored uploads"""
+    collector = UploadGarbageCollector(
+        app, upload_store, app.config['UPLOAD_GC_INTERVAL'],
+        max_bytes=app.config['UPLOAD_MAX_BYTES'],
+        max_age=timedelta(days=app.config['UPLOAD_MAX_AGE_DAYS'])
+    )
+    collector.start()
+    return collector
+
+def start_job_workers():
+    """Start the OCR worker processes for queued jobs (OCR_JOB_WORKERS, default 1)"""
+    count = int(os.environ.get('OCR_JOB_WORKERS', 1))
+    if count <= 0:
+        return None
+    
+    pool = JobWorkerPool(run_job_worker, count)
+    pool.start()
+    return pool
+
+@app.teardown_request
+def discard_unused_uploads(exc):
+    """Remove parsed uploads that were rejected instead of stored"""
+    for upload in getattr(request, 'upload_files', ()):
+        upload.discard()
+
 # Routes
 
 @app.route('/')
@@ -169,44 +523,36 @@ def verify_certificate():
                 'error': f'File type not allowed. Supported types: {ALLOWED_EXTENSIONS}'
             }), 400
         
-        # Save uploaded file
+        # Save the upload, hashing it as it is written; identical content
+        # that was already processed is not stored a second time
         filename = secure_filename(file.filename)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-        unique_filename = timestamp + filename
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], unique_filename)
-        
-        # Ensure upload directory exists
-        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-        
-        file.save(filepath)
-        
-        # Calculate file hash
-        file_hash = calculate_file_hash(filepath)
+        temp_path, file_hash = receive_upload(file.stream)
+        filepath, unique_filename = store_upload(temp_path, file_hash, filename)
         
         # Determine file type
         file_ext = filename.rsplit('.', 1)[1].lower()
         
-        # Process the certificate using OCR
-        ocr_result = process_certificate_file(filepath, file_ext)
-        
-        # Validate the certificate
-        validation_result = validate_certificate_data(
-            ocr_result['parsed_details'], 
-            file_hash, 
-            unique_filename, 
-            get_client_ip()
-        )
+        # Queue the upload for an OCR worker and answer straight away
+        if request.args.get('async', '').lower() in ('1', 'true', 'yes'):
+            job_id = job_queue.enqueue({
+                'filepath': os.path.abspath(filepath),
+                'filename': filename,
+                'unique_filename': unique_filename,
+                'file_hash': file_hash,
+                'file_ext': file_ext,
+                'client_ip': get_client_ip()
+            })
+            job_queue.add_event(job_id, 'hashed', {'file_hash': file_hash, 'size_bytes': os.path.getsize(filepath)})
+            status_url = url_for('get_job', job_id=job_id)
+            return jsonify({
+                'success': True,
+                'job_id': job_id,
+                'status': 'queued',
+                'status_url': status_url,
+                'events_url': url_for('job_events', job_id=job_id)
+            }), 202, {'Location': status_url}
         
-        # Combine results
-        response = {
-            'success': True,
-            'filename': filename,
-            'file_hash': file_hash,
-            'ocr_confidence': ocr_result['confidence_score'],
-            'extracted_details': ocr_result['parsed_details'],
-            'validation_result': validation_result,
-            'timestamp': datetime.now().isoformat()
-        }
+        response = run_verification(filepath, filename, unique_filename, file_hash, file_ext, get_client_ip())
         
         # Clean up uploaded file (optional - comment out to keep files)
         # os.remove(filepath)
@@ -219,6 +565,13 @@ def verify_certificate():
             'error': 'File too large. Maximum size is 16MB.'
         }), 413
     
+    except OverloadedError as e:
+        return jsonify({
+            'success': False,
+            'error': 'The server is busy verifying other certificates. Please retry shortly, or use ?async=1 to queue the upload.',
+            'retry_after': e.retry_after
+        }), 503, {'Retry-After': str(e.retry_after)}
+    
     except Exception as e:
         app.logger.error(f'Verification error: {str(e)}')
         return jsonify({
@@ -226,6 +579,159 @@ def verify_certificate():
             'error': 'An error occurred during verification. Please try again.'
         }), 500
 
+@app.route('/api/verify/batch', methods=['POST'])
+def verify_batch():
+    """Verify many certificates (files and/or ZIP archives), streaming NDJSON results
+    
+    One JSON line per certificate, written as soon as it finishes (not in upload
+    order; each line carries the file's index). A bad file only fails its own line.
+    """
+    try:
+        if not request.files:
+            return jsonify({
+                'success': False,
+                'error': 'No files uploaded'
+            }), 400
+    except RequestEntityTooLarge:
+        return jsonify({
+            'success': False,
+            'error': 'Batch too large. Maximum size is 512MB.'
+        }), 413
+    
+    client_ip = get_client_ip()
+    # Bound how many stored-but-unverified files a batch may have in flight
+    max_in_flight = app.config['BATCH_CONCURRENCY'] * 2
+    
+    def to_line(result):
+        return app.json.dumps(result) + '\n'
+    
+    def generate():
+        pending = set()
+        
+        for index, (name, stream) in enumerate(iter_batch_uploads()):
+            item = save_batch_item(index, name, stream, client_ip)
+            if 'error' in item:
+                yield to_line(item)
+                continue
+            
+            pending.add(batch_executor.submit(run_batch_item, index, item))
+            
+            # Emit whatever has finished; block only when the in-flight limit is reached
+            done, pending = wait(pending, timeout=0 if len(pending) < max_in_flight else None,
+                                 return_when=FIRST_COMPLETED)
+            for future in done:
+                yield to_line(future.result())
+        
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield to_line(future.result())
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def job_status(job_id, job):
+    """Client view of a queued job; once done, the /api/verify response"""
+    if job['status'] == 'done':
+        return dict(job['result'], job_id=job_id, status='done')
+    
+    if job['status'] == 'failed':
+        return {
+            'success': False,
+            'job_id': job_id,
+            'status': 'failed',
+            'error': 'An error occurred during verification. Please try again.'
+        }
+    
+    response = {
+        'success': True,
+        'job_id': job_id,
+        'status': job['status'],
+        'filename': job['payload']['filename']
+    }
+    if job['status'] == 'queued':
+        response['queue_position'] = job['queue_position']
+    return response
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status of an asynchronous verification; once done, the /api/verify response"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    
+    return jsonify(job_status(job_id, job))
+
+@app.route('/api/verify/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-Sent Events stream of an asynchronous verification's progress
+    
+    Stage events (hashed, cache, ocr_variant, partial, parsed, matched) are sent
+    as the worker records them, with 'status' when the job is queued or starts.
+    The stream ends with a 'result' event carrying the same body as
+    /api/jobs/<job_id>. Reconnecting clients resume after Last-Event-ID.
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    
+    last_id = request.headers.get('Last-Event-ID', request.args.get('after', '0'))
+    last_id = int(last_id) if last_id.isdigit() else 0
+    poll_interval = app.config['JOB_EVENTS_POLL_INTERVAL']
+    keepalive = app.config['JOB_EVENTS_KEEPALIVE']
+    
+    def to_event(event, data, event_id=None):
+        lines = f"id: {event_id}\n" if event_id is not None else ''
+        return f"{lines}event: {event}\ndata: {app.json.dumps(data)}\n\n"
+    
+    def generate(job, last_id):
+        status = None
+        last_sent = time.monotonic()
+        
+        while True:
+            if job['status'] != status and job['status'] in ('queued', 'running'):
+                yield to_event('status', job_status(job_id, job))
+                last_sent = time.monotonic()
+            status = job['status']
+            
+            # Read events after the status: a finished job's events are all recorded
+            for event in job_queue.events(job_id, after=last_id):
+                last_id = event['id']
+                yield to_event(event['event'], event['data'], event_id=last_id)
+                last_sent = time.monotonic()
+            
+            if status in ('done', 'failed'):
+                yield to_event('result', job_status(job_id, job))
+                return
+            
+            if time.monotonic() - last_sent >= keepalive:
+                yield ': keep-alive\n\n'
+                last_sent = time.monotonic()
+            
+            time.sleep(poll_interval)
+            job = job_queue.get(job_id)
+            if job is None:
+                # Purged while we were streaming
+                return
+    
+    return Response(stream_with_context(generate(job, last_id)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/ocr/stats', methods=['GET'])
+def ocr_stats():
+    """OCR load in this process: admission slots, wait queue and rejections, plus job queue and cache counters"""
+    return jsonify({
+        'admission': ocr_admission.stats(),
+        'quality_tiers': quality_tiers.stats(),
+        'job_queue': job_queue.counts(),
+        'cache': dict(ocr_cache.stats)
+    })
+
 @app.route('/api/institutions', methods=['GET'])
 def get_institutions():
     """Get list of all institutions"""
@@ -304,6 +810,16 @@ if __name__ == '__main__':
     # Initialize database on startup
     with app.app_context():
         create_tables()
+        # Build the certificate-number filter and student-name search before the first verification needs them
+        prepare_certificate_search()
+    
+    # Build the OCR engines now so the first upload does not pay for it
+    if warmup_enabled() and ocr_loader.load():
+        warm_engines()
+    
+    # Worker processes that drain POST /api/verify?async=1 jobs
+    start_job_workers()
+    start_upload_gc()
     
     print("🚀 Starting Academia Validator Server...")
     print("📍 Main interface: http://localhost:8080")
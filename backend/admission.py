@@ -0,0 +1,137 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+class OverloadedError(Exception):
+    """Raised when an OCR slot cannot be granted within the admission deadline"""
+    
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """Process-wide limit on concurrent OCR runs, with a bounded FIFO wait queue
+    
+    At most max_concurrent callers hold a slot. Others wait in arrival order, but
+    only if the queue has room and the expected wait (queue depth times the
+    recent average service time) fits within max_wait; otherwise they are turned
+    away at once with a Retry-After estimate instead of piling onto a saturated
+    machine.
+    """
+    
+    def __init__(self, max_concurrent: int, max_queue: int, max_wait: float,
+                 initial_service_time: float = 5.0, smoothing: float = 0.2):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.smoothing = smoothing
+        
+        # Exponentially weighted moving average of seconds per OCR run
+        self.service_time = initial_service_time
+        
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiters = []
+        
+        self.counters = {'admitted': 0, 'queued': 0, 'rejected_queue_full': 0,
+                         'rejected_deadline': 0, 'timed_out': 0, 'completed': 0}
+    
+    @property
+    def queue_depth(self) -> int:
+        """Callers currently waiting for a slot"""
+        return len(self._waiters)
+    
+    def _expected_wait(self, ahead: int) -> float:
+        """Seconds until a caller with `ahead` callers queued before it gets a slot"""
+        
+        if self._active < self.max_concurrent and ahead == 0:
+            return 0.0
+        # Every service_time the running slots free up and admit the next batch
+        return (ahead // self.max_concurrent + 1) * self.service_time
+    
+    def _retry_after(self) -> int:
+        return max(1, math.ceil(self._expected_wait(len(self._waiters))))
+    
+    def acquire(self, max_wait: Optional[float] = None):
+        """Take an OCR slot, waiting up to max_wait seconds (default: self.max_wait)
+        
+        max_wait=math.inf waits for as long as it takes and is never rejected.
+        Raises OverloadedError when the caller would not be served in time.
+        """
+        
+        max_wait = self.max_wait if max_wait is None else max_wait
+        
+        with self._cond:
+            if self._active < self.max_concurrent and not self._waiters:
+                self._active += 1
+                self.counters['admitted'] += 1
+                return
+            
+            if max_wait != math.inf:
+                if len(self._waiters) >= self.max_queue:
+                    self.counters['rejected_queue_full'] += 1
+                    raise OverloadedError('OCR queue is full', self._retry_after())
+                if self._expected_wait(len(self._waiters)) > max_wait:
+                    self.counters['rejected_deadline'] += 1
+                    raise OverloadedError('OCR queue wait exceeds the deadline', self._retry_after())
+            
+            ticket = object()
+            self._waiters.append(ticket)
+            self.counters['queued'] += 1
+            deadline = time.monotonic() + max_wait
+            
+            try:
+                while self._waiters[0] is not ticket or self._active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.counters['timed_out'] += 1
+                        raise OverloadedError('Timed out waiting for an OCR slot', self._retry_after())
+                    self._cond.wait(None if remaining == math.inf else remaining)
+            except BaseException:
+                self._waiters.remove(ticket)
+                # The next waiter may be admissible now that this one has left
+                self._cond.notify_all()
+                raise
+            
+            self._waiters.pop(0)
+            self._active += 1
+            self.counters['admitted'] += 1
+            self._cond.notify_all()
+    
+    def release(self, service_time: Optional[float] = None):
+        """Give a slot back, folding the run's duration into the service-time average"""
+        
+        with self._cond:
+            self._active -= 1
+            self.counters['completed'] += 1
+            if service_time is not None:
+                self.service_time += self.smoothing * (service_time - self.service_time)
+            self._cond.notify_all()
+    
+    @contextmanager
+    def slot(self, max_wait: Optional[float] = None):
+        """Hold an OCR slot for the duration of a with block"""
+        
+        self.acquire(max_wait)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.release(time.perf_counter() - start)
+    
+    def stats(self) -> Dict:
+        """Current occupancy, queue depth, service-time estimate and counters"""
+        
+        with self._cond:
+            return dict(
+                self.counters,
+                active=self._active,
+                queue_depth=len(self._waiters),
+                max_concurrent=self.max_concurrent,
+                max_queue=self.max_queue,
+                max_wait=self.max_wait,
+                service_time=round(self.service_time, 3),
+                retry_after=self._retry_after()
+            )
@@ -0,0 +1,43 @@
+from backend.models import db
+
+CHANGE_LOG = 'certificate_number_changes'
+
+# Every write to certificates logs the id and number of each row it touched, so
+# caches in any process can catch up with it; NULLs stand for "any certificate"
+# (an institution was renamed)
+CHANGE_LOG_SCHEMA = [
+    f"""CREATE TABLE IF NOT EXISTS {CHANGE_LOG} (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        certificate_number VARCHAR(100),
+        certificate_id INTEGER
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {CHANGE_LOG}_insert AFTER INSERT ON certificates BEGIN
+        INSERT INTO {CHANGE_LOG}(certificate_id, certificate_number) VALUES (new.id, new.certificate_number);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {CHANGE_LOG}_update AFTER UPDATE ON certificates BEGIN
+        INSERT INTO {CHANGE_LOG}(certificate_id, certificate_number) VALUES (old.id, old.certificate_number);
+        INSERT INTO {CHANGE_LOG}(certificate_id, certificate_number)
+        SELECT new.id, new.certificate_number
+        WHERE new.certificate_number IS NOT old.certificate_number OR new.id IS NOT old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {CHANGE_LOG}_delete AFTER DELETE ON certificates BEGIN
+        INSERT INTO {CHANGE_LOG}(certificate_id, certificate_number) VALUES (old.id, old.certificate_number);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {CHANGE_LOG}_institution AFTER UPDATE OF name ON institutions BEGIN
+        INSERT INTO {CHANGE_LOG}(certificate_id, certificate_number) VALUES (NULL, NULL);
+    END""",
+]
+
+def install_change_log() -> bool:
+    """Create the change log and its triggers; False on databases other than SQLite (needs an app context)"""
+    
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    with db.engine.begin() as connection:
+        for statement in CHANGE_LOG_SCHEMA:
+            connection.exec_driver_sql(statement)
+    return True
+
+def last_change(connection) -> int:
+    """Sequence number of the newest logged change (0 for an empty log)"""
+    return connection.exec_driver_sql(f'SELECT COALESCE(MAX(seq), 0) FROM {CHANGE_LOG}').scalar()
@@ -0,0 +1,148 @@
+import re
+from typing import Dict, List, Optional
+
+from sqlalchemy import column, select, table, text
+from sqlalchemy.orm import joinedload
+
+from backend.models import db, Certificate
+
+FTS_TABLE = 'certificates_fts'
+
+# bm25() weights per column: the student name and roll number decide the match,
+# course and institution only break ties
+BM25_WEIGHTS = '10.0, 10.0, 1.0, 1.0'
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        student_name, roll_number, course_name, institution_name,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON certificates BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, student_name, roll_number, course_name, institution_name)
+        VALUES (new.id, new.student_name, new.roll_number, new.course_name,
+                (SELECT name FROM institutions WHERE id = new.institution_id));
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update
+    AFTER UPDATE OF student_name, roll_number, course_name, institution_id ON certificates BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, student_name, roll_number, course_name, institution_name)
+        VALUES (new.id, new.student_name, new.roll_number, new.course_name,
+                (SELECT name FROM institutions WHERE id = new.institution_id));
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON certificates BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_institution AFTER UPDATE OF name ON institutions BEGIN
+        UPDATE {FTS_TABLE} SET institution_name = new.name
+        WHERE rowid IN (SELECT id FROM certificates WHERE institution_id = new.id);
+    END""",
+]
+
+BACKFILL = f"""
+    INSERT INTO {FTS_TABLE}(rowid, student_name, roll_number, course_name, institution_name)
+    SELECT certificates.id, certificates.student_name, certificates.roll_number,
+           certificates.course_name, institutions.name
+    FROM certificates LEFT JOIN institutions ON institutions.id = certificates.institution_id
+"""
+
+FTS = table(FTS_TABLE, column('rowid'))
+
+# Database URL -> whether its FTS table and triggers exist (checked once per process)
+_installed: Dict[str, bool] = {}
+
+def fts5_available() -> bool:
+    """Whether the app's database is SQLite built with FTS5 (needs an app context)"""
+    
+    if db.engine.dialect.name != 'sqlite':
+        return False
+    with db.engine.connect() as connection:
+        options = {row[0] for row in connection.exec_driver_sql('PRAGMA compile_options')}
+    return 'ENABLE_FTS5' in options
+
+def install() -> bool:
+    """Create the FTS table and its triggers if missing (needs an app context)
+    
+    A newly created table is filled from the existing certificates; from then on
+    the triggers keep it current, whoever writes to the tables. Returns False
+    when the database cannot host it.
+    """
+    
+    url = str(db.engine.url)
+    if url in _installed:
+        return _installed[url]
+    if not fts5_available():
+        print("⚠️ SQLite FTS5 is not available, using the in-memory name index")
+        _installed[url] = False
+        return False
+    
+    with db.engine.begin() as connection:
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {'name': FTS_TABLE}
+        ).first()
+        for statement in SCHEMA:
+            connection.exec_driver_sql(statement)
+        if not exists:
+            connection.exec_driver_sql(BACKFILL)
+            print("✅ Certificate full-text index created")
+    
+    _installed[url] = True
+    return True
+
+def drop():
+    """Remove the FTS table and its triggers (needs an app context)"""
+    
+    with db.engine.begin() as connection:
+        for trigger in ('insert', 'update', 'delete', 'institution'):
+            connection.exec_driver_sql(f'DROP TRIGGER IF EXISTS {FTS_TABLE}_{trigger}')
+        connection.exec_driver_sql(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+    _installed.pop(str(db.engine.url), None)
+
+def _any_of(value: Optional[str]) -> Optional[str]:
+    tokens = TOKEN_RE.findall((value or '').lower())
+    if not tokens:
+        return None
+    return '(' + ' OR '.join(f'"{token}"' for token in dict.fromkeys(tokens)) + ')'
+
+def match_expression(details: Dict) -> Optional[str]:
+    """FTS5 query for certificates sharing a name word or the roll number with `details`
+    
+    Course and institution words are added as "core OR (core AND context)": they
+    never admit a certificate on their own, but bm25() sums over every phrase of
+    the query, so among namesakes the one from the same course and institution
+    ranks first.
+    """
+    
+    clauses = []
+    name = _any_of(details.get('student_name'))
+    if name:
+        clauses.append(f'student_name : {name}')
+    roll_number = TOKEN_RE.findall((details.get('roll_number') or '').lower())
+    if roll_number:
+        clauses.append('roll_number : "' + ' '.join(roll_number) + '"')
+    if not clauses:
+        return None
+    
+    core = ' OR '.join(clauses)
+    context = _any_of(f"{details.get('course_name') or ''} {details.get('institution_name') or ''}")
+    if context:
+        return f'({core}) OR (({core}) AND {{course_name institution_name}} : {context})'
+    return core
+
+def search(details: Dict, limit: int = 20) -> List[Certificate]:
+    """Valid certificates best matching `details` by BM25, best first, with their institution, in one query"""
+    
+    query = match_expression(details)
+    if query is None:
+        return []
+    statement = (
+        select(Certificate)
+        .join(FTS, FTS.c.rowid == Certificate.id)
+        .options(joinedload(Certificate.institution))
+        .where(text(f'{FTS_TABLE} MATCH :query').bindparams(query=query), Certificate.is_valid == True)
+        .order_by(text(f'bm25({FTS_TABLE}, {BM25_WEIGHTS})'))
+        .limit(limit)
+    )
+    return db.session.execute(statement).scalars().all()
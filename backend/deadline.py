@@ -0,0 +1,41 @@
+import math
+import time
+from typing import Optional
+
+class Deadline:
+    """Time budget for one verification, passed down through the OCR pipeline
+    
+    Created when OCR starts; every stage checks it before starting more work and
+    hands remaining() to recognizer calls as their timeout. Deadline() without
+    a budget never expires.
+    """
+    
+    def __init__(self, seconds: Optional[float] = None):
+        self.seconds = seconds
+        self.expires_at = math.inf if seconds is None else time.monotonic() + seconds
+    
+    def remaining(self) -> float:
+        """Seconds left (math.inf without a budget, never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+    
+    def timeout(self) -> Optional[float]:
+        """remaining() as a timeout argument: None when there is no budget"""
+        return None if self.expires_at == math.inf else self.remaining()
+    
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+    
+    def child(self) -> 'Deadline':
+        """A deadline that expires with this one and can also be cancelled on its own"""
+        
+        child = Deadline(self.seconds)
+        child.expires_at = self.expires_at
+        return child
+    
+    def cancel(self):
+        """Expire now: work checking this deadline starts nothing more"""
+        self.expires_at = min(self.expires_at, time.monotonic())
+
+# Shared budget for callers that did not set one
+NO_DEADLINE = Deadline()
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+# Engine factories by name; each OCR module registers its own at import
+_factories: Dict[str, Callable] = {}
+_engines: Dict[str, object] = {}
+_lock = threading.Lock()
+
+def register_engine(name: str, factory: Callable):
+    """Register a zero-argument factory that builds the named OCR engine"""
+    
+    with _lock:
+        _factories[name] = factory
+
+def get_engine(name: str):
+    """Return the process-wide engine for name, building it on first use
+    
+    Engines are shared by every request and thread, so they must keep per-call
+    state in locals (or thread-locals) rather than on the instance.
+    """
+    
+    engine = _engines.get(name)
+    if engine is not None:
+        return engine
+    
+    with _lock:
+        if name not in _engines:
+            if name not in _factories:
+                raise KeyError(f"No OCR engine registered as '{name}'")
+            _engines[name] = _factories[name]()
+        return _engines[name]
+
+def warmup_enabled() -> bool:
+    """Whether engines should be warmed at worker start (OCR_WARMUP, default on)"""
+    return os.environ.get('OCR_WARMUP', '1').lower() not in ('0', 'false', 'no', 'off')
+
+def warm_engines(names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+    """Build the registered engines and run a dummy recognition through each
+    
+    Returns the seconds spent per engine, so the first real request finds the
+    recognizers started, language data loaded and code paths already exercised.
+    """
+    
+    timings = {}
+    for name in list(names or _factories):
+        start = time.perf_counter()
+        try:
+            engine = get_engine(name)
+            if hasattr(engine, 'warm_up'):
+                engine.warm_up()
+        except Exception as e:
+            print(f"⚠️ Could not warm OCR engine '{name}': {e}")
+            continue
+        timings[name] = time.perf_counter() - start
+        print(f"🔥 OCR engine '{name}' warmed in {timings[name]:.2f}s")
+    
+    return timings
+
+def reset_engines():
+    """Drop every built engine (they are rebuilt on next use)"""
+    
+    with _lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    
+    for engine in engines:
+        if hasattr(engine, 'close'):
+            engine.close()
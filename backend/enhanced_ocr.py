@@ -1,4 +1,3 @@
-import pytesseract
 from PIL import Image, ImageEnhance, ImageFilter
 import cv2
 import numpy as np
@@ -6,121 +5,614 @@ import PyPDF2
 import re
 import io
 import os
-from typing import Dict, List, Optional, Tuple
+import threading
+from functools import lru_cache
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backend.ocr_engine import OCRTimeoutError, get_ocr_backend, resolve_tesseract
+from backend.deadline import Deadline, NO_DEADLINE
+from backend.engine_registry import register_engine, get_engine
+from backend.field_extraction import ENHANCED_EXTRACTOR
+
+# Helpers for field post-processing, compiled once at import
+WHITESPACE_RE = re.compile(r'\s+')
+NON_WORD_RE = re.compile(r'[^\w\s]')
+UPPERCASE_RE = re.compile(r'[A-Z]')
+DIGIT_RE = re.compile(r'\d')
+LETTER_GRADE_RE = re.compile(r'[A-F][+-]?')
+
+# Structuring elements used on every image, built once at import
+GRADIENT_KERNEL = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+CLOSE_KERNEL = np.ones((2, 2), np.uint8)
+
+@lru_cache(maxsize=32)
+def _line_kernel(length: int) -> np.ndarray:
+    """Horizontal closing kernel; normalised images come in a handful of widths"""
+    return cv2.getStructuringElement(cv2.MORPH_RECT, (length, 1))
+
+# Identifies this OCR pipeline in result cache keys.
+# Bump it whenever preprocessing, recognition settings or parsing change.
+OCR_ENGINE_VERSION = 'enhanced-ocr-4'
+
+# Optional progress callback threaded through processing: progress(event, data)
+ProgressCallback = Callable[[str, Dict], None]
 
 class EnhancedCertificateOCR:
     """Enhanced OCR with advanced image processing capabilities"""
     
-    def __init__(self):
+    # Preprocessing variants in their default order
+    VARIANT_NAMES = ('original', 'gaussian_thresh', 'adaptive_thresh',
+                     'morphological', 'enhanced_contrast', 'bilateral_filter')
+    
+    # Fields that must all be present before a multi-page scan may stop early
+    CRITICAL_FIELDS = ('student_name', 'certificate_number', 'institution_name')
+    
+    # Process-wide count of how often each variant produced the chosen text
+    _variant_wins = {name: 0 for name in VARIANT_NAMES}
+    _cascade_runs = 0
+    _variant_stats_lock = threading.Lock()
+    
+    def __init__(self, variant_mode: str = 'parallel', max_workers: Optional[int] = None,
+                 cascade_min_confidence: float = 80.0, cascade_min_words: int = 8,
+                 cascade_depth: int = 2, cascade_sample_every: int = 20, page_workers: int = 2,
+                 use_text_regions: bool = True, normalize_images: bool = True,
+                 target_text_height: int = 32, max_image_side: int = 4000):
         # Configure Tesseract path (auto-detect or use default)
         self.setup_tesseract()
         
+        # Recognizer: persistent engine pool when available, pytesseract otherwise
+        self.backend = get_ocr_backend()
+        
         # OCR configuration for better accuracy
         self.ocr_config = r'--oem 3 --psm 6 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789.,:-/()[]'
         
+        # How preprocessing variants are recognised: 'sequential', 'parallel' or 'cascade'.
+        # Tesseract runs out of process, so a thread pool is enough to keep all cores busy.
+        self.variant_mode = variant_mode
+        self.max_workers = max_workers or min(6, os.cpu_count() or 1)
+        
+        # Cascade mode tries the historically best variants one at a time and stops
+        # at the first result that clears both thresholds; otherwise the remaining
+        # variants are swept as usual.
+        self.cascade_min_confidence = cascade_min_confidence
+        self.cascade_min_words = cascade_min_words
+        self.cascade_depth = cascade_depth
+        
+        # Wins are only credited from full sweeps. Every cascade_sample_every-th
+        # cascade sweeps all variants even when the first one passes, so clean
+        # scans keep counting towards the order too (0 never samples).
+        self.cascade_sample_every = cascade_sample_every
+        
+        # Scanned PDF pages OCRed at once (each page also fans out over its variants)
+        self.page_workers = max(1, page_workers)
+        
+        # Recognise only the detected text lines instead of the whole page
+        self.use_text_regions = use_text_regions
+        
+        # Resample every image so glyphs are about target_text_height pixels tall,
+        # never letting either side exceed max_image_side. This bounds the CPU time
+        # and memory of every filter below, whatever the upload resolution.
+        self.normalize_images = normalize_images
+        self.target_text_height = target_text_height
+        self.max_image_side = max_image_side
+        
+        # One instance serves every request (see get_engine), so reusable helpers are
+        # created once: CLAHE objects per thread, the variant thread pool on first use
+        self._local = threading.local()
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        
     def setup_tesseract(self):
-        """Auto-detect Tesseract installation"""
-        possible_paths = [
-            r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-            r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-            '/usr/bin/tesseract',
-            '/usr/local/bin/tesseract'
-        ]
-        
-        for path in possible_paths:
-            if os.path.exists(path):
-                pytesseract.pytesseract.tesseract_cmd = path
-                print(f"✅ Tesseract found at: {path}")
-                return
-                
-        print("⚠️ Tesseract not found in common locations. Please ensure it's in PATH")
+        """Auto-detect Tesseract installation (probed once per process)"""
+        resolve_tesseract()
     
-    def preprocess_image(self, image_path: str) -> np.ndarray:
-        """Advanced image preprocessing for better OCR accuracy"""
+    def _clahe(self):
+        """This thread's CLAHE object (OpenCV algorithms are not safe to share across threads)"""
+        
+        clahe = getattr(self._local, 'clahe', None)
+        if clahe is None:
+            clahe = self._local.clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        return clahe
+    
+    def _variant_executor(self) -> ThreadPoolExecutor:
+        """Thread pool shared by all requests, which also caps concurrent recognitions"""
         
-        # Read image using OpenCV
-        img = cv2.imread(image_path)
-        if img is None:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix='ocr-variant')
+        return self._executor
+    
+    def warm_up(self):
+        """Push a small synthetic certificate through every stage once"""
+        
+        canvas = np.full((120, 640), 255, dtype=np.uint8)
+        cv2.putText(canvas, 'Name: John Doe  Roll No: 2019CS001', (10, 50),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+        cv2.putText(canvas, 'ABC University of Technology 2019', (10, 95),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, 0, 2)
+        
+        gray = self.normalize_resolution(canvas) if self.normalize_images else canvas
+        self.detect_text_regions(gray)
+        variants = self._build_variants(gray)
+        
+        # One real recognition starts the recognizer and loads the language data
+        data = self.backend.image_to_data(variants[0][1], config=self.ocr_config)
+        text, _ = self._assemble_ocr_data(data)
+        self.calculate_confidence_score(self.parse_certificate_details(text), 0)
+    
+    def close(self):
+        """Stop the shared variant thread pool"""
+        
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+    
+    def _load_grayscale(self, image) -> np.ndarray:
+        """Return a single-channel grayscale array for a file path or in-memory image
+        
+        In-memory images may be PIL images or numpy arrays in PIL/PyMuPDF (RGB) order.
+        """
+        
+        if isinstance(image, Image.Image):
+            image = np.asarray(image.convert('L') if image.mode not in ('L', 'RGB', 'RGBA') else image)
+        
+        if isinstance(image, np.ndarray):
+            if image.ndim == 2:
+                return image
+            if image.shape[2] == 4:
+                return cv2.cvtColor(image, cv2.COLOR_RGBA2GRAY)
+            return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        
+        # Decode huge files at reduced size so peak memory stays bounded
+        gray = cv2.imread(image, self._decode_flag(image))
+        if gray is None:
             # Fallback to PIL
-            pil_img = Image.open(image_path)
-            img = cv2.cvtColor(np.array(pil_img), cv2.COLOR_RGB2BGR)
+            pil_img = Image.open(image)
+            gray = np.array(pil_img.convert('L'))
         
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        return gray
+    
+    def _decode_flag(self, image_path: str) -> int:
+        """Pick an OpenCV decode mode that downsamples very large images while reading"""
         
-        # Apply multiple preprocessing techniques
-        processed_images = []
+        try:
+            # Only reads the header, not the pixels
+            with Image.open(image_path) as pil_img:
+                longest_side = max(pil_img.size)
+        except Exception:
+            return cv2.IMREAD_GRAYSCALE
+        
+        # Decode no smaller than twice the cap so normalisation still has detail to work with
+        factor = longest_side / float(self.max_image_side * 2)
+        if factor >= 8:
+            return cv2.IMREAD_REDUCED_GRAYSCALE_8
+        if factor >= 4:
+            return cv2.IMREAD_REDUCED_GRAYSCALE_4
+        if factor >= 2:
+            return cv2.IMREAD_REDUCED_GRAYSCALE_2
+        return cv2.IMREAD_GRAYSCALE
+    
+    def estimate_text_height(self, gray: np.ndarray) -> Optional[float]:
+        """Median glyph height in pixels, or None when too few glyphs are visible"""
+        
+        height = gray.shape[0]
+        ink = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
+        count, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+        
+        glyph_heights = []
+        for i in range(1, count):
+            w = stats[i, cv2.CC_STAT_WIDTH]
+            h = stats[i, cv2.CC_STAT_HEIGHT]
+            # Character-like blobs only: not specks, rules, borders or seals
+            if 4 <= h <= height * 0.1 and 0.1 <= w / float(h) <= 3 and stats[i, cv2.CC_STAT_AREA] >= 10:
+                glyph_heights.append(h)
+        
+        if len(glyph_heights) < 10:
+            return None
+        return float(np.median(glyph_heights))
+    
+    def normalize_resolution(self, gray: np.ndarray) -> np.ndarray:
+        """Resample so text lands in Tesseract's preferred size range, within max_image_side"""
+        
+        height, width = gray.shape[:2]
+        
+        # Cap the size first so estimating text height is itself cheap
+        if max(height, width) > self.max_image_side:
+            cap = self.max_image_side / float(max(height, width))
+            gray = cv2.resize(gray, (max(1, int(width * cap)), max(1, int(height * cap))),
+                              interpolation=cv2.INTER_AREA)
+            height, width = gray.shape[:2]
+        
+        text_height = self.estimate_text_height(gray)
+        if not text_height:
+            return gray
+        
+        scale = self.target_text_height / text_height
+        scale = min(max(scale, 0.25), 4.0, self.max_image_side / float(max(height, width)))
+        
+        # Close enough already: resampling would only blur the glyphs
+        if 0.8 <= scale <= 1.25:
+            return gray
+        
+        interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+        print(f"📐 Resampling {width}x{height} by {scale:.2f} (text height {text_height:.0f}px)")
+        return cv2.resize(gray, (max(1, int(width * scale)), max(1, int(height * scale))),
+                          interpolation=interpolation)
+    
+    def detect_text_regions(self, gray: np.ndarray) -> List[Tuple[int, int, int, int]]:
+        """Find bounding boxes (x, y, w, h) of text lines using morphology and contours"""
+        
+        height, width = gray.shape[:2]
+        
+        # Morphological gradient highlights character strokes on light or dark backgrounds
+        gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT,
+                                    GRADIENT_KERNEL)
+        edges = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
+        
+        # Close horizontally so the characters of a line merge into one blob
+        line_kernel = _line_kernel(max(9, width // 60))
+        lines = cv2.morphologyEx(edges, cv2.MORPH_CLOSE, line_kernel)
+        
+        # Two-level hierarchy: text enclosed by a page border is still an outer boundary
+        contours, hierarchy = cv2.findContours(lines, cv2.RETR_CCOMP, cv2.CHAIN_APPROX_SIMPLE)[-2:]
+        
+        regions = []
+        for i, contour in enumerate(contours):
+            if hierarchy[0][i][3] != -1:
+                continue
+            
+            x, y, w, h = cv2.boundingRect(contour)
+            
+            # Skip specks, rules and page borders, and tall blobs such as seals and logos
+            if h < 8 or w < 8 or w * h < 150 or h > height * 0.2 or (w > width * 0.95 and h < 12):
+                continue
+            
+            # Text lines have a moderate density of stroke edges
+            density = cv2.countNonZero(edges[y:y + h, x:x + w]) / float(w * h)
+            if density < 0.1:
+                continue
+            
+            regions.append((x, y, w, h))
+        
+        return regions
+    
+    def _compose_text_regions(self, gray: np.ndarray,
+                              regions: List[Tuple[int, int, int, int]]) -> np.ndarray:
+        """Pack the text-line crops into one compact image, preserving reading order"""
+        
+        height, width = gray.shape[:2]
+        text_area = sum(w * h for _, _, w, h in regions)
+        
+        # Nothing found, or text everywhere: cropping would not save anything
+        if not regions or text_area > height * width * 0.6:
+            return gray
+        
+        pad = 4
+        gap = 16
+        
+        # Group boxes into rows whose vertical extents overlap, then order each row left to right
+        rows = []
+        for box in sorted(regions, key=lambda box: box[1]):
+            x, y, w, h = box
+            if rows and y < rows[-1]['bottom'] - min(h, rows[-1]['height']) / 2:
+                rows[-1]['boxes'].append(box)
+                rows[-1]['bottom'] = max(rows[-1]['bottom'], y + h)
+                rows[-1]['height'] = max(rows[-1]['height'], h)
+            else:
+                rows.append({'boxes': [box], 'bottom': y + h, 'height': h})
+        
+        strips = []
+        for row in rows:
+            crops = []
+            for x, y, w, h in sorted(row['boxes']):
+                x0, y0 = max(0, x - pad), max(0, y - pad)
+                x1, y1 = min(width, x + w + pad), min(height, y + h + pad)
+                crops.append(gray[y0:y1, x0:x1])
+            
+            strip_height = max(crop.shape[0] for crop in crops)
+            strip_width = sum(crop.shape[1] for crop in crops) + gap * (len(crops) - 1)
+            strip = np.full((strip_height, strip_width), 255, dtype=gray.dtype)
+            
+            offset = 0
+            for crop in crops:
+                strip[:crop.shape[0], offset:offset + crop.shape[1]] = crop
+                offset += crop.shape[1] + gap
+            strips.append(strip)
+        
+        canvas_width = max(strip.shape[1] for strip in strips) + 2 * gap
+        canvas_height = sum(strip.shape[0] for strip in strips) + gap * (len(strips) + 1)
+        canvas = np.full((canvas_height, canvas_width), 255, dtype=gray.dtype)
+        
+        top = gap
+        for strip in strips:
+            canvas[top:top + strip.shape[0], gap:gap + strip.shape[1]] = strip
+            top += strip.shape[0] + gap
+        
+        return canvas
+    
+    def _build_variant(self, method_name: str, gray: np.ndarray, cache: Dict[str, np.ndarray]) -> np.ndarray:
+        """Build one preprocessing variant, reusing intermediates from cache"""
+        
+        if method_name in cache:
+            return cache[method_name]
         
         # 1. Original grayscale
-        processed_images.append(("original", gray))
+        if method_name == 'original':
+            variant = gray
         
         # 2. Gaussian blur + threshold (good for noisy images)
-        blur = cv2.GaussianBlur(gray, (5, 5), 0)
-        thresh1 = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
-        processed_images.append(("gaussian_thresh", thresh1))
+        elif method_name == 'gaussian_thresh':
+            blur = cv2.GaussianBlur(gray, (5, 5), 0)
+            variant = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)[1]
         
         # 3. Adaptive threshold (good for varying lighting)
-        adaptive = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
-        processed_images.append(("adaptive_thresh", adaptive))
+        elif method_name == 'adaptive_thresh':
+            variant = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
         
         # 4. Morphological operations (good for text cleanup)
-        kernel = np.ones((2, 2), np.uint8)
-        morph = cv2.morphologyEx(thresh1, cv2.MORPH_CLOSE, kernel)
-        processed_images.append(("morphological", morph))
+        elif method_name == 'morphological':
+            thresh1 = self._build_variant('gaussian_thresh', gray, cache)
+            variant = cv2.morphologyEx(thresh1, cv2.MORPH_CLOSE, CLOSE_KERNEL)
         
         # 5. Contrast enhancement
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(gray)
-        processed_images.append(("enhanced_contrast", enhanced))
+        elif method_name == 'enhanced_contrast':
+            variant = self._clahe().apply(gray)
         
         # 6. Edge preservation filter
-        bilateral = cv2.bilateralFilter(gray, 9, 75, 75)
-        processed_images.append(("bilateral_filter", bilateral))
+        elif method_name == 'bilateral_filter':
+            variant = cv2.bilateralFilter(gray, 9, 75, 75)
+        
+        else:
+            raise ValueError(f"Unknown preprocessing method: {method_name}")
+        
+        cache[method_name] = variant
+        return variant
+    
+    def _build_variants(self, gray: np.ndarray, method_names=None) -> List[Tuple[str, np.ndarray]]:
+        """Build the requested preprocessing variants (all of them by default)"""
+        
+        cache = {}
+        return [(name, self._build_variant(name, gray, cache))
+                for name in (method_names or self.VARIANT_NAMES)]
+    
+    def preprocess_image(self, image) -> np.ndarray:
+        """Advanced image preprocessing for better OCR accuracy"""
+        
+        # Apply multiple preprocessing techniques
+        return self._build_variants(self._load_grayscale(image))
+    
+    @classmethod
+    def variant_order(cls) -> List[str]:
+        """Variants ordered by historical win count, default order breaking ties"""
         
-        return processed_images
+        with cls._variant_stats_lock:
+            wins = dict(cls._variant_wins)
+        return sorted(cls.VARIANT_NAMES, key=lambda name: (-wins[name], cls.VARIANT_NAMES.index(name)))
     
-    def extract_text_from_image(self, image_path: str) -> Dict[str, str]:
-        """Extract text using multiple preprocessing methods"""
+    @classmethod
+    def variant_win_rates(cls) -> Dict[str, float]:
+        """Share of recognitions each variant has won so far in this process"""
+        
+        with cls._variant_stats_lock:
+            total = sum(cls._variant_wins.values())
+            return {name: (wins / total if total else 0.0) for name, wins in cls._variant_wins.items()}
+    
+    @classmethod
+    def _next_cascade_run(cls) -> int:
+        """Number this cascade run (process-wide, starting at 1)"""
+        
+        with cls._variant_stats_lock:
+            cls._cascade_runs += 1
+            return cls._cascade_runs
+    
+    @classmethod
+    def _record_variant_win(cls, method_name: str):
+        """Count a win for the variant whose text was returned"""
+        
+        with cls._variant_stats_lock:
+            if method_name in cls._variant_wins:
+                cls._variant_wins[method_name] += 1
+    
+    def _assemble_ocr_data(self, data: Dict[str, list]) -> Tuple[str, List[float]]:
+        """Rebuild page text and word confidences from image_to_data output"""
+        
+        lines = []
+        confidences = []
+        current_key = None
+        current_paragraph = None
+        
+        for i, word in enumerate(data['text']):
+            word = (word or '').strip()
+            if not word:
+                continue
+            
+            conf = float(data['conf'][i])
+            if conf > 0:
+                confidences.append(conf)
+            
+            paragraph = (data['block_num'][i], data['par_num'][i])
+            key = paragraph + (data['line_num'][i],)
+            if key != current_key:
+                # Tesseract separates paragraphs with a blank line, like image_to_string
+                if current_paragraph is not None and paragraph != current_paragraph:
+                    lines.append([])
+                lines.append([])
+                current_key = key
+                current_paragraph = paragraph
+            lines[-1].append(word)
+        
+        text = '\n'.join(' '.join(words) for words in lines)
+        return text, confidences
+    
+    def _ocr_variant(self, method_name: str, processed_img: np.ndarray,
+                     deadline: Deadline = NO_DEADLINE) -> Dict:
+        """Run a single Tesseract pass on one preprocessed variant
+        
+        The pass is skipped once the deadline has passed, and killed if it runs past it.
+        """
+        
+        if deadline.expired:
+            return {'text': '', 'confidence': 0, 'word_count': 0, 'timed_out': True}
         
         try:
-            # Get all preprocessed versions
-            processed_images = self.preprocess_image(image_path)
+            # One recognition pass gives the text and the confidence of that same text
+            ocr_data = self.backend.image_to_data(processed_img, config=self.ocr_config,
+                                                  timeout=deadline.timeout())
+            text, confidences = self._assemble_ocr_data(ocr_data)
             
-            results = {}
-            best_confidence = 0
-            best_text = ""
+            # Calculate average confidence
+            avg_confidence = sum(confidences) / len(confidences) if confidences else 0
+            word_count = len(text.split())
             
-            for method_name, processed_img in processed_images:
-                try:
-                    # Convert numpy array back to PIL Image
-                    pil_img = Image.fromarray(processed_img)
-                    
-                    # Extract text with confidence
-                    text = pytesseract.image_to_string(pil_img, config=self.ocr_config)
-                    
-                    # Get confidence data
-                    confidence_data = pytesseract.image_to_data(pil_img, output_type=pytesseract.Output.DICT)
-                    
-                    # Calculate average confidence
-                    confidences = [int(conf) for conf in confidence_data['conf'] if int(conf) > 0]
-                    avg_confidence = sum(confidences) / len(confidences) if confidences else 0
-                    
-                    results[method_name] = {
-                        'text': text.strip(),
-                        'confidence': avg_confidence,
-                        'word_count': len(text.split())
-                    }
-                    
-                    # Keep track of best result
-                    if avg_confidence > best_confidence and len(text.strip()) > 10:
-                        best_confidence = avg_confidence
-                        best_text = text.strip()
-                        
-                    print(f"📊 Method '{method_name}': {avg_confidence:.1f}% confidence, {len(text.split())} words")
-                    
-                except Exception as e:
-                    print(f"❌ Error with method '{method_name}': {str(e)}")
-                    results[method_name] = {'text': '', 'confidence': 0, 'word_count': 0}
+            print(f"📊 Method '{method_name}': {avg_confidence:.1f}% confidence, {word_count} words")
+            
+            return {
+                'text': text,
+                'confidence': avg_confidence,
+                'word_count': word_count
+            }
+            
+        except OCRTimeoutError:
+            print(f"⏱️ Method '{method_name}' stopped: time budget spent")
+            return {'text': '', 'confidence': 0, 'word_count': 0, 'timed_out': True}
+            
+        except Exception as e:
+            print(f"❌ Error with method '{method_name}': {str(e)}")
+            return {'text': '', 'confidence': 0, 'word_count': 0}
+    
+    def _report_variant(self, progress: Optional[ProgressCallback], method_name: str, result: Dict):
+        """Send one finished variant to the progress callback, if any"""
+        
+        if progress:
+            progress('ocr_variant', {
+                'method': method_name,
+                'confidence': round(result['confidence'], 1),
+                'word_count': result['word_count']
+            })
+    
+    def _run_variants(self, processed_images: List[Tuple[str, np.ndarray]],
+                      progress: Optional[ProgressCallback] = None,
+                      deadline: Deadline = NO_DEADLINE) -> Dict[str, Dict]:
+        """Recognise every variant, in parallel when enabled"""
+        
+        if self.variant_mode == 'parallel' and self.max_workers > 1 and len(processed_images) > 1:
+            executor = self._variant_executor()
+            futures = []
+            for name, img in processed_images:
+                future = executor.submit(self._ocr_variant, name, img, deadline)
+                # Report variants as they finish, not in collection order
+                future.add_done_callback(lambda done, name=name: self._report_variant(progress, name, done.result()))
+                futures.append((name, future))
+            # Collect in variant order so ties resolve exactly as in sequential mode
+            return {name: future.result() for name, future in futures}
+        
+        results = {}
+        for name, img in processed_images:
+            results[name] = self._ocr_variant(name, img, deadline)
+            self._report_variant(progress, name, results[name])
+        return results
+    
+    def _select_best(self, results: Dict[str, Dict]) -> Tuple[Optional[str], float, str]:
+        """Pick the highest-confidence variant with a usable amount of text"""
+        
+        best_method = None
+        best_confidence = 0
+        best_text = ""
+        
+        for method_name, result in results.items():
+            if result['confidence'] > best_confidence and len(result['text']) > 10:
+                best_method = method_name
+                best_confidence = result['confidence']
+                best_text = result['text']
+        
+        return best_method, best_confidence, best_text
+    
+    def _passes_cascade(self, result: Dict) -> bool:
+        """Whether a variant result is good enough to stop the cascade"""
+        
+        return (result['confidence'] >= self.cascade_min_confidence
+                and result['word_count'] >= self.cascade_min_words
+                and len(result['text']) > 10)
+    
+    def _run_cascade(self, gray: np.ndarray, progress: Optional[ProgressCallback] = None,
+                     deadline: Deadline = NO_DEADLINE) -> Dict[str, Dict]:
+        """Try variants in win-rate order, falling back to a full sweep"""
+        
+        order = self.variant_order()
+        sample = self.cascade_sample_every > 0 and self._next_cascade_run() % self.cascade_sample_every == 0
+        cache = {}
+        results = {}
+        
+        for method_name in order[:self.cascade_depth]:
+            result = self._ocr_variant(method_name, self._build_variant(method_name, gray, cache), deadline)
+            results[method_name] = result
+            self._report_variant(progress, method_name, result)
+            if self._passes_cascade(result) and not sample:
+                print(f"⏩ Cascade stopped after '{method_name}' ({len(results)} of {len(order)} variants)")
+                return results
+        
+        # Out of time: building the other variants would only lead to skipped passes
+        if deadline.expired:
+            return results
+        
+        # Degraded scan: sweep whatever is left
+        remaining = [(name, self._build_variant(name, gray, cache)) for name in order[self.cascade_depth:]]
+        results.update(self._run_variants(remaining, progress, deadline))
+        return results
+    
+    def extract_text_from_image(self, image, progress: Optional[ProgressCallback] = None,
+                                method_names: Optional[List[str]] = None,
+                                deadline: Optional[Deadline] = None) -> Dict[str, str]:
+        """Extract text using multiple preprocessing methods
+        
+        Accepts a file path, a PIL image or a numpy array, so rendered PDF pages
+        never have to be written to disk. progress receives an 'ocr_variant'
+        event as each preprocessing variant is recognised. method_names limits
+        recognition to those variants (the fast quality tier uses just one).
+        Variants still running when the deadline passes are killed, and the best
+        of the finished ones is returned with 'partial' set.
+        """
+        
+        deadline = deadline or NO_DEADLINE
+        timed_out = {'text': '', 'confidence': 0.0, 'methods_tried': 0, 'detailed_results': {}, 'partial': True}
+        
+        try:
+            gray = self._load_grayscale(image)
+            
+            # Bring the image to a predictable scale before any variant is built
+            if self.normalize_images:
+                gray = self.normalize_resolution(gray)
+            
+            # Locate text lines once; every variant is built from the packed crops
+            if self.use_text_regions:
+                regions = self.detect_text_regions(gray)
+                gray = self._compose_text_regions(gray, regions)
+            
+            if deadline.expired:
+                return timed_out
+            
+            if method_names:
+                results = self._run_variants(self._build_variants(gray, method_names), progress, deadline)
+            elif self.variant_mode == 'cascade':
+                results = self._run_cascade(gray, progress, deadline)
+            else:
+                # Get all preprocessed versions
+                results = self._run_variants(self._build_variants(gray), progress, deadline)
+            partial = any(result.get('timed_out') for result in results.values())
+            
+            # Keep track of best result
+            best_method, best_confidence, best_text = self._select_best(results)
+            # Only a full sweep compares every variant: crediting a cascade that stopped
+            # early, a restricted run or a timed-out one would just reinforce whatever
+            # order the variants were tried in
+            if best_method and not partial and len(results) == len(self.VARIANT_NAMES):
+                self._record_variant_win(best_method)
             
             # Return best result or fallback
             if best_text:
@@ -128,22 +620,37 @@ class EnhancedCertificateOCR:
                 return {
                     'text': best_text,
                     'confidence': best_confidence,
-                    'methods_tried': len(processed_images),
-                    'detailed_results': results
+                    'methods_tried': len(results),
+                    'best_method': best_method,
+                    'detailed_results': results,
+                    'partial': partial
                 }
+            elif partial:
+                # Out of time: no budget left for the fallback pass either
+                return dict(timed_out, methods_tried=len(results), detailed_results=results)
             else:
                 # Fallback to simple OCR
-                simple_img = Image.open(image_path)
+                if isinstance(image, np.ndarray):
+                    simple_img = Image.fromarray(image)
+                elif isinstance(image, Image.Image):
+                    simple_img = image
+                else:
+                    simple_img = Image.open(image)
                 if simple_img.mode != 'RGB':
                     simple_img = simple_img.convert('RGB')
-                fallback_text = pytesseract.image_to_string(simple_img)
+                fallback_text = self.backend.image_to_string(simple_img, timeout=deadline.timeout())
                 
                 return {
                     'text': fallback_text.strip(),
                     'confidence': 50.0,  # Default confidence
                     'methods_tried': 1,
-                    'detailed_results': {'fallback': {'text': fallback_text.strip(), 'confidence': 50.0}}
+                    'detailed_results': {'fallback': {'text': fallback_text.strip(), 'confidence': 50.0}},
+                    'partial': False
                 }
+        
+        except OCRTimeoutError:
+            print("⏱️ OCR stopped: time budget spent")
+            return timed_out
                 
         except Exception as e:
             print(f"❌ OCR Error: {str(e)}")
@@ -154,10 +661,87 @@ class EnhancedCertificateOCR:
                 'detailed_results': {}
             }
     
-    def extract_text_from_pdf(self, pdf_path: str) -> Dict[str, str]:
-        """Extract text from PDF with multiple methods"""
+    def _render_page(self, doc, page_num: int):
+        """Render one PDF page to an RGB array that views the pixmap in place"""
+        
+        page = doc.load_page(page_num)
+        pix = page.get_pixmap()
+        
+        # View the rendered pixels in place: no PNG encode, temp file or copy
+        samples = pix.samples_mv if hasattr(pix, 'samples_mv') else pix.samples
+        img = np.frombuffer(samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+        return pix, img
+    
+    def iter_pdf_page_texts(self, doc, progress: Optional[ProgressCallback] = None,
+                            method_names: Optional[List[str]] = None,
+                            deadline: Deadline = NO_DEADLINE) -> Iterator[Tuple[int, Dict]]:
+        """OCR the pages of an open PyMuPDF document concurrently, yielding in page order
+        
+        Pages are rendered here (PyMuPDF documents are not thread-safe) while earlier
+        pages are being recognised. At most page_workers pages are in flight, so
+        memory stays bounded however long the document is. Closing the generator
+        early cancels the pages that have not started yet, stops the running ones
+        from starting further variants and returns once they are done with their
+        pixels. Variant events sent to
+        progress carry the (1-based) page they belong to. No page is started
+        after the deadline has passed.
+        """
+        
+        executor = ThreadPoolExecutor(max_workers=self.page_workers, thread_name_prefix='ocr-page')
+        pending = deque()
+        # Cancelled when the caller stops early, so running pages start no further variants
+        pages_deadline = deadline.child()
+        
+        try:
+            for page_num in range(len(doc)):
+                if deadline.expired:
+                    break
+                pix, img = self._render_page(doc, page_num)
+                page_progress = None
+                if progress:
+                    page_progress = lambda event, data, page=page_num + 1: progress(event, dict(data, page=page))
+                # Keep the pixmap referenced for as long as its pixels are in use
+                pending.append((page_num, pix, executor.submit(self.extract_text_from_image, img, page_progress,
+                                                                   method_names, pages_deadline)))
+                
+                if len(pending) >= self.page_workers:
+                    done_num, _, future = pending.popleft()
+                    yield done_num, future.result()
+            
+            while pending:
+                done_num, _, future = pending.popleft()
+                yield done_num, future.result()
+        finally:
+            pages_deadline.cancel()
+            for _, _, future in pending:
+                future.cancel()
+            # Pages already being recognised read their pixmap in place: wait for them
+            # before the pixmaps, and then the document, are released
+            executor.shutdown(wait=True)
+    
+    def has_critical_fields(self, text: str) -> bool:
+        """Whether every critical field can already be parsed from text"""
+        
+        details = self.parse_certificate_details(text)
+        return all(details.get(field) for field in self.CRITICAL_FIELDS)
+    
+    def extract_text_from_pdf(self, pdf_path: str,
+                              stop_when: Optional[Callable[[str], bool]] = None,
+                              progress: Optional[ProgressCallback] = None,
+                              method_names: Optional[List[str]] = None,
+                              deadline: Optional[Deadline] = None) -> Dict[str, str]:
+        """Extract text from PDF with multiple methods
+        
+        For scanned PDFs, stop_when is checked against the text gathered so far after
+        every page; once it returns True the remaining pages are skipped. progress
+        receives a 'partial' event with the fields parsed so far as soon as the
+        text layer is read, and after every scanned page. method_names and deadline
+        are passed on to extract_text_from_image for scanned pages. Pages left
+        unread when the deadline passes are skipped and the result marked 'partial'.
+        """
         
-        results = {'text': '', 'confidence': 90.0, 'methods_tried': 1}
+        deadline = deadline or NO_DEADLINE
+        results = {'text': '', 'confidence': 90.0, 'methods_tried': 1, 'partial': False}
         
         try:
             # Method 1: Direct PDF text extraction
@@ -165,6 +749,9 @@ class EnhancedCertificateOCR:
             with open(pdf_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
                 for page in pdf_reader.pages:
+                    if deadline.expired:
+                        results['partial'] = True
+                        break
                     page_text = page.extract_text()
                     if page_text.strip():
                         text += page_text + "\n"
@@ -173,6 +760,11 @@ class EnhancedCertificateOCR:
                 results['text'] = text.strip()
                 results['confidence'] = 95.0
                 print(f"✅ PDF text extracted successfully: {len(text)} characters")
+                if progress:
+                    progress('partial', {
+                        'source': 'text_layer',
+                        'details': self.parse_certificate_details(results['text'])
+                    })
                 return results
             
             # Method 2: Convert PDF to images and OCR (if direct extraction fails)
@@ -180,28 +772,38 @@ class EnhancedCertificateOCR:
             
             try:
                 import fitz  # PyMuPDF
-                doc = fitz.open(pdf_path)
-                combined_text = ""
+                doc = fitz.open(pdf_path, filetype='pdf')
+                page_texts = []
+                
+                with closing(self.iter_pdf_page_texts(doc, progress, method_names, deadline)) as pages:
+                    for page_num, ocr_result in pages:
+                        page_texts.append(ocr_result['text'])
+                        results['partial'] = results['partial'] or ocr_result.get('partial', False)
+                        
+                        if progress:
+                            progress('partial', {
+                                'source': 'page',
+                                'page': page_num + 1,
+                                'page_count': len(doc),
+                                'confidence': round(ocr_result['confidence'], 1),
+                                'details': self.parse_certificate_details("\n".join(page_texts))
+                            })
+                        
+                        if stop_when and page_num + 1 < len(doc) and stop_when("\n".join(page_texts)):
+                            print(f"⏩ All required fields found after page {page_num + 1} of {len(doc)}")
+                            break
+                
+                if len(page_texts) < len(doc) and deadline.expired:
+                    print(f"⏱️ Time budget spent after {len(page_texts)} of {len(doc)} pages")
+                    results['partial'] = True
                 
-                for page_num in range(len(doc)):
-                    page = doc.load_page(page_num)
-                    pix = page.get_pixmap()
-                    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-                    
-                    # Save temporarily and process with OCR
-                    temp_path = f"temp_page_{page_num}.png"
-                    img.save(temp_path)
-                    
-                    ocr_result = self.extract_text_from_image(temp_path)
-                    combined_text += ocr_result['text'] + "\n"
-                    
-                    # Clean up temp file
-                    if os.path.exists(temp_path):
-                        os.remove(temp_path)
+                combined_text = "\n".join(page_texts)
                 
                 results['text'] = combined_text.strip()
                 results['confidence'] = 80.0
                 results['methods_tried'] = 2
+                results['pages_processed'] = len(page_texts)
+                results['page_count'] = len(doc)
                 
                 doc.close()
                 return results
@@ -238,19 +840,15 @@ class EnhancedCertificateOCR:
         }
         
         # Clean the text
-        text = re.sub(r'\s+', ' ', text).strip()
-        text_lower = text.lower()
+        text = WHITESPACE_RE.sub(' ', text).strip()
+        
+        # Locate field keywords once; each pattern is only tried where it can match
+        extractor = ENHANCED_EXTRACTOR
+        scan = extractor.scan(text)
         
         # Enhanced student name patterns
-        name_patterns = [
-            r'(?:name|Name|NAME)[:\s]*([A-Z][a-zA-Z\s.]+?)(?:\s*(?:son|daughter|s/o|d/o|w/o)|\s*roll|\s*reg|\s*has|\s*is|\s*$)',
-            r'(?:this is to certify that|certify that|certified that)\s*([A-Z][a-zA-Z\s.]+?)(?:\s*(?:son|daughter|s/o|d/o|w/o)|\s*roll|\s*reg|\s*has|\s*is)',
-            r'(?:mr\.|ms\.|miss|shri|smt\.?)\s*([A-Z][a-zA-Z\s.]+?)(?:\s*(?:son|daughter|s/o|d/o|w/o)|\s*roll|\s*reg|\s*has|\s*is)',
-            r'(?:student|candidate)\s*(?:name)?[:\s]*([A-Z][a-zA-Z\s.]+?)(?:\s*(?:roll|reg|has|is))'
-        ]
-        
-        for pattern in name_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in extractor.patterns('student_name'):
+            match = extractor.search(pattern, scan)
             if match and not details['student_name']:
                 name = match.group(1).strip()
                 if len(name) > 2 and len(name.split()) >= 2:  # At least first and last name
@@ -258,33 +856,17 @@ class EnhancedCertificateOCR:
                     break
         
         # Enhanced certificate number patterns
-        cert_patterns = [
-            r'(?:certificate|cert|graduation)\s*(?:no|number|#)[:\s]*([A-Z0-9/-]+)',
-            r'(?:registration|reg)\s*(?:no|number|#)[:\s]*([A-Z0-9/-]+)',
-            r'(?:serial|sr)\s*(?:no|number|#)[:\s]*([A-Z0-9/-]+)',
-            r'(?:diploma|degree)\s*(?:no|number|#)[:\s]*([A-Z0-9/-]+)',
-            r'(?:^|\s)([A-Z]{2,4}[\d/-]{4,})',  # Pattern like ABC123456 or XYZ/2023/001
-        ]
-        
-        for pattern in cert_patterns:
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if len(match) >= 4 and re.search(r'[A-Z]', match) and re.search(r'\d', match):
+        for pattern in extractor.patterns('certificate_number'):
+            for match in extractor.findall(pattern, scan):
+                if len(match) >= 4 and UPPERCASE_RE.search(match) and DIGIT_RE.search(match):
                     details['certificate_number'] = match.strip()
                     break
             if details['certificate_number']:
                 break
         
         # Enhanced roll number patterns
-        roll_patterns = [
-            r'(?:roll|Roll|ROLL)\s*(?:no|number|#)?[:\s]*([A-Z0-9]+)',
-            r'(?:student|Student|STUDENT)\s*(?:id|ID|no|number|#)[:\s]*([A-Z0-9]+)',
-            r'(?:enrollment|Enrollment|ENROLLMENT)\s*(?:no|number|#)[:\s]*([A-Z0-9]+)',
-            r'(?:admission|Admission|ADMISSION)\s*(?:no|number|#)[:\s]*([A-Z0-9]+)'
-        ]
-        
-        for pattern in roll_patterns:
-            match = re.search(pattern, text)
+        for pattern in extractor.patterns('roll_number'):
+            match = extractor.search(pattern, scan)
             if match:
                 roll = match.group(1).strip()
                 if len(roll) >= 4:  # Valid roll numbers are usually longer
@@ -293,45 +875,22 @@ class EnhancedCertificateOCR:
         
         # Enhanced graduation year patterns
         current_year = 2024
-        year_patterns = [
-            r'(?:year|Year|YEAR|graduated|passed|completed)[:\s]*(\d{4})',
-            r'(?:batch|Batch|BATCH)[:\s]*(?:of\s*)?(\d{4})',
-            r'(?:session|Session|SESSION)[:\s]*(\d{4})',
-            r'(?:class|Class|CLASS)\s*(?:of\s*)?(\d{4})'
-        ]
-        
         all_years = []
-        for pattern in year_patterns:
-            matches = re.findall(pattern, text)
+        for pattern in extractor.patterns('graduation_year'):
+            matches = extractor.findall(pattern, scan)
             all_years.extend([int(year) for year in matches if 1950 <= int(year) <= current_year + 2])
         
         # Also find standalone 4-digit years
-        standalone_years = re.findall(r'\b(19[5-9]\d|20[0-4]\d)\b', text)
-        all_years.extend([int(year) for year in standalone_years])
+        for pattern in extractor.patterns('standalone_year'):
+            all_years.extend([int(year) for year in extractor.findall(pattern, scan)])
         
         if all_years:
             # Choose the most recent valid year
             details['graduation_year'] = str(max(all_years))
         
         # Enhanced course/degree patterns
-        degree_patterns = [
-            r'(Bachelor\s+of\s+[A-Za-z\s]+)',
-            r'(Master\s+of\s+[A-Za-z\s]+)',
-            r'(B\.?Tech\.?\s*(?:in\s+)?[A-Za-z\s]*)',
-            r'(M\.?Tech\.?\s*(?:in\s+)?[A-Za-z\s]*)',
-            r'(B\.?Sc\.?\s*(?:in\s+)?[A-Za-z\s]*)',
-            r'(M\.?Sc\.?\s*(?:in\s+)?[A-Za-z\s]*)',
-            r'(B\.?Com\.?\s*[A-Za-z\s]*)',
-            r'(M\.?Com\.?\s*[A-Za-z\s]*)',
-            r'(B\.?A\.?\s*(?:in\s+)?[A-Za-z\s]*)',
-            r'(M\.?A\.?\s*(?:in\s+)?[A-Za-z\s]*)',
-            r'(Diploma\s+in\s+[A-Za-z\s]+)',
-            r'(PhD\.?\s*(?:in\s+)?[A-Za-z\s]*)',
-            r'(Doctor\s+of\s+Philosophy\s*(?:in\s+)?[A-Za-z\s]*)'
-        ]
-        
-        for pattern in degree_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in extractor.patterns('course_name'):
+            match = extractor.search(pattern, scan)
             if match:
                 course = match.group(1).strip()
                 if len(course) > 5:  # Valid course names are longer
@@ -348,17 +907,8 @@ class EnhancedCertificateOCR:
                     break
         
         # Enhanced CGPA/Grade patterns
-        grade_patterns = [
-            r'(?:CGPA|cgpa|Cgpa)[:\s]*(\d+\.?\d*)',
-            r'(\d+\.?\d*)[:\s]*(?:CGPA|cgpa|Cgpa)',
-            r'(?:percentage|Percentage|PERCENTAGE)[:\s]*(\d{2,3}\.?\d*)%?',
-            r'(\d{2,3}\.?\d*)[:\s]*(?:%|percent|per cent)',
-            r'(?:grade|Grade|GRADE)[:\s]*([A-F][+-]?|\d+\.?\d*)',
-            r'(?:marks|Marks|MARKS)[:\s]*(\d+\.?\d*)'
-        ]
-        
-        for pattern in grade_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in extractor.patterns('cgpa_percentage'):
+            match = extractor.search(pattern, scan)
             if match:
                 grade = match.group(1).strip()
                 try:
@@ -369,7 +919,7 @@ class EnhancedCertificateOCR:
                         details['cgpa_percentage'] = f"{grade_float}%"
                     break
                 except ValueError:
-                    if re.match(r'[A-F][+-]?', grade):  # Letter grade
+                    if LETTER_GRADE_RE.match(grade):  # Letter grade
                         details['cgpa_percentage'] = grade
                         break
         
@@ -383,8 +933,8 @@ class EnhancedCertificateOCR:
                 for keyword in institution_keywords:
                     if keyword in line_clean.lower():
                         # Clean up the institution name
-                        inst_name = re.sub(r'[^\w\s]', ' ', line_clean)
-                        inst_name = re.sub(r'\s+', ' ', inst_name).strip()
+                        inst_name = NON_WORD_RE.sub(' ', line_clean)
+                        inst_name = WHITESPACE_RE.sub(' ', inst_name).strip()
                         if len(inst_name) > 10:
                             details['institution_name'] = inst_name
                             break
@@ -392,14 +942,8 @@ class EnhancedCertificateOCR:
                     break
         
         # Date patterns
-        date_patterns = [
-            r'(?:date|Date|DATE)[:\s]*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})',
-            r'(?:issued|Issued|ISSUED)[:\s]*(?:on\s*)?(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})',
-            r'(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})'
-        ]
-        
-        for pattern in date_patterns:
-            match = re.search(pattern, text)
+        for pattern in extractor.patterns('issue_date'):
+            match = extractor.search(pattern, scan)
             if match:
                 date_str = match.group(1).strip()
                 details['issue_date'] = date_str
@@ -407,6 +951,17 @@ class EnhancedCertificateOCR:
         
         return details
     
+    def parse_certificate_details_batch(self, texts: Iterable[str]) -> List[Dict[str, Optional[str]]]:
+        """Parse many stored texts at once; identical texts are only parsed once"""
+        
+        parsed = {}
+        results = []
+        for text in texts:
+            if text not in parsed:
+                parsed[text] = self.parse_certificate_details(text)
+            results.append(dict(parsed[text]))
+        return results
+    
     def calculate_confidence_score(self, extracted_details: Dict[str, Optional[str]], ocr_confidence: float) -> float:
         """Enhanced confidence calculation"""
         
@@ -419,7 +974,7 @@ class EnhancedCertificateOCR:
         completeness_score = (filled_fields / total_fields) * 100 * 0.3  # 30% weight
         
         # Critical fields score
-        critical_fields = ['student_name', 'certificate_number', 'institution_name']
+        critical_fields = self.CRITICAL_FIELDS
         critical_filled = sum(1 for field in critical_fields 
                             if extracted_details.get(field) and extracted_details[field].strip())
         critical_score = (critical_filled / len(critical_fields)) * 100 * 0.3  # 30% weight
@@ -444,20 +999,32 @@ class EnhancedCertificateOCR:
         return min(round(final_score, 2), 100.0)  # Cap at 100%
 
 # Main processing function with enhanced capabilities
-def process_certificate_file_enhanced(file_path: str, file_type: str) -> Dict:
-    """Enhanced certificate processing function"""
+def process_certificate_file_enhanced(file_path: str, file_type: str,
+                                      progress: Optional[ProgressCallback] = None,
+                                      quality: str = 'full',
+                                      deadline: Optional[Deadline] = None) -> Dict:
+    """Enhanced certificate processing function
     
-    ocr = EnhancedCertificateOCR()
+    progress, if given, is called as progress(event, data) while the file is
+    processed: 'ocr_variant', 'partial' and finally 'parsed'. quality 'fast'
+    recognises only the variant with the best track record instead of all of them.
+    Recognition stops when deadline passes; the result then has 'partial' set.
+    """
+    
+    ocr = get_engine('enhanced')
+    method_names = ocr.variant_order()[:1] if quality == 'fast' else None
     
     print(f"🔄 Processing {file_type.upper()} file: {file_path}")
     
     # Extract text based on file type
     if file_type.lower() == 'pdf':
-        ocr_result = ocr.extract_text_from_pdf(file_path)
+        # Stop OCRing scanned pages once the critical fields have turned up
+        ocr_result = ocr.extract_text_from_pdf(file_path, stop_when=ocr.has_critical_fields, progress=progress,
+                                               method_names=method_names, deadline=deadline)
         extracted_text = ocr_result['text']
         ocr_confidence = ocr_result['confidence']
     else:  # Image files
-        ocr_result = ocr.extract_text_from_image(file_path)
+        ocr_result = ocr.extract_text_from_image(file_path, progress, method_names, deadline)
         extracted_text = ocr_result['text']
         ocr_confidence = ocr_result['confidence']
     
@@ -467,7 +1034,11 @@ def process_certificate_file_enhanced(file_path: str, file_type: str) -> Dict:
     # Calculate overall confidence score
     final_confidence = ocr.calculate_confidence_score(details, ocr_confidence)
     
+    if ocr_result.get('partial'):
+        print(f"⏱️ Time budget of {deadline.seconds}s spent, returning the best partial result")
     print(f"✅ Processing complete! Final confidence: {final_confidence}%")
+    if progress:
+        progress('parsed', {'details': details, 'confidence_score': final_confidence})
     
     return {
         'extracted_text': extracted_text,
@@ -475,5 +1046,8 @@ def process_certificate_file_enhanced(file_path: str, file_type: str) -> Dict:
         'confidence_score': final_confidence,
         'ocr_confidence': ocr_confidence,
         'processing_method': 'enhanced_ocr',
-        'methods_tried': ocr_result.get('methods_tried', 1)
-    }
\ No newline at end of file
+        'methods_tried': ocr_result.get('methods_tried', 1),
+        'partial': ocr_result.get('partial', False)
+    }
+
+register_engine('enhanced', EnhancedCertificateOCR)
@@ -0,0 +1,230 @@
+import re
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional
+
+class FieldPattern:
+    """A compiled field regex plus the keywords that let it be skipped cheaply
+    
+    anchors: every match of the regex starts with one of these keywords, so the
+             regex only has to be tried at positions where a keyword was found.
+    requires: the regex cannot match unless one of these keywords occurs somewhere
+              in the text; otherwise it is searched normally.
+    Keywords are matched case-insensitively; the regex itself keeps its own flags.
+    """
+    
+    def __init__(self, pattern: str, flags: int = 0, anchors=None, requires=None):
+        self.regex = re.compile(pattern, flags)
+        self.anchors = tuple(keyword.lower() for keyword in anchors) if anchors else None
+        self.requires = tuple(keyword.lower() for keyword in requires) if requires else None
+
+class TextScan:
+    """Keyword positions found in one pass over a text"""
+    
+    def __init__(self, text: str, hits: Dict[str, List[int]]):
+        self.text = text
+        self.hits = hits
+        self._positions = {}
+    
+    def positions(self, pattern: FieldPattern) -> List[int]:
+        key = id(pattern)
+        if key not in self._positions:
+            merged = set()
+            for keyword in pattern.anchors:
+                merged.update(self.hits.get(keyword, ()))
+            self._positions[key] = sorted(merged)
+        return self._positions[key]
+    
+    def has_any(self, keywords) -> bool:
+        return any(self.hits.get(keyword) for keyword in keywords)
+
+class FieldExtractor:
+    """Field patterns compiled once and grouped by field, driven by a keyword prefilter
+    
+    scan() locates every keyword up front with plain substring searches. search() and finditer() then give
+    exactly the results of regex.search() and regex.finditer() on the whole text,
+    but only try the regex where one of its anchor keywords starts.
+    """
+    
+    def __init__(self, fields: Dict[str, List[FieldPattern]]):
+        self.fields = fields
+        
+        keywords = set()
+        for patterns in fields.values():
+            for pattern in patterns:
+                keywords.update(pattern.anchors or ())
+                keywords.update(pattern.requires or ())
+        
+        self._keywords = sorted(keywords)
+        # Fallback for texts whose length changes when lowercased (a few non-ASCII letters):
+        # there str.find positions would not line up with the original text
+        self._keyword_regexes = {keyword: re.compile(f'(?={re.escape(keyword)})', re.IGNORECASE)
+                                 for keyword in self._keywords}
+    
+    def patterns(self, field: str) -> List[FieldPattern]:
+        return self.fields[field]
+    
+    def scan(self, text: str) -> TextScan:
+        hits = defaultdict(list)
+        lowered = text.lower()
+        
+        if len(lowered) == len(text):
+            for keyword in self._keywords:
+                position = lowered.find(keyword)
+                while position != -1:
+                    hits[keyword].append(position)
+                    position = lowered.find(keyword, position + 1)
+        else:
+            for keyword, regex in self._keyword_regexes.items():
+                for match in regex.finditer(text):
+                    hits[keyword].append(match.start())
+        return TextScan(text, hits)
+    
+    def search(self, pattern: FieldPattern, scan: TextScan) -> Optional[re.Match]:
+        if pattern.requires and not scan.has_any(pattern.requires):
+            return None
+        if pattern.anchors is None:
+            return pattern.regex.search(scan.text)
+        
+        for position in scan.positions(pattern):
+            match = pattern.regex.match(scan.text, position)
+            if match:
+                return match
+        return None
+    
+    def finditer(self, pattern: FieldPattern, scan: TextScan) -> Iterator[re.Match]:
+        if pattern.requires and not scan.has_any(pattern.requires):
+            return
+        if pattern.anchors is None:
+            yield from pattern.regex.finditer(scan.text)
+            return
+        
+        # Same non-overlapping, left-to-right semantics as regex.finditer
+        end = 0
+        for position in scan.positions(pattern):
+            if position < end:
+                continue
+            match = pattern.regex.match(scan.text, position)
+            if match:
+                yield match
+                end = max(match.end(), position + 1)
+    
+    def findall(self, pattern: FieldPattern, scan: TextScan) -> list:
+        """Like re.findall: group 1 for single-group patterns, whole match for none"""
+        
+        groups = pattern.regex.groups
+        results = []
+        for match in self.finditer(pattern, scan):
+            if groups == 0:
+                results.append(match.group(0))
+            elif groups == 1:
+                results.append(match.group(1))
+            else:
+                results.append(match.groups())
+        return results
+
+# Patterns used by EnhancedCertificateOCR.parse_certificate_details, in priority order per field
+ENHANCED_EXTRACTOR = FieldExtractor({
+    'student_name': [
+        FieldPattern(r'(?:name|Name|NAME)[:\s]*([A-Z][a-zA-Z\s.]+?)(?:\s*(?:son|daughter|s/o|d/o|w/o)|\s*roll|\s*reg|\s*has|\s*is|\s*$)',
+                     re.IGNORECASE, anchors=['name']),
+        FieldPattern(r'(?:this is to certify that|certify that|certified that)\s*([A-Z][a-zA-Z\s.]+?)(?:\s*(?:son|daughter|s/o|d/o|w/o)|\s*roll|\s*reg|\s*has|\s*is)',
+                     re.IGNORECASE, anchors=['this is to certify that', 'certify that', 'certified that']),
+        FieldPattern(r'(?:mr\.|ms\.|miss|shri|smt\.?)\s*([A-Z][a-zA-Z\s.]+?)(?:\s*(?:son|daughter|s/o|d/o|w/o)|\s*roll|\s*reg|\s*has|\s*is)',
+                     re.IGNORECASE, anchors=['mr.', 'ms.', 'miss', 'shri', 'smt']),
+        FieldPattern(r'(?:student|candidate)\s*(?:name)?[:\s]*([A-Z][a-zA-Z\s.]+?)(?:\s*(?:roll|reg|has|is))',
+                     re.IGNORECASE, anchors=['student', 'candidate']),
+    ],
+    'certificate_number': [
+        FieldPattern(r'(?:certificate|cert|graduation)\s*(?:no|number|#)[:\s]*([A-Z0-9/-]+)',
+                     re.IGNORECASE, anchors=['cert', 'graduation']),
+        FieldPattern(r'(?:registration|reg)\s*(?:no|number|#)[:\s]*([A-Z0-9/-]+)',
+                     re.IGNORECASE, anchors=['reg']),
+        FieldPattern(r'(?:serial|sr)\s*(?:no|number|#)[:\s]*([A-Z0-9/-]+)',
+                     re.IGNORECASE, anchors=['serial', 'sr']),
+        FieldPattern(r'(?:diploma|degree)\s*(?:no|number|#)[:\s]*([A-Z0-9/-]+)',
+                     re.IGNORECASE, anchors=['diploma', 'degree']),
+        FieldPattern(r'(?:^|\s)([A-Z]{2,4}[\d/-]{4,})', re.IGNORECASE),  # Pattern like ABC123456 or XYZ/2023/001
+    ],
+    'roll_number': [
+        FieldPattern(r'(?:roll|Roll|ROLL)\s*(?:no|number|#)?[:\s]*([A-Z0-9]+)', anchors=['roll']),
+        FieldPattern(r'(?:student|Student|STUDENT)\s*(?:id|ID|no|number|#)[:\s]*([A-Z0-9]+)', anchors=['student']),
+        FieldPattern(r'(?:enrollment|Enrollment|ENROLLMENT)\s*(?:no|number|#)[:\s]*([A-Z0-9]+)', anchors=['enrollment']),
+        FieldPattern(r'(?:admission|Admission|ADMISSION)\s*(?:no|number|#)[:\s]*([A-Z0-9]+)', anchors=['admission']),
+    ],
+    'graduation_year': [
+        FieldPattern(r'(?:year|Year|YEAR|graduated|passed|completed)[:\s]*(\d{4})',
+                     anchors=['year', 'graduated', 'passed', 'completed']),
+        FieldPattern(r'(?:batch|Batch|BATCH)[:\s]*(?:of\s*)?(\d{4})', anchors=['batch']),
+        FieldPattern(r'(?:session|Session|SESSION)[:\s]*(\d{4})', anchors=['session']),
+        FieldPattern(r'(?:class|Class|CLASS)\s*(?:of\s*)?(\d{4})', anchors=['class']),
+    ],
+    'standalone_year': [
+        FieldPattern(r'\b(19[5-9]\d|20[0-4]\d)\b'),
+    ],
+    'course_name': [
+        FieldPattern(r'(Bachelor\s+of\s+[A-Za-z\s]+)', re.IGNORECASE, anchors=['bachelor']),
+        FieldPattern(r'(Master\s+of\s+[A-Za-z\s]+)', re.IGNORECASE, anchors=['master']),
+        FieldPattern(r'(B\.?Tech\.?\s*(?:in\s+)?[A-Za-z\s]*)', re.IGNORECASE, requires=['tech']),
+        FieldPattern(r'(M\.?Tech\.?\s*(?:in\s+)?[A-Za-z\s]*)', re.IGNORECASE, requires=['tech']),
+        FieldPattern(r'(B\.?Sc\.?\s*(?:in\s+)?[A-Za-z\s]*)', re.IGNORECASE, requires=['sc']),
+        FieldPattern(r'(M\.?Sc\.?\s*(?:in\s+)?[A-Za-z\s]*)', re.IGNORECASE, requires=['sc']),
+        FieldPattern(r'(B\.?Com\.?\s*[A-Za-z\s]*)', re.IGNORECASE, requires=['com']),
+        FieldPattern(r'(M\.?Com\.?\s*[A-Za-z\s]*)', re.IGNORECASE, requires=['com']),
+        FieldPattern(r'(B\.?A\.?\s*(?:in\s+)?[A-Za-z\s]*)', re.IGNORECASE),
+        FieldPattern(r'(M\.?A\.?\s*(?:in\s+)?[A-Za-z\s]*)', re.IGNORECASE),
+        FieldPattern(r'(Diploma\s+in\s+[A-Za-z\s]+)', re.IGNORECASE, anchors=['diploma']),
+        FieldPattern(r'(PhD\.?\s*(?:in\s+)?[A-Za-z\s]*)', re.IGNORECASE, anchors=['phd']),
+        FieldPattern(r'(Doctor\s+of\s+Philosophy\s*(?:in\s+)?[A-Za-z\s]*)', re.IGNORECASE, anchors=['doctor']),
+    ],
+    'cgpa_percentage': [
+        FieldPattern(r'(?:CGPA|cgpa|Cgpa)[:\s]*(\d+\.?\d*)', re.IGNORECASE, anchors=['cgpa']),
+        FieldPattern(r'(\d+\.?\d*)[:\s]*(?:CGPA|cgpa|Cgpa)', re.IGNORECASE, requires=['cgpa']),
+        FieldPattern(r'(?:percentage|Percentage|PERCENTAGE)[:\s]*(\d{2,3}\.?\d*)%?', re.IGNORECASE, anchors=['percentage']),
+        FieldPattern(r'(\d{2,3}\.?\d*)[:\s]*(?:%|percent|per cent)', re.IGNORECASE, requires=['%', 'percent', 'per cent']),
+        FieldPattern(r'(?:grade|Grade|GRADE)[:\s]*([A-F][+-]?|\d+\.?\d*)', re.IGNORECASE, anchors=['grade']),
+        FieldPattern(r'(?:marks|Marks|MARKS)[:\s]*(\d+\.?\d*)', re.IGNORECASE, anchors=['marks']),
+    ],
+    'issue_date': [
+        FieldPattern(r'(?:date|Date|DATE)[:\s]*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})', anchors=['date']),
+        FieldPattern(r'(?:issued|Issued|ISSUED)[:\s]*(?:on\s*)?(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})', anchors=['issued']),
+        FieldPattern(r'(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})', requires=['-', '/']),
+    ],
+})
+
+# Patterns used by CertificateOCR.parse_certificate_details, in priority order per field
+BASIC_EXTRACTOR = FieldExtractor({
+    'student_name': [
+        FieldPattern(r'(?:name|Name|NAME)[\s:]+([A-Z][a-zA-Z\s]+?)(?:\s|$)', anchors=['name']),
+        FieldPattern(r'(?:This is to certify that|certify that)\s+([A-Z][a-zA-Z\s]+?)(?:\s|,)',
+                     anchors=['this is to certify that', 'certify that']),
+        FieldPattern(r'(?:Mr\.|Ms\.|Miss)\s+([A-Z][a-zA-Z\s]+?)(?:\s|,)', anchors=['mr.', 'ms.', 'miss']),
+    ],
+    'certificate_number': [
+        FieldPattern(r'(?:Certificate|Cert|certificate)[\s#:No]+([A-Z0-9]+)', re.IGNORECASE, anchors=['cert']),
+        FieldPattern(r'(?:Registration|Reg)[\s#:No]+([A-Z0-9]+)', re.IGNORECASE, anchors=['reg']),
+        FieldPattern(r'(?:Serial|Sr)[\s#:No]+([A-Z0-9]+)', re.IGNORECASE, anchors=['serial', 'sr']),
+    ],
+    'roll_number': [
+        FieldPattern(r'(?:Roll|roll|ROLL)[\s#:No]+([A-Z0-9]+)', anchors=['roll']),
+        FieldPattern(r'(?:Student|student)[\s#:No]+([A-Z0-9]+)', anchors=['student']),
+        FieldPattern(r'(?:ID|id)[\s#:No]+([A-Z0-9]+)', anchors=['id']),
+    ],
+    'graduation_year': [
+        FieldPattern(r'(?:year|Year|YEAR)[\s:]+(\d{4})', anchors=['year']),
+        FieldPattern(r'(\d{4})(?:\s|$)'),
+        FieldPattern(r'(?:batch|Batch|BATCH)[\s:]+(\d{4})', anchors=['batch']),
+    ],
+    'course_name': [
+        FieldPattern(r'(?:Bachelor|Master|Diploma|PhD|B\.Tech|M\.Tech|B\.Sc|M\.Sc|B\.Com|M\.Com|B\.A|M\.A)',
+                     re.IGNORECASE, anchors=['bachelor', 'master', 'diploma', 'phd', 'b.tech', 'm.tech',
+                                             'b.sc', 'm.sc', 'b.com', 'm.com', 'b.a', 'm.a']),
+        FieldPattern(r'(?:Engineering|Medicine|Science|Arts|Commerce|Management)',
+                     re.IGNORECASE, anchors=['engineering', 'medicine', 'science', 'arts', 'commerce', 'management']),
+    ],
+    'cgpa_percentage': [
+        FieldPattern(r'(?:CGPA|cgpa)[\s:]+(\d+\.\d+)', re.IGNORECASE, anchors=['cgpa']),
+        FieldPattern(r'(\d+\.\d+)[\s]*(?:CGPA|cgpa)', re.IGNORECASE, requires=['cgpa']),
+        FieldPattern(r'(\d{2,3})[\s]*%', re.IGNORECASE, requires=['%']),
+        FieldPattern(r'(\d{2,3})[\s]*(?:percent|percentage)', re.IGNORECASE, requires=['percent']),
+    ],
+})
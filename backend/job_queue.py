@@ -0,0 +1,208 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import closing
+from typing import Callable, Dict, List, Optional
+
+class JobQueue:
+    """Durable FIFO of verification jobs in its own SQLite file
+    
+    Web processes enqueue and poll; OCR worker processes claim jobs one at a
+    time. A claim is a single BEGIN IMMEDIATE transaction, so two workers can
+    never take the same job. Jobs whose worker died mid-run are handed out
+    again after visibility_timeout seconds, up to max_attempts times.
+    
+    Workers also append progress events to a job (see reporter), which the web
+    process reads back in order to stream them to the client.
+    """
+    
+    STATUSES = ('queued', 'running', 'done', 'failed')
+    
+    def __init__(self, db_path: str, visibility_timeout: float = 600, max_attempts: int = 3):
+        self.db_path = db_path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        
+        self._ready = False
+    
+    def _connect(self) -> sqlite3.Connection:
+        if not self._ready:
+            self._create_schema()
+        
+        # Autocommit mode: transactions are opened explicitly where they matter
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+    
+    def _create_schema(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with closing(sqlite3.connect(self.db_path, timeout=30, isolation_level=None)) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL DEFAULT 'queued',
+                    payload TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    worker TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs (status, created_at)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS job_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    event TEXT NOT NULL,
+                    data TEXT,
+                    created_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS ix_job_events_job ON job_events (job_id, id)')
+        self._ready = True
+    
+    def enqueue(self, payload: Dict) -> str:
+        """Add a job and return its id"""
+        
+        job_id = uuid.uuid4().hex
+        with closing(self._connect()) as conn:
+            conn.execute('INSERT INTO jobs (id, payload, created_at) VALUES (?, ?, ?)',
+                         (job_id, json.dumps(payload, default=str), time.time()))
+        return job_id
+    
+    def claim(self, worker: str) -> Optional[Dict]:
+        """Atomically take the oldest runnable job, or None when the queue is empty"""
+        
+        now = time.time()
+        stale_before = now - self.visibility_timeout
+        
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Jobs that keep killing their worker are given up on
+                conn.execute('''
+                    UPDATE jobs SET status = 'failed', error = 'Worker stopped responding', finished_at = ?
+                    WHERE status = 'running' AND started_at < ? AND attempts >= ?
+                ''', (now, stale_before, self.max_attempts))
+                
+                row = conn.execute('''
+                    SELECT id, payload, attempts FROM jobs
+                    WHERE status = 'queued' OR (status = 'running' AND started_at < ?)
+                    ORDER BY created_at
+                    LIMIT 1
+                ''', (stale_before,)).fetchone()
+                
+                if row is None:
+                    conn.execute('COMMIT')
+                    return None
+                
+                conn.execute('''
+                    UPDATE jobs SET status = 'running', worker = ?, started_at = ?, attempts = attempts + 1
+                    WHERE id = ?
+                ''', (worker, now, row['id']))
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        
+        return {'id': row['id'], 'payload': json.loads(row['payload']), 'attempts': row['attempts'] + 1}
+    
+    def complete(self, job_id: str, result: Dict):
+        with closing(self._connect()) as conn:
+            conn.execute('''
+                UPDATE jobs SET status = 'done', result = ?, error = NULL, finished_at = ? WHERE id = ?
+            ''', (json.dumps(result, default=str), time.time(), job_id))
+    
+    def fail(self, job_id: str, error: str):
+        with closing(self._connect()) as conn:
+            conn.execute('''
+                UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?
+            ''', (error, time.time(), job_id))
+    
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Job status, result and timing; None for an unknown id"""
+        
+        with closing(self._connect()) as conn:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None:
+                return None
+            
+            job = dict(row)
+            job['payload'] = json.loads(job['payload'])
+            job['result'] = json.loads(job['result']) if job['result'] else None
+            
+            if job['status'] == 'queued':
+                job['queue_position'] = conn.execute('''
+                    SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at <= ?
+                ''', (job['created_at'],)).fetchone()[0]
+        
+        return job
+    
+    def add_event(self, job_id: str, event: str, data: Optional[Dict] = None) -> int:
+        """Append a progress event to a job; returns its id (increasing per queue)"""
+        
+        with closing(self._connect()) as conn:
+            cursor = conn.execute('INSERT INTO job_events (job_id, event, data, created_at) VALUES (?, ?, ?, ?)',
+                                  (job_id, event, json.dumps(data or {}, default=str), time.time()))
+            return cursor.lastrowid
+    
+    def events(self, job_id: str, after: int = 0) -> List[Dict]:
+        """A job's progress events with an id above after, oldest first"""
+        
+        with closing(self._connect()) as conn:
+            rows = conn.execute('''
+                SELECT id, event, data, created_at FROM job_events WHERE job_id = ? AND id > ? ORDER BY id
+            ''', (job_id, after)).fetchall()
+        return [dict(row, data=json.loads(row['data'])) for row in rows]
+    
+    def reporter(self, job_id: str) -> Callable[[str, Dict], None]:
+        """Progress callback that records events for job_id
+        
+        Reporting is best effort: a failed write is logged and never fails the job.
+        """
+        
+        def report(event: str, data: Optional[Dict] = None):
+            try:
+                self.add_event(job_id, event, data)
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not record '{event}' for job {job_id}: {e}")
+        
+        return report
+    
+    def depth(self) -> int:
+        """Number of jobs waiting to be claimed"""
+        
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+    
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per status"""
+        
+        with closing(self._connect()) as conn:
+            rows = conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall()
+        counts = {status: 0 for status in self.STATUSES}
+        counts.update({status: count for status, count in rows})
+        return counts
+    
+    def purge_finished(self, older_than: float) -> int:
+        """Delete done/failed jobs finished more than older_than seconds ago"""
+        
+        with closing(self._connect()) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            cutoff = time.time() - older_than
+            conn.execute('''
+                DELETE FROM job_events WHERE job_id IN (
+                    SELECT id FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?
+                )
+            ''', (cutoff,))
+            cursor = conn.execute('''
+                DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?
+            ''', (cutoff,))
+            conn.execute('COMMIT')
+            return cursor.rowcount
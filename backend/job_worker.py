@@ -0,0 +1,96 @@
+import atexit
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from typing import Callable, Dict
+
+from backend.job_queue import JobQueue
+
+def work(queue: JobQueue, handler: Callable[[Dict, Callable], Dict], stop_event=None,
+         poll_interval: float = 0.5, until_empty: bool = False) -> int:
+    """Claim and run jobs until stop_event is set (or the queue is empty with until_empty)
+    
+    handler receives a job's payload and a progress callback for that job
+    (JobQueue.reporter) and returns its result. Returns the number of jobs
+    processed.
+    """
+    
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    processed = 0
+    
+    try:
+        while stop_event is None or not stop_event.is_set():
+            job = queue.claim(worker_id)
+            if job is None:
+                if until_empty:
+                    break
+                if stop_event is not None:
+                    stop_event.wait(poll_interval)
+                else:
+                    time.sleep(poll_interval)
+                continue
+            
+            try:
+                queue.complete(job['id'], handler(job['payload'], queue.reporter(job['id'])))
+            except Exception as e:
+                print(f"❌ Job {job['id']} failed: {e}")
+                queue.fail(job['id'], str(e))
+            processed += 1
+    except KeyboardInterrupt:
+        pass
+    
+    return processed
+
+class JobWorkerPool:
+    """Supervised OCR worker processes draining the job queue
+    
+    target must be an importable function taking a stop event; it is run in
+    'spawn' processes that are restarted if they die. Workers are not daemonic
+    because they may start recognizer processes of their own.
+    """
+    
+    def __init__(self, target: Callable, size: int, check_interval: float = 5.0):
+        self.target = target
+        self.size = size
+        self.check_interval = check_interval
+        
+        self._context = multiprocessing.get_context('spawn')
+        self._stop = self._context.Event()
+        self._processes = []
+        self._watchdog = None
+    
+    def _spawn(self):
+        process = self._context.Process(target=self.target, args=(self._stop,), name='ocr-job-worker')
+        process.start()
+        return process
+    
+    def start(self):
+        self._processes = [self._spawn() for _ in range(self.size)]
+        self._watchdog = threading.Thread(target=self._supervise, daemon=True, name='ocr-job-watchdog')
+        self._watchdog.start()
+        atexit.register(self.stop)
+        print(f"✅ Started {self.size} OCR job worker(s)")
+    
+    def _supervise(self):
+        while not self._stop.wait(self.check_interval):
+            for i, process in enumerate(self._processes):
+                if not process.is_alive() and not self._stop.is_set():
+                    print(f"⚠️ OCR job worker {process.pid} exited ({process.exitcode}), restarting")
+                    self._processes[i] = self._spawn()
+    
+    def stop(self, timeout: float = 10):
+        """Ask workers to finish their current job and exit"""
+        
+        self._stop.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+
+if __name__ == '__main__':
+    # Standalone worker, for deployments that run OCR workers apart from the web process
+    from app_fixed import run_job_worker
+    run_job_worker()
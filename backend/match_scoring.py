@@ -0,0 +1,167 @@
+from functools import lru_cache
+from operator import attrgetter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Share of each field in a candidate's match score
+MATCH_WEIGHTS = {'name': 0.4, 'institution': 0.3, 'year': 0.2, 'course': 0.1}
+
+# Graduation years this far apart score 0
+YEAR_TOLERANCE = 5
+
+CANDIDATE_ATTRIBUTES = attrgetter('student_name', 'graduation_year', 'course_name', 'institution')
+
+# Below this many candidates the per-candidate loop is faster than building arrays
+BATCH_MIN_CANDIDATES = 32
+
+@lru_cache(maxsize=None)
+def _numpy():
+    """NumPy, or None when it is not installed
+    
+    Imported on first use so that loading the app does not pay for it;
+    NumPy comes with the OCR stack and the core app runs without it.
+    """
+    
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+def string_similarity(str1: str, str2: str) -> float:
+    """Jaccard similarity of the whitespace-separated words of two strings"""
+    
+    set1 = set(str1.split())
+    set2 = set(str2.split())
+    
+    intersection = len(set1 & set2)
+    union = len(set1 | set2)
+    
+    return intersection / union if union > 0 else 0.0
+
+def _field_values(certificate) -> Tuple:
+    """(student name, institution name, graduation year, course name) of a certificate"""
+    
+    institution = certificate.institution
+    return (certificate.student_name, institution.name if institution else None,
+            certificate.graduation_year, certificate.course_name)
+
+def score_candidate(certificate, details: Dict) -> Dict:
+    """Score one certificate against the extracted details, keeping the per-field breakdown
+    
+    The score is the weighted average (MATCH_WEIGHTS) of the fields present on both sides.
+    """
+    
+    student_name, institution_name, graduation_year, course_name = _field_values(certificate)
+    breakdown = {}
+    year_difference = None
+    
+    if details.get('student_name') and student_name:
+        breakdown['name'] = string_similarity(details['student_name'].lower(), student_name.lower())
+    
+    if details.get('institution_name') and institution_name:
+        breakdown['institution'] = string_similarity(details['institution_name'].lower(), institution_name.lower())
+    
+    if details.get('graduation_year') and graduation_year:
+        year_difference = abs(int(details['graduation_year']) - graduation_year)
+        breakdown['year'] = max(0, 1 - (year_difference / YEAR_TOLERANCE))
+    
+    if details.get('course_name') and course_name:
+        breakdown['course'] = string_similarity(details['course_name'].lower(), course_name.lower())
+    
+    total_weight = sum(MATCH_WEIGHTS[field] for field in breakdown)
+    score = sum(MATCH_WEIGHTS[field] * value for field, value in breakdown.items()) / total_weight if total_weight else 0.0
+    
+    return {
+        'certificate': certificate,
+        'score': score,
+        'breakdown': breakdown,
+        'year_difference': year_difference
+    }
+
+def _batch_similarity(values: Sequence[Optional[str]], query: str):
+    """string_similarity(query, value) for every value at once, and which values are non-empty
+    
+    Values repeat a lot (institutions, courses, common names), so each distinct value
+    is split once and its word-set size and words shared with the query are counted;
+    the per-candidate work is then an array lookup.
+    """
+    
+    np = _numpy()
+    query_words = set(query.lower().split())
+    distinct = [value for value in dict.fromkeys(values) if value]
+    words = list(map(str.split, map(str.lower, distinct)))
+    sizes = np.fromiter(map(len, map(set, words)), dtype=np.int64, count=len(distinct))
+    shared = np.fromiter(map(len, map(query_words.intersection, words)), dtype=np.int64, count=len(distinct))
+    union = sizes + len(query_words) - shared
+    
+    # One extra 0.0 at the end for the empty values
+    similarity = np.zeros(len(distinct) + 1)
+    np.divide(shared, union, out=similarity[:-1], where=union > 0)
+    
+    index = {value: i for i, value in enumerate(distinct)}
+    index[None] = index[''] = len(distinct)
+    codes = np.fromiter(map(index.__getitem__, values), dtype=np.int64, count=len(values))
+    return similarity[codes], codes < len(distinct)
+
+def _score_batch(certificates: Sequence, details: Dict, min_score: Optional[float]) -> List[Dict]:
+    """score_candidate() for every certificate, computed column-wise with NumPy"""
+    
+    np = _numpy()
+    student_names, years, course_names, institutions = zip(*map(CANDIDATE_ATTRIBUTES, certificates))
+    institution_names = {institution: institution.name if institution else None for institution in set(institutions)}
+    fields = {}
+    
+    if details.get('student_name'):
+        fields['name'] = _batch_similarity(student_names, details['student_name'])
+    
+    if details.get('institution_name'):
+        fields['institution'] = _batch_similarity(
+            list(map(institution_names.__getitem__, institutions)), details['institution_name'])
+    
+    year_difference = None
+    if details.get('graduation_year'):
+        years = np.array([year or 0 for year in years], dtype=np.int64)
+        present = years != 0
+        year_difference = np.abs(int(details['graduation_year']) - years)
+        fields['year'] = (np.maximum(0, 1 - (year_difference / YEAR_TOLERANCE)), present)
+    
+    if details.get('course_name'):
+        fields['course'] = _batch_similarity(course_names, details['course_name'])
+    
+    # Absent fields add exactly 0.0, so the sums match score_candidate() bit for bit
+    weighted = np.zeros(len(certificates))
+    total_weight = np.zeros(len(certificates))
+    for field, (values, present) in fields.items():
+        weighted += np.where(present, MATCH_WEIGHTS[field] * values, 0.0)
+        total_weight += np.where(present, MATCH_WEIGHTS[field], 0.0)
+    scores = np.divide(weighted, total_weight, out=np.zeros(len(certificates)), where=total_weight > 0)
+    
+    kept = range(len(certificates)) if min_score is None else np.flatnonzero(scores > min_score).tolist()
+    scores = scores.tolist()
+    columns = [(field, values.tolist(), present.tolist()) for field, (values, present) in fields.items()]
+    year_difference = year_difference.tolist() if year_difference is not None else None
+    candidates = []
+    for i in kept:
+        breakdown = {field: values[i] for field, values, present in columns if present[i]}
+        candidates.append({
+            'certificate': certificates[i],
+            'score': scores[i],
+            'breakdown': breakdown,
+            'year_difference': year_difference[i] if 'year' in breakdown else None
+        })
+    return candidates
+
+def score_candidates(certificates: Sequence, details: Dict, min_score: Optional[float] = None) -> List[Dict]:
+    """score_candidate() for each certificate, keeping those scoring above min_score
+    
+    Large candidate sets are scored in one NumPy pass when NumPy is installed;
+    either way the results are the same.
+    """
+    
+    if len(certificates) >= BATCH_MIN_CANDIDATES and _numpy() is not None:
+        return _score_batch(certificates, details, min_score)
+    
+    candidates = [score_candidate(certificate, details) for certificate in certificates]
+    if min_score is None:
+        return candidates
+    return [candidate for candidate in candidates if candidate['score'] > min_score]
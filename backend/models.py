@@ -80,6 +80,30 @@ class VerificationLog(db.Model):
     def __repr__(self):
         return f'<VerificationLog {self.certificate_number}>'
 
+class UploadBlob(db.Model):
+    """Stored upload content, kept once per SHA-256 under uploads/ab/cd/<sha256>"""
+    __tablename__ = 'upload_blobs'
+    
+    sha256 = db.Column(db.String(64), primary_key=True)
+    size_bytes = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Drives retention
+    
+    def __repr__(self):
+        return f'<UploadBlob {self.sha256[:12]}>'
+
+class UploadName(db.Model):
+    """Links an upload's stored filename (VerificationLog.uploaded_filename) to its blob"""
+    __tablename__ = 'upload_names'
+    
+    uploaded_filename = db.Column(db.String(200), primary_key=True)
+    blob_sha256 = db.Column(db.String(64), db.ForeignKey('upload_blobs.sha256'), nullable=False, index=True)
+    original_filename = db.Column(db.String(200))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<UploadName {self.uploaded_filename}>'
+
 class Admin(db.Model):
     """Admin User Model"""
     __tablename__ = 'admins'
@@ -0,0 +1,453 @@
+import heapq
+import itertools
+import re
+import threading
+import time
+from array import array
+from collections import Counter
+from typing import Any, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from backend.models import db, Certificate
+from backend.certificate_changes import CHANGE_LOG, install_change_log, last_change
+
+NON_LETTER_RE = re.compile(r'[^a-z ]+')
+SPACES_RE = re.compile(r' +')
+
+def normalize_name(name: str) -> str:
+    """Lowercase a name and keep only letters and single spaces"""
+    return SPACES_RE.sub(' ', NON_LETTER_RE.sub(' ', (name or '').lower())).strip()
+
+def word_trigrams(word: str) -> FrozenSet[str]:
+    """Trigrams of one word padded like pg_trgm: 'john' -> '  j', ' jo', 'joh', 'ohn', 'hn '"""
+    
+    padded = f"  {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+def name_trigrams(name: str) -> FrozenSet[str]:
+    """Union of the word trigrams of a name; similarity is the Jaccard index of these sets"""
+    
+    grams = set()
+    for word in normalize_name(name).split():
+        grams.update(word_trigrams(word))
+    return frozenset(grams)
+
+def trigram_similarity(grams1: FrozenSet[str], grams2: FrozenSet[str]) -> float:
+    if not grams1 or not grams2:
+        return 0.0
+    shared = len(grams1 & grams2)
+    return shared / (len(grams1) + len(grams2) - shared)
+
+# Most keys of the index maps hold a single entry, so it is stored bare and only
+# becomes a list when a second one arrives (a few million fewer containers)
+
+def _put(mapping: Dict, key, value):
+    current = mapping.get(key)
+    if current is None:
+        mapping[key] = value
+    elif type(current) is list:
+        current.append(value)
+    else:
+        mapping[key] = [current, value]
+
+def _take(mapping: Dict, key, value):
+    current = mapping[key]
+    if type(current) is list:
+        current.remove(value)
+        if len(current) == 1:
+            mapping[key] = current[0]
+    else:
+        del mapping[key]
+
+def _entries(mapping: Dict, key) -> List:
+    current = mapping.get(key)
+    if current is None:
+        return []
+    return current if type(current) is list else [current]
+
+class TrigramNameIndex:
+    """In-memory fuzzy index from student names to certificate ids
+    
+    Two levels keep lookups independent of the registry size:
+    
+    - the vocabulary of distinct name words, with a trigram inverted index over
+      it, turns each (possibly misread) query word into a few likely words
+      ("jhon" -> "john", "jon", ...);
+    - a dict from each name's sorted word-id tuple to its certificate ids turns
+      every combination of those words into candidate names with dict lookups.
+    
+    Only the distinct candidate names are scored (trigram Jaccard of the whole
+    name), so a common name costs no more than a rare one. Names with three or
+    more words are also reachable with one word left out, and a query with
+    three or more words is also tried with one word dropped, so a missing
+    middle name or a stray OCR token still finds the record.
+    """
+    
+    def __init__(self, word_candidates: int = 6, word_min_similarity: float = 0.2,
+                 max_combinations: int = 256):
+        self.word_candidates = word_candidates
+        self.word_min_similarity = word_min_similarity
+        self.max_combinations = max_combinations
+        self._lock = threading.RLock()
+        self._reset()
+    
+    def _reset(self):
+        # Vocabulary: word -> word id, plus per-id spelling, trigram count and usage
+        self._word_ids: Dict[str, int] = {}
+        self._words: List[str] = []
+        self._word_sizes: List[int] = []
+        self._word_uses: List[int] = []
+        self._word_postings: Dict[str, array] = {}
+        # Each word and its one-letter deletions -> word ids (edit distance 1 lookups)
+        self._deletions: Dict[str, Any] = {}
+        self._similar_cache: Dict[str, List[int]] = {}
+        
+        # Sorted word-id tuple -> certificate ids; with one word left out -> full tuples
+        self._keys: Dict[Tuple[int, ...], Any] = {}
+        self._partial_keys: Dict[Tuple[int, ...], Any] = {}
+        # Certificate id -> sorted word-id tuple
+        self._names: Dict[int, Tuple[int, ...]] = {}
+    
+    def __len__(self) -> int:
+        return len(self._names)
+    
+    def _word_id(self, word: str) -> int:
+        word_id = self._word_ids.get(word)
+        if word_id is None:
+            word_id = self._word_ids[word] = len(self._words)
+            grams = word_trigrams(word)
+            self._words.append(word)
+            self._word_sizes.append(len(grams))
+            self._word_uses.append(0)
+            for gram in grams:
+                postings = self._word_postings.get(gram)
+                if postings is None:
+                    postings = self._word_postings[gram] = array('I')
+                postings.append(word_id)
+            for variant in self._deletion_variants(word):
+                _put(self._deletions, variant, word_id)
+            # A new word can be a better match for cached lookups
+            self._similar_cache.clear()
+        return word_id
+    
+    @staticmethod
+    def _deletion_variants(word: str) -> Set[str]:
+        return {word} | {word[:i] + word[i + 1:] for i in range(len(word))} if len(word) > 1 else {word}
+    
+    @staticmethod
+    def _drop_one(key: Tuple[int, ...]) -> Set[Tuple[int, ...]]:
+        return {key[:i] + key[i + 1:] for i in range(len(key))}
+    
+    def add(self, certificate_id: int, name: str):
+        """Index (or re-index) one certificate's student name"""
+        
+        words = normalize_name(name).split()
+        with self._lock:
+            key = tuple(sorted(self._word_id(word) for word in words))
+            current = self._names.get(certificate_id)
+            if current == key:
+                return
+            if current is not None:
+                self._unlink(certificate_id, current)
+            if not key:
+                return
+            
+            self._names[certificate_id] = key
+            if key not in self._keys and len(key) >= 3:
+                for partial in self._drop_one(key):
+                    _put(self._partial_keys, partial, key)
+            _put(self._keys, key, certificate_id)
+            for word_id in key:
+                if not self._word_uses[word_id]:
+                    # A word back in use can be a better match for cached lookups
+                    self._similar_cache.clear()
+                self._word_uses[word_id] += 1
+    
+    def remove(self, certificate_id: int):
+        with self._lock:
+            key = self._names.get(certificate_id)
+            if key is not None:
+                self._unlink(certificate_id, key)
+    
+    def _unlink(self, certificate_id: int, key: Tuple[int, ...]):
+        del self._names[certificate_id]
+        _take(self._keys, key, certificate_id)
+        if key not in self._keys and len(key) >= 3:
+            for partial in self._drop_one(key):
+                _take(self._partial_keys, partial, key)
+        # Unused words stay in the vocabulary but are never suggested
+        for word_id in key:
+            self._word_uses[word_id] -= 1
+    
+    def clear(self):
+        with self._lock:
+            self._reset()
+    
+    def similar_words(self, word: str) -> List[int]:
+        """Ids of the vocabulary words most like `word`, best first
+        
+        Words within one edit (a misread, missing, extra or swapped letter) are
+        found by looking up the word's one-letter deletions, and ranked exact
+        match first, then by how many names use them, so a misread short word
+        resolves to the common spelling. Only a word with no such neighbour is
+        matched through the trigram index, ranked by trigram similarity.
+        """
+        
+        with self._lock:
+            cached = self._similar_cache.get(word)
+            if cached is not None:
+                return cached
+            
+            uses = self._word_uses
+            neighbours = set()
+            for variant in self._deletion_variants(word):
+                neighbours.update(_entries(self._deletions, variant))
+            exact = self._word_ids.get(word)
+            best = heapq.nlargest(
+                self.word_candidates,
+                (word_id for word_id in neighbours if uses[word_id]),
+                key=lambda word_id: (word_id == exact, uses[word_id])
+            )
+            
+            if not best:
+                grams = word_trigrams(word)
+                n = len(grams)
+                needed = self.word_min_similarity * n
+                counts = Counter()
+                for gram in grams:
+                    counts.update(self._word_postings.get(gram, ()))
+                
+                sizes = self._word_sizes
+                scored = [
+                    (hits / (n + sizes[word_id] - hits), uses[word_id], word_id)
+                    for word_id, hits in counts.items() if hits >= needed and uses[word_id]
+                ]
+                best = [
+                    word_id for similarity, _, word_id in heapq.nlargest(self.word_candidates, scored)
+                    if similarity >= self.word_min_similarity
+                ]
+            
+            if len(self._similar_cache) >= 10000:
+                self._similar_cache.clear()
+            self._similar_cache[word] = best
+            return best
+    
+    def _candidate_keys(self, choices: List[List[int]]) -> Tuple[Set[Tuple[int, ...]], Set[Tuple[int, ...]]]:
+        """Indexed names made of one suggested word per query word, and those with one more word"""
+        
+        per_word = max(1, int(self.max_combinations ** (1 / len(choices))))
+        keys, longer = set(), set()
+        for combination in itertools.product(*(words[:per_word] for words in choices)):
+            key = tuple(sorted(combination))
+            if key in self._keys:
+                keys.add(key)
+            longer.update(_entries(self._partial_keys, key))
+        return keys, longer
+    
+    def _certificates(self, scored: List[Tuple[float, Tuple[int, ...]]]) -> int:
+        return sum(len(_entries(self._keys, key)) for _, key in scored)
+    
+    def _score(self, query: FrozenSet[str], keys: Set[Tuple[int, ...]],
+               min_similarity: float) -> List[Tuple[float, Tuple[int, ...]]]:
+        """(similarity, key) for the candidate names similar enough to the query, best first"""
+        
+        scored = []
+        for key in keys:
+            grams = frozenset().union(*(word_trigrams(self._words[word_id]) for word_id in key))
+            similarity = trigram_similarity(query, grams)
+            if similarity >= min_similarity:
+                scored.append((similarity, key))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return scored
+    
+    def search(self, name: str, limit: int = 20, min_similarity: float = 0.3) -> List[Tuple[int, float]]:
+        """Top `limit` (certificate_id, similarity) pairs, best first"""
+        
+        words = normalize_name(name).split()
+        if not words:
+            return []
+        query = name_trigrams(name)
+        
+        with self._lock:
+            choices = [self.similar_words(word) for word in words]
+            keys, longer = self._candidate_keys(choices) if all(choices) else (set(), set())
+            scored = self._score(query, keys, min_similarity)
+            # Names with an extra word (a middle name the query lacks) only fill up the results:
+            # for a common first and last name there can be thousands of them
+            if longer and self._certificates(scored) < limit:
+                scored = self._score(query, keys | longer, min_similarity)
+            
+            if not scored and len(words) >= 3:
+                # Perhaps a stray token was read as part of the name
+                keys = set()
+                for i in range(len(words)):
+                    rest = choices[:i] + choices[i + 1:]
+                    if all(rest):
+                        keys.update(*self._candidate_keys(rest))
+                scored = self._score(query, keys, min_similarity)
+            
+            results = []
+            for similarity, key in scored:
+                for certificate_id in sorted(_entries(self._keys, key))[:limit - len(results)]:
+                    results.append((certificate_id, round(similarity, 4)))
+                if len(results) >= limit:
+                    break
+        
+        return results
+
+class CertificateNameIndex(TrigramNameIndex):
+    """Name index over the valid rows of the certificates table
+    
+    Built on first use (or at start-up with ensure_built) and kept current by
+    session events: certificates added, renamed, invalidated or deleted through
+    the ORM are applied when their transaction commits. Every refresh_interval
+    seconds the ids logged to certificate_number_changes since the last look
+    are reloaded, which covers other processes and statements that bypass the
+    ORM; a log pruned past that point means a rebuild. Without the log (not
+    SQLite) only rows inserted since the last look are picked up, by id.
+    """
+    
+    def __init__(self, refresh_interval: float = 5.0, **kwargs):
+        self.refresh_interval = refresh_interval
+        self._built = False
+        self._last_id = 0
+        # Position in the change log, None when there is no log
+        self._last_seq = None
+        self._last_refresh = 0.0
+        self._build_lock = threading.Lock()
+        super().__init__(**kwargs)
+    
+    @property
+    def built(self) -> bool:
+        return self._built
+    
+    def rebuild(self) -> int:
+        """(Re)load every valid certificate name; needs an app context"""
+        
+        with self._build_lock:
+            start = time.perf_counter()
+            with self._lock:
+                self._reset()
+                self._last_id = 0
+                # Read the log position first: changes after it are applied again, which is harmless
+                self._last_seq = self._log_position()
+                self._load_after(0)
+                self._built = True
+            self._last_refresh = time.monotonic()
+            print(f"✅ Name index built: {len(self)} certificates in {time.perf_counter() - start:.2f}s")
+        return len(self)
+    
+    def clear(self):
+        with self._lock:
+            self._reset()
+            self._built = False
+    
+    def ensure_built(self):
+        if not self._built:
+            with self._build_lock:
+                built = self._built
+            if not built:
+                self.rebuild()
+    
+    def _load_after(self, last_id: int):
+        rows = db.session.query(Certificate.id, Certificate.student_name).filter(
+            Certificate.id > last_id,
+            Certificate.is_valid == True
+        ).order_by(Certificate.id).yield_per(5000)
+        for certificate_id, student_name in rows:
+            self.add(certificate_id, student_name)
+            self._last_id = max(self._last_id, certificate_id)
+    
+    def _log_position(self) -> Optional[int]:
+        if not install_change_log():
+            return None
+        with db.engine.connect() as connection:
+            return last_change(connection)
+    
+    def _reload(self, connection, certificate_ids: Set[int]):
+        """Re-read the given certificates: valid ones are (re-)indexed, the rest removed"""
+        
+        certificate_ids = sorted(certificate_ids)
+        for start in range(0, len(certificate_ids), 500):
+            chunk = certificate_ids[start:start + 500]
+            names = dict(connection.execute(select(Certificate.id, Certificate.student_name).where(
+                Certificate.id.in_(chunk),
+                Certificate.is_valid == True
+            )).all())
+            for certificate_id in chunk:
+                if certificate_id in names:
+                    self.add(certificate_id, names[certificate_id])
+                    self._last_id = max(self._last_id, certificate_id)
+                else:
+                    self.remove(certificate_id)
+    
+    def refresh(self, force: bool = False):
+        """Apply the certificate changes other processes made since the last look"""
+        
+        if not force and time.monotonic() - self._last_refresh < self.refresh_interval:
+            return
+        self._last_refresh = time.monotonic()
+        if self._last_seq is None:
+            self._load_after(self._last_id)
+            return
+        
+        # Rows are read after the log on a fresh connection, so they are at least as new as it
+        with self._lock, db.engine.connect() as connection:
+            changes = connection.exec_driver_sql(
+                f'SELECT seq, certificate_id FROM {CHANGE_LOG} WHERE seq > ? ORDER BY seq',
+                (self._last_seq,)
+            ).all()
+            if not changes:
+                return
+            # Entries pruned before this process read them
+            missed = changes[0][0] > self._last_seq + 1
+            if not missed:
+                self._last_seq = changes[-1][0]
+                self._reload(connection, {certificate_id for _, certificate_id in changes if certificate_id is not None})
+        
+        if missed:
+            self.rebuild()
+    
+    def find(self, name: str, limit: int = 20, min_similarity: float = 0.3) -> List[Tuple[int, float]]:
+        """search() over an index that is built and up to date; needs an app context"""
+        
+        self.ensure_built()
+        self.refresh()
+        return self.search(name, limit, min_similarity)
+    
+    def apply(self, changes: Dict[int, Optional[str]]):
+        """Apply committed changes: id -> new name, or None for removed/invalid"""
+        
+        if not self._built:
+            return
+        for certificate_id, name in changes.items():
+            if name is None:
+                self.remove(certificate_id)
+            else:
+                self.add(certificate_id, name)
+                self._last_id = max(self._last_id, certificate_id)
+
+certificate_name_index = CertificateNameIndex()
+
+@event.listens_for(Session, 'after_flush')
+def _collect_certificate_changes(session, flush_context):
+    # The session still lists what it just flushed, now with primary keys assigned
+    changes = session.info.setdefault('certificate_name_changes', {})
+    for certificate in session.new | session.dirty:
+        if isinstance(certificate, Certificate) and certificate.id is not None:
+            changes[certificate.id] = certificate.student_name if certificate.is_valid is not False else None
+    for certificate in session.deleted:
+        if isinstance(certificate, Certificate) and certificate.id is not None:
+            changes[certificate.id] = None
+
+@event.listens_for(Session, 'after_commit')
+def _apply_certificate_changes(session):
+    changes = session.info.pop('certificate_name_changes', None)
+    if changes:
+        certificate_name_index.apply(changes)
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_certificate_changes(session):
+    session.info.pop('certificate_name_changes', None)
@@ -0,0 +1,145 @@
+import copy
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+class OCRResultCache:
+    """Two-tier cache of OCR results keyed by file content and OCR engine version
+    
+    Tier 1 is a bounded in-memory LRU; tier 2 is a directory of JSON files that is
+    trimmed (least recently used first) whenever it grows past max_disk_bytes.
+    """
+    
+    def __init__(self, cache_dir: str, max_memory_items: int = 256,
+                 max_disk_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.max_disk_bytes = max_disk_bytes
+        
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk_bytes = None
+        
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+    
+    @staticmethod
+    def make_key(file_hash: str, engine_version: str) -> str:
+        """Cache key for a file's SHA-256 under a specific OCR engine/config"""
+        return hashlib.sha256(f"{file_hash}:{engine_version}".encode()).hexdigest()
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+    
+    def get(self, key: str) -> Optional[Dict]:
+        """Return a cached OCR result, or None on a miss"""
+        
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats['memory_hits'] += 1
+                return copy.deepcopy(self._memory[key])
+        
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+            # Touch the file so disk eviction sees it as recently used
+            os.utime(path, None)
+        except (OSError, ValueError):
+            with self._lock:
+                self.stats['misses'] += 1
+            return None
+        
+        with self._lock:
+            self.stats['disk_hits'] += 1
+            self._remember(key, value)
+        return copy.deepcopy(value)
+    
+    def set(self, key: str, value: Dict):
+        """Store an OCR result in both tiers"""
+        
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._remember(key, value)
+        
+        try:
+            data = json.dumps(value, default=str).encode('utf-8')
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            
+            # Write atomically so concurrent readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"⚠️ Could not write OCR cache entry: {e}")
+            return
+        
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = self._scan_disk_usage()
+            else:
+                self._disk_bytes += len(data)
+            over_budget = self._disk_bytes > self.max_disk_bytes
+        
+        if over_budget:
+            self._evict_disk()
+    
+    def _remember(self, key: str, value: Dict):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+    
+    def _disk_entries(self):
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.json'):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_size, stat.st_mtime
+    
+    def _scan_disk_usage(self) -> int:
+        return sum(size for _, size, _ in self._disk_entries())
+    
+    def _evict_disk(self):
+        """Drop least recently used entries until the store is back under 90% of budget"""
+        
+        entries = sorted(self._disk_entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        target = self.max_disk_bytes * 0.9
+        
+        for path, size, _ in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+                with self._lock:
+                    self.stats['evictions'] += 1
+            except OSError:
+                continue
+        
+        with self._lock:
+            self._disk_bytes = total
+    
+    def clear(self):
+        """Empty both tiers"""
+        
+        with self._lock:
+            self._memory.clear()
+        for path, _, _ in list(self._disk_entries()):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = 0
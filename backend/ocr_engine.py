@@ -0,0 +1,368 @@
+import pytesseract
+from PIL import Image
+import numpy as np
+import importlib.util
+import multiprocessing
+import os
+import queue
+import shlex
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Keys returned by image_to_data, matching pytesseract.Output.DICT
+TSV_COLUMNS = ['level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+               'left', 'top', 'width', 'height', 'conf', 'text']
+
+class OCREngineError(Exception):
+    """Raised when a recognizer worker fails or dies"""
+
+class OCRTimeoutError(OCREngineError):
+    """Raised when a recognition call runs past its timeout (the call is killed)"""
+
+def parse_tesseract_config(config: str) -> Tuple[Optional[int], Optional[int], Dict[str, str]]:
+    """Split a tesseract CLI config string into (oem, psm, variables)"""
+    
+    oem = None
+    psm = None
+    variables = {}
+    
+    tokens = shlex.split(config or '', posix=True)
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == '--oem' and i + 1 < len(tokens):
+            oem = int(tokens[i + 1])
+            i += 1
+        elif token == '--psm' and i + 1 < len(tokens):
+            psm = int(tokens[i + 1])
+            i += 1
+        elif token == '-c' and i + 1 < len(tokens) and '=' in tokens[i + 1]:
+            key, value = tokens[i + 1].split('=', 1)
+            variables[key] = value
+            i += 1
+        i += 1
+    
+    return oem, psm, variables
+
+def tsv_to_dict(tsv: str) -> Dict[str, list]:
+    """Parse Tesseract TSV output into the pytesseract DICT layout"""
+    
+    data = {column: [] for column in TSV_COLUMNS}
+    
+    for line in tsv.splitlines():
+        fields = line.split('\t')
+        if len(fields) < len(TSV_COLUMNS) - 1 or fields[0] == 'level':
+            continue
+        # Rows without a word have no text column at all
+        if len(fields) == len(TSV_COLUMNS) - 1:
+            fields.append('')
+        for column, value in zip(TSV_COLUMNS, fields):
+            if column == 'text':
+                data[column].append(value)
+            elif column == 'conf':
+                data[column].append(float(value))
+            else:
+                data[column].append(int(value))
+    
+    return data
+
+def _as_array(image) -> np.ndarray:
+    """Normalise a PIL image or numpy array to a contiguous uint8 L/RGB array"""
+    
+    if isinstance(image, Image.Image):
+        if image.mode not in ('L', 'RGB'):
+            image = image.convert('RGB')
+        image = np.asarray(image)
+    
+    array = np.ascontiguousarray(image, dtype=np.uint8)
+    if array.ndim == 3 and array.shape[2] == 4:
+        array = np.ascontiguousarray(array[:, :, :3])
+    return array
+
+class PytesseractBackend:
+    """Recognizer that shells out to the tesseract binary for every call"""
+    
+    name = 'pytesseract'
+    
+    @staticmethod
+    def _run(function, image, timeout: Optional[float], **kwargs):
+        if timeout is not None and timeout <= 0:
+            raise OCRTimeoutError("No time left for recognition")
+        try:
+            # pytesseract kills the tesseract process once the timeout passes
+            return function(image, timeout=timeout or 0, **kwargs)
+        except RuntimeError as e:
+            if 'timeout' in str(e).lower():
+                raise OCRTimeoutError(str(e))
+            raise
+    
+    def image_to_data(self, image, config: str = '', lang: str = 'eng',
+                      timeout: Optional[float] = None) -> Dict[str, list]:
+        return self._run(pytesseract.image_to_data, image, timeout, lang=lang, config=config,
+                         output_type=pytesseract.Output.DICT)
+    
+    def image_to_string(self, image, config: str = '', lang: str = 'eng',
+                        timeout: Optional[float] = None) -> str:
+        return self._run(pytesseract.image_to_string, image, timeout, lang=lang, config=config)
+    
+    def close(self):
+        pass
+
+def _worker_main(conn, lang: str, tessdata: Optional[str]):
+    """Recognizer process: load the language data once and serve requests forever"""
+    
+    try:
+        import tesserocr
+        
+        apis = {}
+        
+        def get_api(oem):
+            # One engine per OCR engine mode, each keeping its traineddata loaded
+            if oem not in apis:
+                kwargs = {'lang': lang}
+                if tessdata:
+                    kwargs['path'] = tessdata
+                if oem is not None:
+                    kwargs['oem'] = tesserocr.OEM(oem)
+                apis[oem] = tesserocr.PyTessBaseAPI(**kwargs)
+            return apis[oem]
+        
+        get_api(None)
+        conn.send(('ready', None))
+    except Exception as e:
+        conn.send(('error', str(e)))
+        return
+    
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if message is None:
+            break
+        
+        kind, shape, config = message
+        buffer = conn.recv_bytes()
+        
+        try:
+            oem, psm, variables = parse_tesseract_config(config)
+            api = get_api(oem)
+            
+            # Remember current values so one request's whitelist does not leak into the next
+            previous = {key: api.GetVariableAsString(key) for key in variables}
+            for key, value in variables.items():
+                api.SetVariable(key, value)
+            api.SetPageSegMode(tesserocr.PSM(psm if psm is not None else 3))
+            
+            height, width = shape[0], shape[1]
+            channels = shape[2] if len(shape) == 3 else 1
+            api.SetImageBytes(buffer, width, height, channels, width * channels)
+            
+            if kind == 'data':
+                api.Recognize()
+                output = api.GetTSVText(0)
+            else:
+                output = api.GetUTF8Text()
+            
+            for key, value in previous.items():
+                if value is not None:
+                    api.SetVariable(key, value)
+            api.Clear()
+            
+            conn.send(('ok', output))
+        except Exception as e:
+            conn.send(('error', str(e)))
+    
+    for api in apis.values():
+        api.End()
+
+class _RecognizerWorker:
+    """Handle for one long-lived recognizer process and its pipe"""
+    
+    def __init__(self, context, lang: str, tessdata: Optional[str]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, lang, tessdata),
+                                       daemon=True, name='ocr-recognizer')
+        self.process.start()
+        child_conn.close()
+        
+        status, detail = self.conn.recv()
+        if status != 'ready':
+            self.stop()
+            raise OCREngineError(f"Recognizer failed to start: {detail}")
+    
+    def request(self, kind: str, array: np.ndarray, config: str, timeout: Optional[float] = None) -> str:
+        self.conn.send((kind, array.shape, config))
+        self.conn.send_bytes(memoryview(array).cast('B'))
+        if timeout is not None and not self.conn.poll(timeout):
+            raise OCRTimeoutError(f"Recognition did not finish within {timeout:.1f}s")
+        status, output = self.conn.recv()
+        if status != 'ok':
+            raise OCREngineError(output)
+        return output
+    
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+    
+    def stop(self, kill: bool = False):
+        """Ask the process to exit (kill=True: kill it at once, e.g. mid-recognition)"""
+        if kill:
+            self.process.kill()
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+class TesseractEnginePool:
+    """Pool of recognizer processes that keep Tesseract and its language data loaded"""
+    
+    name = 'tesserocr_pool'
+    
+    def __init__(self, size: Optional[int] = None, lang: str = 'eng', tessdata: Optional[str] = None):
+        self.size = size or (os.cpu_count() or 1)
+        self.lang = lang
+        self.tessdata = tessdata
+        self._context = multiprocessing.get_context('spawn')
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = 0
+        
+        # Start one worker eagerly so a broken install is detected up front
+        self._idle.put(self._spawn())
+    
+    def _spawn(self) -> _RecognizerWorker:
+        worker = _RecognizerWorker(self._context, self.lang, self.tessdata)
+        self._started += 1
+        return worker
+    
+    def _acquire(self, timeout: Optional[float] = None) -> _RecognizerWorker:
+        give_up_at = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if self._idle.empty() and self._started < self.size:
+                    return self._spawn()
+            wait = 0.5 if give_up_at is None else min(0.5, give_up_at - time.monotonic())
+            if wait <= 0:
+                raise OCRTimeoutError("No recognizer became free in time")
+            try:
+                return self._idle.get(timeout=wait)
+            except queue.Empty:
+                continue
+    
+    def _discard(self, worker: _RecognizerWorker, kill: bool = False):
+        # The next _acquire starts a replacement, so the pool keeps its size
+        worker.stop(kill)
+        with self._lock:
+            self._started -= 1
+    
+    def _call(self, kind: str, image, config: str, lang: str, timeout: Optional[float] = None) -> str:
+        if lang != self.lang:
+            raise OCREngineError(f"Pool is loaded with '{self.lang}', not '{lang}'")
+        if timeout is not None and timeout <= 0:
+            raise OCRTimeoutError("No time left for recognition")
+        
+        give_up_at = None if timeout is None else time.monotonic() + timeout
+        array = _as_array(image)
+        worker = self._acquire(timeout)
+        try:
+            remaining = None if give_up_at is None else max(0.0, give_up_at - time.monotonic())
+            output = worker.request(kind, array, config, remaining)
+        except OCRTimeoutError:
+            # The worker is still busy with the abandoned image: kill it, a fresh one replaces it
+            self._discard(worker, kill=True)
+            raise
+        except OCREngineError:
+            self._idle.put(worker)
+            raise
+        except (EOFError, OSError) as e:
+            self._discard(worker)
+            raise OCREngineError(f"Recognizer process failed: {e}")
+        
+        self._idle.put(worker)
+        return output
+    
+    def image_to_data(self, image, config: str = '', lang: str = 'eng',
+                      timeout: Optional[float] = None) -> Dict[str, list]:
+        return tsv_to_dict(self._call('data', image, config, lang, timeout))
+    
+    def image_to_string(self, image, config: str = '', lang: str = 'eng',
+                        timeout: Optional[float] = None) -> str:
+        return self._call('string', image, config, lang, timeout)
+    
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+
+# Common install locations probed when tesseract is not configured explicitly
+TESSERACT_PATHS = [
+    r'C:\Program Files\Tesseract-OCR\tesseract.exe',
+    r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
+    '/usr/bin/tesseract',
+    '/usr/local/bin/tesseract'
+]
+
+_tesseract_cmd = None
+_tesseract_lock = threading.Lock()
+
+def resolve_tesseract() -> str:
+    """Locate the tesseract binary once per process and point pytesseract at it"""
+    global _tesseract_cmd
+    
+    if _tesseract_cmd is not None:
+        return _tesseract_cmd
+    
+    with _tesseract_lock:
+        if _tesseract_cmd is None:
+            for path in TESSERACT_PATHS:
+                if os.path.exists(path):
+                    pytesseract.pytesseract.tesseract_cmd = path
+                    print(f"✅ Tesseract found at: {path}")
+                    break
+            else:
+                print("⚠️ Tesseract not found in common locations. Please ensure it's in PATH")
+            _tesseract_cmd = pytesseract.pytesseract.tesseract_cmd
+    
+    return _tesseract_cmd
+
+_backend = None
+_backend_lock = threading.Lock()
+
+def get_ocr_backend():
+    """Return the process-wide recognizer, preferring the persistent engine pool
+    
+    OCR_BACKEND selects 'pool', 'pytesseract' or 'auto' (the default: use the pool
+    when tesserocr is installed and fall back to pytesseract otherwise).
+    """
+    global _backend
+    
+    if _backend is not None:
+        return _backend
+    
+    with _backend_lock:
+        if _backend is None:
+            choice = os.environ.get('OCR_BACKEND', 'auto').lower()
+            backend = None
+            
+            if choice == 'pool' and importlib.util.find_spec('tesserocr') is None:
+                print("⚠️ OCR_BACKEND=pool needs the tesserocr package, using pytesseract")
+            elif choice in ('auto', 'pool') and importlib.util.find_spec('tesserocr') is not None:
+                try:
+                    backend = TesseractEnginePool(
+                        size=int(os.environ.get('OCR_POOL_SIZE', 0)) or None,
+                        tessdata=os.environ.get('TESSDATA_PREFIX')
+                    )
+                    print(f"✅ Tesseract engine pool started ({backend.size} workers)")
+                except Exception as e:
+                    print(f"⚠️ Tesseract engine pool unavailable, using pytesseract: {e}")
+            
+            _backend = backend or PytesseractBackend()
+    
+    return _backend
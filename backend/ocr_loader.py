@@ -0,0 +1,87 @@
+import importlib
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from backend.deadline import Deadline
+
+# OCR implementations in order of preference: (module, processing function)
+OCR_IMPLEMENTATIONS = [
+    ('backend.enhanced_ocr', 'process_certificate_file_enhanced'),
+    ('backend.ocr_utils', 'process_certificate_file'),
+]
+
+def _ocr_unavailable(filepath: str, file_type: str, progress: Optional[Callable] = None,
+                     quality: str = 'full', deadline: Optional[Deadline] = None) -> Dict:
+    return {
+        'extracted_text': 'OCR not available - please install tesseract',
+        'parsed_details': {
+            'student_name': None,
+            'certificate_number': None,
+            'institution_name': 'Manual entry required',
+            'graduation_year': None
+        },
+        'confidence_score': 0.0
+    }
+
+class LazyOCR:
+    """Loads the OCR stack (OpenCV, NumPy, Tesseract bindings, PDF readers) on first use
+    
+    Importing those libraries takes most of the app's start-up time, so processes
+    that never verify an upload (admin pages, institution API, static files) never
+    pay for them.
+    """
+    
+    def __init__(self, implementations: Optional[List[Tuple[str, str]]] = None):
+        self.implementations = implementations or OCR_IMPLEMENTATIONS
+        self.available = False
+        self.engine_version = 'unavailable'
+        self.module_name = None
+        self.load_seconds = None
+        
+        self._process = None
+        self._lock = threading.Lock()
+    
+    @property
+    def loaded(self) -> bool:
+        return self._process is not None
+    
+    def load(self) -> bool:
+        """Import the first OCR implementation that is installed; returns availability"""
+        
+        if self._process is not None:
+            return self.available
+        
+        with self._lock:
+            if self._process is None:
+                start = time.perf_counter()
+                process = None
+                
+                for module_name, function_name in self.implementations:
+                    try:
+                        module = importlib.import_module(module_name)
+                    except ImportError as e:
+                        print(f"Warning: {module_name} not available: {e}")
+                        continue
+                    
+                    process = getattr(module, function_name)
+                    self.engine_version = module.OCR_ENGINE_VERSION
+                    self.module_name = module_name
+                    self.available = True
+                    break
+                
+                self.load_seconds = time.perf_counter() - start
+                if process is None:
+                    print("Warning: No OCR functionality available")
+                    process = _ocr_unavailable
+                else:
+                    print(f"✅ OCR loaded from {self.module_name} in {self.load_seconds:.2f}s")
+                self._process = process
+        
+        return self.available
+    
+    def process_certificate_file(self, filepath: str, file_type: str,
+                                 progress: Optional[Callable[[str, Dict], None]] = None,
+                                 quality: str = 'full', deadline: Optional[Deadline] = None) -> Dict:
+        self.load()
+        return self._process(filepath, file_type, progress=progress, quality=quality, deadline=deadline)
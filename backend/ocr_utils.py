@@ -1,18 +1,30 @@
-import pytesseract
 from PIL import Image
 import PyPDF2
 import re
 import io
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterable, List, Optional
+
+from backend.ocr_engine import get_ocr_backend
+from backend.deadline import Deadline, NO_DEADLINE
+from backend.engine_registry import register_engine, get_engine
+from backend.field_extraction import BASIC_EXTRACTOR
+
+# Identifies this OCR pipeline in result cache keys.
+# Bump it whenever recognition settings or parsing change.
+OCR_ENGINE_VERSION = 'basic-ocr-1'
 
 class CertificateOCR:
     def __init__(self):
-        # Configure Tesseract path (adjust based on installation)
-        # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+        # The tesseract binary is located by backend.ocr_engine.resolve_tesseract()
         pass
     
-    def extract_text_from_image(self, image_path: str) -> str:
-        """Extract text from image using OCR"""
+    def warm_up(self):
+        """Run one tiny recognition so the recognizer is started before the first request"""
+        get_ocr_backend().image_to_string(Image.new('RGB', (64, 32), 'white'), lang='eng')
+        self.parse_certificate_details('Name: John Doe Roll No: 2019CS001')
+    
+    def extract_text_from_image(self, image_path: str, timeout: Optional[float] = None) -> str:
+        """Extract text from image using OCR (killed after timeout seconds)"""
         try:
             image = Image.open(image_path)
             # Convert to RGB if necessary
@@ -20,7 +32,7 @@ class CertificateOCR:
                 image = image.convert('RGB')
             
             # Use OCR to extract text
-            text = pytesseract.image_to_string(image, lang='eng')
+            text = get_ocr_backend().image_to_string(image, lang='eng', timeout=timeout)
             return text.strip()
         except Exception as e:
             print(f"Error in OCR extraction: {str(e)}")
@@ -55,75 +67,49 @@ class CertificateOCR:
         # Clean the text
         text = text.replace('\n', ' ').strip()
         
+        # Locate field keywords once; each pattern is only tried where it can match
+        extractor = BASIC_EXTRACTOR
+        scan = extractor.scan(text)
+        
         # Extract student name patterns
-        name_patterns = [
-            r'(?:name|Name|NAME)[\s:]+([A-Z][a-zA-Z\s]+?)(?:\s|$)',
-            r'(?:This is to certify that|certify that)\s+([A-Z][a-zA-Z\s]+?)(?:\s|,)',
-            r'(?:Mr\.|Ms\.|Miss)\s+([A-Z][a-zA-Z\s]+?)(?:\s|,)'
-        ]
-        for pattern in name_patterns:
-            match = re.search(pattern, text)
+        for pattern in extractor.patterns('student_name'):
+            match = extractor.search(pattern, scan)
             if match and not details['student_name']:
                 details['student_name'] = match.group(1).strip()
                 break
         
         # Extract certificate number
-        cert_patterns = [
-            r'(?:Certificate|Cert|certificate)[\s#:No]+([A-Z0-9]+)',
-            r'(?:Registration|Reg)[\s#:No]+([A-Z0-9]+)',
-            r'(?:Serial|Sr)[\s#:No]+([A-Z0-9]+)'
-        ]
-        for pattern in cert_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in extractor.patterns('certificate_number'):
+            match = extractor.search(pattern, scan)
             if match:
                 details['certificate_number'] = match.group(1).strip()
                 break
         
         # Extract roll number
-        roll_patterns = [
-            r'(?:Roll|roll|ROLL)[\s#:No]+([A-Z0-9]+)',
-            r'(?:Student|student)[\s#:No]+([A-Z0-9]+)',
-            r'(?:ID|id)[\s#:No]+([A-Z0-9]+)'
-        ]
-        for pattern in roll_patterns:
-            match = re.search(pattern, text)
+        for pattern in extractor.patterns('roll_number'):
+            match = extractor.search(pattern, scan)
             if match:
                 details['roll_number'] = match.group(1).strip()
                 break
         
         # Extract graduation year
-        year_patterns = [
-            r'(?:year|Year|YEAR)[\s:]+(\d{4})',
-            r'(\d{4})(?:\s|$)',
-            r'(?:batch|Batch|BATCH)[\s:]+(\d{4})'
-        ]
-        for pattern in year_patterns:
-            matches = re.findall(pattern, text)
+        for pattern in extractor.patterns('graduation_year'):
+            matches = extractor.findall(pattern, scan)
             for year in matches:
                 if 1950 <= int(year) <= 2030:  # Valid graduation year range
                     details['graduation_year'] = year
                     break
         
         # Extract course/degree information
-        degree_patterns = [
-            r'(?:Bachelor|Master|Diploma|PhD|B\.Tech|M\.Tech|B\.Sc|M\.Sc|B\.Com|M\.Com|B\.A|M\.A)',
-            r'(?:Engineering|Medicine|Science|Arts|Commerce|Management)'
-        ]
-        for pattern in degree_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in extractor.patterns('course_name'):
+            match = extractor.search(pattern, scan)
             if match:
                 details['course_name'] = match.group(0)
                 break
         
         # Extract CGPA/Percentage
-        grade_patterns = [
-            r'(?:CGPA|cgpa)[\s:]+(\d+\.\d+)',
-            r'(\d+\.\d+)[\s]*(?:CGPA|cgpa)',
-            r'(\d{2,3})[\s]*%',
-            r'(\d{2,3})[\s]*(?:percent|percentage)'
-        ]
-        for pattern in grade_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        for pattern in extractor.patterns('cgpa_percentage'):
+            match = extractor.search(pattern, scan)
             if match:
                 details['cgpa_percentage'] = match.group(1)
                 break
@@ -155,17 +141,34 @@ class CertificateOCR:
         final_score = (base_score * 0.6) + (critical_score * 0.4)
         
         return round(final_score, 2)
+    
+    def parse_certificate_details_batch(self, texts: Iterable[str]) -> List[Dict[str, Optional[str]]]:
+        """Parse many stored texts at once; identical texts are only parsed once"""
+        parsed = {}
+        results = []
+        for text in texts:
+            if text not in parsed:
+                parsed[text] = self.parse_certificate_details(text)
+            results.append(dict(parsed[text]))
+        return results
 
 # Usage example functions
-def process_certificate_file(file_path: str, file_type: str) -> Dict:
-    """Main function to process a certificate file"""
-    ocr = CertificateOCR()
+def process_certificate_file(file_path: str, file_type: str,
+                             progress: Optional[Callable[[str, Dict], None]] = None,
+                             quality: str = 'full', deadline: Optional[Deadline] = None) -> Dict:
+    """Main function to process a certificate file (progress gets a 'parsed' event)
+    
+    This engine makes a single pass either way, so quality is accepted and ignored.
+    The pass is killed when deadline passes, giving an empty 'partial' result.
+    """
+    ocr = get_engine('basic')
+    deadline = deadline or NO_DEADLINE
     
     # Extract text based on file type
     if file_type.lower() in ['pdf']:
         extracted_text = ocr.extract_text_from_pdf(file_path)
     else:  # Image files
-        extracted_text = ocr.extract_text_from_image(file_path)
+        extracted_text = ocr.extract_text_from_image(file_path, timeout=deadline.timeout())
     
     # Parse certificate details
     details = ocr.parse_certificate_details(extracted_text)
@@ -173,8 +176,14 @@ def process_certificate_file(file_path: str, file_type: str) -> Dict:
     # Calculate confidence score
     confidence = ocr.calculate_confidence_score(details)
     
+    if progress:
+        progress('parsed', {'details': details, 'confidence_score': confidence})
+    
     return {
         'extracted_text': extracted_text,
         'parsed_details': details,
-        'confidence_score': confidence
-    }
\ No newline at end of file
+        'confidence_score': confidence,
+        'partial': deadline.expired
+    }
+
+register_engine('basic', CertificateOCR)
@@ -0,0 +1,50 @@
+import threading
+from typing import Callable, Dict
+
+# OCR quality tiers understood by the process_certificate_file functions
+FULL = 'full'  # every preprocessing variant
+FAST = 'fast'  # only the variant with the best track record
+
+class QualityTierSelector:
+    """Chooses how much OCR effort an upload gets from the current backlog
+    
+    While fewer than fast_at_backlog uploads are waiting, every upload gets the
+    full multi-variant sweep. Under heavier load uploads take the single-variant
+    fast path, and only those whose confidence comes out below escalate_below
+    are run again in full. This keeps latency bounded at peaks without
+    returning weak results.
+    """
+    
+    def __init__(self, backlog: Callable[[], int], fast_at_backlog: int = 2,
+                 escalate_below: float = 60.0):
+        # backlog() is the number of uploads currently waiting for OCR
+        self.backlog = backlog
+        self.fast_at_backlog = fast_at_backlog
+        self.escalate_below = escalate_below
+        
+        self._lock = threading.Lock()
+        self.counters = {FULL: 0, FAST: 0, 'escalated': 0}
+    
+    def choose(self) -> str:
+        """Tier for the next upload; fast_at_backlog <= 0 always gives the full tier"""
+        
+        tier = FULL
+        if self.fast_at_backlog > 0 and self.backlog() >= self.fast_at_backlog:
+            tier = FAST
+        with self._lock:
+            self.counters[tier] += 1
+        return tier
+    
+    def should_escalate(self, ocr_result: Dict) -> bool:
+        """Whether a fast-tier result is too weak to return and needs the full tier"""
+        
+        escalate = ocr_result.get('confidence_score', 0) < self.escalate_below
+        if escalate:
+            with self._lock:
+                self.counters['escalated'] += 1
+        return escalate
+    
+    def stats(self) -> Dict:
+        with self._lock:
+            return dict(self.counters, fast_at_backlog=self.fast_at_backlog,
+                        escalate_below=self.escalate_below)
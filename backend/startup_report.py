@@ -0,0 +1,87 @@
+"""Break down the app's start-up time by imported module
+
+Runs a fresh interpreter with ``python -X importtime`` and summarises the result:
+
+    python -m backend.startup_report                 # what app_fixed costs to import
+    python -m backend.startup_report --with-ocr      # ... plus the lazily loaded OCR stack
+    python -m backend.startup_report --module app --top 20
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( +)(\S+)')
+
+def parse_importtime(output: str) -> List[Dict]:
+    """Parse -X importtime lines into dicts with module, depth, self_us and cumulative_us"""
+    
+    entries = []
+    for line in output.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append({
+                'module': module,
+                'depth': (len(indent) - 1) // 2,
+                'self_us': int(self_us),
+                'cumulative_us': int(cumulative_us)
+            })
+    return entries
+
+def measure_imports(module: str = 'app_fixed', with_ocr: bool = False) -> List[Dict]:
+    """Import module (and optionally the OCR stack) in a fresh interpreter and time it"""
+    
+    code = f"import {module}"
+    if with_ocr:
+        code += "\nimport backend.enhanced_ocr"
+    
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=PROJECT_ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+def summarize(entries: List[Dict], top: int = 15) -> Dict:
+    """Total import time, self time per top-level package and the slowest imports"""
+    
+    packages = defaultdict(int)
+    for entry in entries:
+        packages[entry['module'].split('.')[0]] += entry['self_us']
+    
+    return {
+        'total_ms': sum(entry['self_us'] for entry in entries) / 1000,
+        'packages': sorted(((name, us / 1000) for name, us in packages.items()),
+                           key=lambda item: item[1], reverse=True)[:top],
+        'slowest': sorted(((entry['module'], entry['cumulative_us'] / 1000) for entry in entries),
+                          key=lambda item: item[1], reverse=True)[:top]
+    }
+
+def print_report(summary: Dict):
+    print(f"⏱️ Total import time: {summary['total_ms']:.1f} ms\n")
+    
+    print("By package (self time):")
+    for name, ms in summary['packages']:
+        print(f"  {ms:9.1f} ms  {name}")
+    
+    print("\nSlowest imports (including their dependencies):")
+    for name, ms in summary['slowest']:
+        print(f"  {ms:9.1f} ms  {name}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--module', default='app_fixed', help='module to import (default: app_fixed)')
+    parser.add_argument('--with-ocr', action='store_true', help='also import the OCR stack')
+    parser.add_argument('--top', type=int, default=15, help='rows per table')
+    args = parser.parse_args()
+    
+    print_report(summarize(measure_imports(args.module, args.with_ocr), args.top))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from backend.models import db, UploadBlob, UploadName
+
+class UploadStore:
+    """Content-addressed upload storage: each distinct file is kept once as root/ab/cd/<sha256>
+    
+    The location follows from the hash, so storing or finding a file never lists a
+    directory, and two levels of 256-way fan-out keep every directory small.
+    """
+    
+    def __init__(self, root: str):
+        self.root = root
+    
+    def path_for(self, file_hash: str) -> str:
+        return os.path.join(self.root, file_hash[:2], file_hash[2:4], file_hash)
+    
+    def put(self, temp_path: str, file_hash: str) -> Tuple[str, bool]:
+        """Move a received file into the store; returns (blob path, whether it is new)
+        
+        temp_path must be on the same filesystem (it is consumed either way).
+        """
+        
+        path = self.path_for(file_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        
+        try:
+            # A hard link publishes the blob atomically and never replaces one that
+            # an upload of the same content already created
+            os.link(temp_path, path)
+            created = True
+        except FileExistsError:
+            created = False
+        except OSError:
+            # Filesystems without hard links
+            created = not os.path.exists(path)
+            if created:
+                os.replace(temp_path, path)
+                return path, True
+        
+        os.remove(temp_path)
+        return path, created
+    
+    def remove(self, file_hash: str) -> int:
+        """Delete a blob; returns the bytes freed"""
+        
+        path = self.path_for(file_hash)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return 0
+        return size
+    
+    def sweep_incoming(self, max_age_seconds: float) -> int:
+        """Delete partial uploads (.incoming-*.part) left behind by crashed requests"""
+        
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        try:
+            entries = list(os.scandir(self.root))
+        except OSError:
+            return 0
+        
+        for entry in entries:
+            if entry.name.startswith('.incoming-') and entry.name.endswith('.part'):
+                try:
+                    if entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                        removed += 1
+                except OSError:
+                    continue
+        return removed
+
+def record_upload(file_hash: str, uploaded_filename: str, original_filename: str, size_bytes: int):
+    """Index a stored upload: refresh its blob's last use and name it (needs an app context)"""
+    
+    name = UploadName(
+        uploaded_filename=uploaded_filename,
+        blob_sha256=file_hash,
+        original_filename=original_filename
+    )
+    
+    blob = db.session.get(UploadBlob, file_hash)
+    if blob is None:
+        db.session.add(UploadBlob(sha256=file_hash, size_bytes=size_bytes))
+    else:
+        blob.last_used_at = datetime.utcnow()
+    db.session.merge(name)
+    
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # A concurrent upload of the same content indexed the blob first
+        db.session.rollback()
+        UploadBlob.query.filter_by(sha256=file_hash).update({'last_used_at': datetime.utcnow()})
+        db.session.merge(name)
+        db.session.commit()
+
+def resolve_upload(store: UploadStore, uploaded_filename: str) -> Optional[str]:
+    """Path of the file behind a VerificationLog.uploaded_filename, if it is still kept"""
+    
+    name = db.session.get(UploadName, uploaded_filename)
+    if name is not None:
+        path = store.path_for(name.blob_sha256)
+    else:
+        # Uploads from before the content-addressed store were saved flat
+        path = os.path.join(store.root, uploaded_filename)
+    return path if os.path.exists(path) else None
+
+def collect_garbage(store: UploadStore, max_bytes: int, max_age: timedelta,
+                    min_age: timedelta = timedelta(days=1)) -> Dict[str, int]:
+    """Apply the retention budgets (needs an app context)
+    
+    Blobs unused for longer than max_age are deleted. If the rest still exceed
+    max_bytes, least recently used blobs go until usage is back under 90% of
+    it, but never one used within min_age (it may belong to a queued job).
+    """
+    
+    now = datetime.utcnow()
+    expired = UploadBlob.query.filter(UploadBlob.last_used_at < now - max_age).all()
+    victims = {blob.sha256 for blob in expired}
+    
+    total = db.session.query(func.coalesce(func.sum(UploadBlob.size_bytes), 0)).scalar()
+    total -= sum(blob.size_bytes for blob in expired)
+    
+    if total > max_bytes:
+        target = max_bytes * 0.9
+        candidates = UploadBlob.query.filter(
+            UploadBlob.last_used_at < now - min_age
+        ).order_by(UploadBlob.last_used_at).yield_per(500)
+        
+        for blob in candidates:
+            if total <= target:
+                break
+            if blob.sha256 not in victims:
+                victims.add(blob.sha256)
+                total -= blob.size_bytes
+    
+    bytes_freed = 0
+    for file_hash in victims:
+        bytes_freed += store.remove(file_hash)
+    
+    if victims:
+        UploadName.query.filter(UploadName.blob_sha256.in_(victims)).delete(synchronize_session=False)
+        UploadBlob.query.filter(UploadBlob.sha256.in_(victims)).delete(synchronize_session=False)
+        db.session.commit()
+    
+    return {
+        'blobs_removed': len(victims),
+        'bytes_freed': bytes_freed,
+        'partials_removed': store.sweep_incoming(3600)
+    }
+
+class UploadGarbageCollector(threading.Thread):
+    """Background thread that runs collect_garbage every interval seconds"""
+    
+    def __init__(self, app, store: UploadStore, interval: float, **budgets):
+        super().__init__(daemon=True, name='upload-gc')
+        self.app = app
+        self.store = store
+        self.interval = interval
+        self.budgets = budgets
+        self._stop_event = threading.Event()
+    
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                with self.app.app_context():
+                    stats = collect_garbage(self.store, **self.budgets)
+                if stats['blobs_removed'] or stats['partials_removed']:
+                    print(f"🧹 Upload GC removed {stats['blobs_removed']} file(s), "
+                          f"{stats['bytes_freed'] / (1024 * 1024):.1f}MB freed")
+            except Exception as e:
+                print(f"⚠️ Upload GC failed: {e}")
+    
+    def stop(self):
+        self._stop_event.set()
@@ -1,16 +1,252 @@
 from backend.models import Certificate, Institution, VerificationLog, db
-from typing import Dict, Tuple, Optional
+from backend.name_index import certificate_name_index
+from backend.certificate_changes import CHANGE_LOG, install_change_log, last_change
+from backend import certificate_fts
+from backend.match_scoring import score_candidates, string_similarity
+from typing import Dict, Iterable, List, Tuple, Optional
+from collections import OrderedDict
 from datetime import datetime
 import hashlib
+import itertools
+import math
+import os
 import re
-from sqlalchemy import or_
+import threading
+import time
+from sqlalchemy import event, or_
+from sqlalchemy.orm import Session, joinedload
+
+class BloomFilter:
+    """Set of strings with no false negatives and about error_rate false positives
+    
+    Sized for `capacity` keys; each key sets `hashes` bits chosen by double hashing
+    the two halves of hash(key). String hashes are salted per process, so the
+    bits mean nothing outside it. Keys cannot be removed.
+    """
+    
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(1, capacity)
+        self.size = max(64, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+    
+    def _positions(self, key: str) -> List[int]:
+        value = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = value & 0xFFFFFFFF, value >> 32 | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+    
+    def add(self, key: str):
+        self.update((key,))
+    
+    def update(self, keys: Iterable[str]):
+        bits, size, hashes = self.bits, self.size, range(self.hashes)
+        for value in map(hash, keys):
+            value &= 0xFFFFFFFFFFFFFFFF
+            h1, h2 = value & 0xFFFFFFFF, value >> 32 | 1
+            for i in hashes:
+                position = (h1 + i * h2) % size
+                bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+    
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] >> (position & 7) & 1 for position in self._positions(key))
+
+class CertificateNumberLookup:
+    """Valid certificates by number, without a query for unknown or recently seen numbers
+    
+    Most numbers that reach verification and do not exist come from forged or
+    misread certificates: a Bloom filter over the valid numbers turns those away
+    without touching the database. The last cache_size certificates found are
+    kept detached in an LRU and merged into the caller's session.
+    
+    SQLite triggers log every certificate insert, update and delete (and every
+    institution rename) to certificate_number_changes (see certificate_changes). Before a lookup, changes
+    logged since the last one are applied: their numbers go into the filter and
+    out of the LRU. The log is read at most every refresh_interval seconds, and
+    right away after a commit in this process that touched certificates or
+    institutions, so writes by other processes are seen within refresh_interval.
+    On other databases every lookup is a query.
+    """
+    
+    def __init__(self, cache_size: int = 10000, error_rate: float = 0.01,
+                 refresh_interval: float = 1.0, min_capacity: int = 100000, log_keep: int = 100000):
+        self.cache_size = cache_size
+        self.log_keep = log_keep
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.min_capacity = min_capacity
+        self._url = None
+        self._bloom = None
+        self._recent = OrderedDict()
+        self._last_seq = 0
+        self._last_refresh = 0.0
+        # Bumped whenever cached entries are dropped, so a load that raced a refresh is not cached
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()
+        self.counters = {'filtered': 0, 'cache_hits': 0, 'queries': 0, 'rebuilds': 0}
+    
+    @property
+    def built(self) -> bool:
+        return self._url is not None
+    
+    def rebuild(self) -> int:
+        """(Re)load every valid certificate number into a new filter; needs an app context"""
+        
+        with self._build_lock:
+            start = time.perf_counter()
+            url = str(db.engine.url)
+            if not install_change_log():
+                print("⚠️ Certificate number filter needs SQLite, looking numbers up in the database")
+                with self._lock:
+                    self._url, self._bloom = url, None
+                    self._recent.clear()
+                return 0
+            
+            # Read the log position first: changes after it are applied again, which is harmless
+            with db.engine.connect() as connection:
+                last_seq = last_change(connection)
+                count = connection.exec_driver_sql('SELECT COUNT(*) FROM certificates WHERE is_valid = 1').scalar()
+                bloom = BloomFilter(max(2 * count, self.min_capacity), self.error_rate)
+                numbers = connection.exec_driver_sql('SELECT certificate_number FROM certificates WHERE is_valid = 1')
+                bloom.update(certificate_number for (certificate_number,) in numbers)
+            
+            with self._lock:
+                self._url, self._bloom = url, bloom
+                self._recent.clear()
+                self._generation += 1
+                self._last_seq = last_seq
+                self._last_refresh = time.monotonic()
+                self.counters['rebuilds'] += 1
+            
+            # Processes more than log_keep changes behind find a gap in the log and rebuild too
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql(f'DELETE FROM {CHANGE_LOG} WHERE seq <= ?', (last_seq - self.log_keep,))
+            print(f"✅ Certificate number filter built: {bloom.count} numbers, "
+                  f"{len(bloom.bits) / 2 ** 20:.1f}MB in {time.perf_counter() - start:.2f}s")
+            return bloom.count
+    
+    def ensure_built(self):
+        url = str(db.engine.url)
+        if self._url != url:
+            with self._build_lock:
+                built = self._url == url
+            if not built:
+                self.rebuild()
+    
+    def clear(self):
+        with self._lock:
+            self._url, self._bloom = None, None
+            self._recent.clear()
+            self._generation += 1
+    
+    def invalidate(self):
+        """Read the change log before the next lookup"""
+        self._last_refresh = 0.0
+    
+    def refresh(self, force: bool = False):
+        """Apply the certificate changes logged since the last look"""
+        
+        if not force and time.monotonic() - self._last_refresh < self.refresh_interval:
+            return
+        with self._lock:
+            self._last_refresh = time.monotonic()
+            with db.engine.connect() as connection:
+                changes = connection.exec_driver_sql(
+                    f'SELECT seq, certificate_number FROM {CHANGE_LOG} WHERE seq > ? ORDER BY seq',
+                    (self._last_seq,)
+                ).all()
+            if not changes:
+                return
+            # Entries pruned before this process read them
+            missed = changes[0][0] > self._last_seq + 1
+            
+            self._generation += 1
+            self._last_seq = changes[-1][0]
+            for _, certificate_number in changes:
+                if certificate_number is None:
+                    self._recent.clear()
+                else:
+                    # The row may be valid now; a number that is not only costs a query
+                    self._bloom.add(certificate_number)
+                    self._recent.pop(certificate_number, None)
+            grown = self._bloom.count > self._bloom.capacity
+        
+        if missed or grown:
+            self.rebuild()
+    
+    def find(self, certificate_number: str) -> list:
+        """Valid certificates with this number, attached to db.session; needs an app context"""
+        
+        self.ensure_built()
+        # A concurrent rebuild or clear() may swap the filter at any point, so it is read
+        # once (after refresh, which can rebuild it); generation stays None without one
+        generation = None
+        if self._bloom is not None:
+            self.refresh()
+        bloom = self._bloom
+        if bloom is not None:
+            if certificate_number not in bloom:
+                self.counters['filtered'] += 1
+                return []
+            
+            with self._lock:
+                cached = self._recent.get(certificate_number)
+                if cached is not None:
+                    self._recent.move_to_end(certificate_number)
+                generation = self._generation
+            if cached is not None:
+                self.counters['cache_hits'] += 1
+                return [db.session.merge(certificate, load=False) for certificate in cached]
+        
+        self.counters['queries'] += 1
+        certificates = Certificate.query.options(joinedload(Certificate.institution)).filter(
+            Certificate.certificate_number == certificate_number,
+            Certificate.is_valid == True
+        ).all()
+        
+        if certificates and generation is not None:
+            # Detached copies, so commits and closes of db.session do not expire them
+            with Session() as scratch:
+                cached = [scratch.merge(certificate, load=False) for certificate in certificates]
+                scratch.expunge_all()
+            with self._lock:
+                if generation == self._generation:
+                    self._recent[certificate_number] = cached
+                    if len(self._recent) > self.cache_size:
+                        self._recent.popitem(last=False)
+        return certificates
+
+certificate_number_lookup = CertificateNumberLookup()
+
+@event.listens_for(Session, 'after_flush')
+def _note_certificate_writes(session, flush_context):
+    for instance in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(instance, (Certificate, Institution)):
+            session.info['certificates_written'] = True
+            return
+
+@event.listens_for(Session, 'after_commit')
+def _refresh_certificate_numbers(session):
+    if session.info.pop('certificates_written', False):
+        certificate_number_lookup.invalidate()
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_certificate_writes(session):
+    session.info.pop('certificates_written', None)
 
 class CertificateValidator:
     def __init__(self):
         self.validation_rules = {
             'name_similarity_threshold': 0.8,
             'year_range_tolerance': 2,
-            'min_confidence_score': 60.0
+            'min_confidence_score': 60.0,
+            # Fuzzy name lookup: top-K candidates and their minimum trigram similarity
+            'name_candidates': int(os.environ.get('NAME_CANDIDATES', 20000)),
+            'name_min_similarity': 0.3,
+            # 'index' (in-memory trigram index) or 'fts5' (SQLite full-text table)
+            'name_search': os.environ.get('CERTIFICATE_SEARCH', 'index').lower()
         }
     
     def validate_certificate(self, extracted_details: Dict, file_hash: str, 
@@ -113,111 +349,83 @@ class CertificateValidator:
         }
     
     def _find_database_matches(self, details: Dict) -> list:
-        """Find potential matches in the database"""
+        """Find potential matches in the database, each scored once
+        
+        Returns candidates as {'certificate', 'score', 'breakdown', 'year_difference'};
+        certificates come with their institution from the same query (or from
+        certificate_number_lookup without one).
+        """
         matches = []
         
         # Search by certificate number (exact match)
         if details.get('certificate_number'):
-            cert_matches = Certificate.query.filter(
-                Certificate.certificate_number == details['certificate_number'],
-                Certificate.is_valid == True
-            ).all()
-            matches.extend(cert_matches)
+            cert_matches = certificate_number_lookup.find(details['certificate_number'])
+            matches.extend(score_candidates(cert_matches, details))
         
         # Search by student name and other details
         if details.get('student_name') and not matches:
-            name_matches = Certificate.query.filter(
-                Certificate.student_name.ilike(f"%{details['student_name']}%"),
-                Certificate.is_valid == True
-            ).all()
-            
-            # Filter by additional criteria if available
-            filtered_matches = []
-            for match in name_matches:
-                score = self._calculate_match_score(match, details)
-                if score > 0.5:  # Minimum match threshold
-                    filtered_matches.append(match)
-            
-            matches.extend(filtered_matches)
+            matches.extend(score_candidates(
+                self._find_name_candidates(details),
+                details,
+                min_score=0.5  # Minimum match threshold
+            ))
         
         return matches
     
-    def _calculate_match_score(self, db_certificate: Certificate, extracted_details: Dict) -> float:
-        """Calculate similarity score between database record and extracted details"""
-        scores = []
-        
-        # Name similarity (using simple string comparison)
-        if extracted_details.get('student_name') and db_certificate.student_name:
-            name_similarity = self._string_similarity(
-                extracted_details['student_name'].lower(),
-                db_certificate.student_name.lower()
-            )
-            scores.append(name_similarity * 0.4)  # 40% weight for name
+    def _find_name_candidates(self, details: Dict) -> list:
+        """Valid certificates whose student name resembles the extracted one, best first"""
+        limit = self.validation_rules['name_candidates']
         
-        # Institution match
-        if extracted_details.get('institution_name') and db_certificate.institution:
-            inst_similarity = self._string_similarity(
-                extracted_details['institution_name'].lower(),
-                db_certificate.institution.name.lower()
-            )
-            scores.append(inst_similarity * 0.3)  # 30% weight for institution
-        
-        # Year match
-        if extracted_details.get('graduation_year') and db_certificate.graduation_year:
-            year_diff = abs(int(extracted_details['graduation_year']) - db_certificate.graduation_year)
-            year_score = max(0, 1 - (year_diff / 5))  # Allow 5 year tolerance
-            scores.append(year_score * 0.2)  # 20% weight for year
-        
-        # Course match
-        if extracted_details.get('course_name') and db_certificate.course_name:
-            course_similarity = self._string_similarity(
-                extracted_details['course_name'].lower(),
-                db_certificate.course_name.lower()
-            )
-            scores.append(course_similarity * 0.1)  # 10% weight for course
+        # Ranked BM25 query against the FTS5 mirror of the certificates table
+        if self.validation_rules['name_search'] == 'fts5' and certificate_fts.install():
+            return certificate_fts.search(details, limit)
         
-        return sum(scores) / len(scores) if scores else 0.0
+        # Trigram similarity through the in-memory index, which tolerates OCR errors
+        candidates = certificate_name_index.find(
+            details['student_name'],
+            limit=limit,
+            min_similarity=self.validation_rules['name_min_similarity']
+        )
+        if not candidates:
+            return []
+        rank = {certificate_id: i for i, (certificate_id, _) in enumerate(candidates)}
+        name_matches = Certificate.query.options(joinedload(Certificate.institution)).filter(
+            Certificate.id.in_(list(rank)),
+            Certificate.is_valid == True
+        ).all()
+        name_matches.sort(key=lambda match: rank[match.id])
+        return name_matches
     
     def _string_similarity(self, str1: str, str2: str) -> float:
         """Simple string similarity calculation"""
-        # Using Jaccard similarity for simplicity
-        set1 = set(str1.split())
-        set2 = set(str2.split())
-        
-        intersection = len(set1 & set2)
-        union = len(set1 | set2)
-        
-        return intersection / union if union > 0 else 0.0
+        return string_similarity(str1, str2)
     
     def _evaluate_matches(self, matches: list, extracted_details: Dict) -> Optional[Dict]:
-        """Evaluate database matches and return the best one"""
+        """Pick the best of the scored candidates from _find_database_matches"""
         if not matches:
             return None
         
-        best_match = None
-        highest_score = 0.0
-        
-        for match in matches:
-            score = self._calculate_match_score(match, extracted_details)
-            
-            if score > highest_score:
-                highest_score = score
-                best_match = {
-                    'certificate': match,
-                    'score': score,
-                    'status': self._determine_status(score),
-                    'confidence': score * 100,
-                    'details': {
-                        'matched_certificate': match.certificate_number,
-                        'matched_student': match.student_name,
-                        'matched_institution': match.institution.name,
-                        'matched_year': match.graduation_year,
-                        'match_score': score
-                    },
-                    'issues': self._identify_discrepancies(match, extracted_details)
-                }
+        best = max(matches, key=lambda candidate: candidate['score'])
+        if best['score'] <= 0.6:
+            return None
         
-        return best_match if highest_score > 0.6 else None
+        match = best['certificate']
+        score = best['score']
+        return {
+            'certificate': match,
+            'score': score,
+            'status': self._determine_status(score),
+            'confidence': score * 100,
+            'details': {
+                'matched_certificate': match.certificate_number,
+                'matched_student': match.student_name,
+                'matched_institution': match.institution.name,
+                'matched_year': match.graduation_year,
+                'match_score': score,
+                'score_breakdown': {field: round(value, 3) for field, value in best['breakdown'].items()}
+            },
+            'issues': self._identify_discrepancies(best, extracted_details)
+        }
     
     def _determine_status(self, score: float) -> str:
         """Determine validation status based on match score"""
@@ -230,8 +438,9 @@ class CertificateValidator:
         else:
             return 'Invalid'
     
-    def _identify_discrepancies(self, db_cert: Certificate, extracted: Dict) -> list:
+    def _identify_discrepancies(self, candidate: Dict, extracted: Dict) -> list:
         """Identify specific discrepancies between database and extracted data"""
+        db_cert = candidate['certificate']
         issues = []
         
         # Check name discrepancies
@@ -240,9 +449,8 @@ class CertificateValidator:
                 issues.append(f'Name mismatch: extracted "{extracted["student_name"]}" vs database "{db_cert.student_name}"')
         
         # Check year discrepancies
-        if extracted.get('graduation_year') and db_cert.graduation_year:
-            if abs(int(extracted['graduation_year']) - db_cert.graduation_year) > 1:
-                issues.append(f'Year mismatch: extracted "{extracted["graduation_year"]}" vs database "{db_cert.graduation_year}"')
+        if candidate['year_difference'] is not None and candidate['year_difference'] > 1:
+            issues.append(f'Year mismatch: extracted "{extracted["graduation_year"]}" vs database "{db_cert.graduation_year}"')
         
         # Check grade discrepancies (if available)
         if extracted.get('cgpa_percentage') and db_cert.cgpa_percentage:
@@ -272,6 +480,13 @@ class CertificateValidator:
         return log_entry
 
 # Helper function for quick validation
+def prepare_certificate_search():
+    """Build the certificate-number filter and the name search the validator is configured for (needs an app context)"""
+    certificate_number_lookup.ensure_built()
+    if CertificateValidator().validation_rules['name_search'] == 'fts5' and certificate_fts.install():
+        return
+    certificate_name_index.ensure_built()
+
 def validate_certificate_data(extracted_details: Dict, file_hash: str, 
                             uploaded_filename: str, user_ip: str = 'unknown') -> Dict:
     """Convenience function to validate certificate"""
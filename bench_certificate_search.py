@@ -0,0 +1,190 @@
+"""Compare the student-name candidate searches on synthetic registries
+
+Fills a throwaway SQLite database per size with certificates whose names follow a
+skewed (Zipf-like) distribution, then times the lookups the validator can make:
+
+    ilike  - the old Certificate.student_name.ilike('%name%') table scan
+    index  - the in-memory trigram name index (CERTIFICATE_SEARCH=index, the default)
+    fts5   - the BM25-ranked FTS5 query (CERTIFICATE_SEARCH=fts5)
+
+    python bench_certificate_search.py                          # 10k, 1M and 5M rows
+    python bench_certificate_search.py --rows 10000 100000 --queries 500
+"""
+
+import argparse
+import os
+import random
+import resource
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import date
+
+from flask import Flask
+
+from backend import certificate_fts
+from backend.models import db, Certificate
+from backend.name_index import certificate_name_index
+from backend.validation import CertificateValidator
+
+SYLLABLES = ['a', 'an', 'ar', 'ba', 'da', 'de', 'di', 'ga', 'ha', 'ja', 'ka', 'ki', 'ku', 'la', 'li',
+             'ma', 'mi', 'na', 'ni', 'pa', 'pr', 'ra', 'ri', 'ro', 'sa', 'sh', 'si', 'ta', 'ti', 'va',
+             'vi', 'ya', 'yo', 'za', 'ee', 'oo', 'th', 'ch', 'dr', 'nk', 'rm', 'sw', 'ty', 'gh', 'ul']
+
+INSERT_CERTIFICATE = (
+    "INSERT INTO certificates (id, certificate_number, student_name, roll_number, course_name,"
+    " graduation_year, issue_date, institution_id, is_valid) VALUES (?, ?, ?, ?, ?, ?, ?, ?, 1)"
+)
+
+def make_words(rng: random.Random, count: int, syllables: tuple) -> list:
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(*syllables))).capitalize())
+    return sorted(words)
+
+def make_names(rows: int, seed: int = 7) -> list:
+    """`rows` student names: first (+ middle for a quarter) + last name, common names far more common"""
+    
+    rng = random.Random(seed)
+    first = make_words(rng, 4000, (2, 3))
+    last = make_words(rng, 30000, (2, 4))
+    first_weights = [1 / (rank + 1) for rank in range(len(first))]
+    last_weights = [1 / (rank + 1) ** 0.8 for rank in range(len(last))]
+    
+    firsts = rng.choices(first, first_weights, k=rows)
+    middles = rng.choices(first, first_weights, k=rows)
+    lasts = rng.choices(last, last_weights, k=rows)
+    return [
+        f"{firsts[i]} {middles[i]} {lasts[i]}" if i % 4 == 0 else f"{firsts[i]} {lasts[i]}"
+        for i in range(rows)
+    ]
+
+def misread(rng: random.Random, name: str) -> str:
+    """The name with one letter replaced, as OCR might return it"""
+    
+    positions = [i for i, char in enumerate(name) if char != ' ']
+    i = rng.choice(positions)
+    return name[:i] + rng.choice('abcdefghijklmnopqrstuvwxyz') + name[i + 1:]
+
+def fill(names: list):
+    """Bulk-insert institutions and certificates (needs an app context)"""
+    
+    connection = db.engine.raw_connection()
+    try:
+        cursor = connection.cursor()
+        cursor.executemany(
+            "INSERT INTO institutions (id, name, code, is_active) VALUES (?, ?, ?, 1)",
+            [(i, f"Institute {i} of Technology", f"IT{i}") for i in range(1, 51)]
+        )
+        issue_date = date(2022, 6, 1).isoformat()
+        batch = []
+        for i, name in enumerate(names, start=1):
+            batch.append((i, f"BENCH{i:08d}", name, f"R{i:08d}", 'B.Tech', 2022, issue_date, i % 50 + 1))
+            if len(batch) == 50000:
+                cursor.executemany(INSERT_CERTIFICATE, batch)
+                batch = []
+        cursor.executemany(INSERT_CERTIFICATE, batch)
+        connection.commit()
+    finally:
+        connection.close()
+
+def time_queries(search, queries: list) -> dict:
+    """Latency percentiles (ms) and how often a certificate with the intended name was a candidate
+    
+    Namesakes cannot be told apart by name, so any of them counts.
+    """
+    
+    timings = []
+    found = 0
+    for expected, name in queries:
+        start = time.perf_counter()
+        candidates = search(name)
+        timings.append((time.perf_counter() - start) * 1000)
+        found += any(candidate.student_name == expected for candidate in candidates)
+        db.session.rollback()
+    timings.sort()
+    return {
+        'p50': statistics.median(timings),
+        'p95': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'found': found / len(queries)
+    }
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def bench(rows: int, query_count: int, scan_queries: int, workdir: str):
+    print(f"\n=== {rows:,} certificates ===")
+    path = os.path.join(workdir, f"bench_{rows}.db")
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    db.init_app(app)
+    
+    with app.app_context():
+        db.create_all()
+        start = time.perf_counter()
+        names = make_names(rows)
+        fill(names)
+        print(f"Loaded in {time.perf_counter() - start:.1f}s")
+        
+        rng = random.Random(rows)
+        sample = rng.sample(names, min(query_count, rows))
+        query_sets = {
+            'exact': [(name, name) for name in sample],
+            'misread': [(name, misread(rng, name)) for name in sample]
+        }
+        
+        validator = CertificateValidator()
+        validator.validation_rules['name_search'] = 'index'
+        rss = max_rss_mb()
+        start = time.perf_counter()
+        certificate_name_index.rebuild()
+        print(f"index build: {time.perf_counter() - start:.1f}s, ~{max_rss_mb() - rss:.0f}MB")
+        
+        start = time.perf_counter()
+        certificate_fts.install()
+        print(f"fts5 build:  {time.perf_counter() - start:.1f}s")
+        fts_validator = CertificateValidator()
+        fts_validator.validation_rules['name_search'] = 'fts5'
+        
+        searches = {
+            'ilike': lambda name: Certificate.query.filter(
+                Certificate.student_name.ilike(f"%{name}%"),
+                Certificate.is_valid == True
+            ).all(),
+            'index': lambda name: validator._find_name_candidates({'student_name': name}),
+            'fts5': lambda name: fts_validator._find_name_candidates({'student_name': name}),
+        }
+        
+        print(f"{'search':<8}{'queries':<10}{'p50 ms':>10}{'p95 ms':>10}{'found':>8}")
+        for label, search in searches.items():
+            for kind, queries in query_sets.items():
+                if label == 'ilike':
+                    queries = queries[:scan_queries]
+                stats = time_queries(search, queries)
+                print(f"{label:<8}{kind:<10}{stats['p50']:>10.3f}{stats['p95']:>10.3f}{stats['found']:>8.0%}")
+        
+        certificate_name_index.clear()
+        db.session.remove()
+        db.engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 1000000, 5000000],
+                        help='registry sizes to test (default: 10000 1000000 5000000)')
+    parser.add_argument('--queries', type=int, default=200, help='lookups per search and query kind')
+    parser.add_argument('--scan-queries', type=int, default=20,
+                        help='lookups for the ilike table scan, which is slow on large registries')
+    parser.add_argument('--dir', help='where to put the databases (default: a temporary directory)')
+    args = parser.parse_args()
+    
+    workdir = args.dir or tempfile.mkdtemp(prefix='certificate-search-')
+    try:
+        for rows in args.rows:
+            bench(rows, args.queries, args.scan_queries, workdir)
+    finally:
+        if not args.dir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
@@ -10,8 +10,10 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 try:
-    from app_fixed import app
+    from app_fixed import app, ocr_loader, start_job_workers, start_upload_gc
     from backend.models import db
+    from backend.validation import prepare_certificate_search
+    from backend.engine_registry import warm_engines, warmup_enabled
     print("✅ Successfully imported app and models")
 except ImportError as e:
     print(f"❌ Import error: {e}")
@@ -27,6 +29,18 @@ if __name__ == '__main__':
             
             db.create_all()
             print("✅ Database tables created successfully!")
+            
+            # Build the certificate-number filter and student-name search before the first verification needs them
+            prepare_certificate_search()
+        
+        # Load and warm the OCR engines before accepting traffic
+        # (API-only workers set OCR_WARMUP=0 and never import the OCR stack)
+        if warmup_enabled() and ocr_loader.load():
+            warm_engines()
+        
+        # Worker processes that drain POST /api/verify?async=1 jobs
+        start_job_workers()
+        start_upload_gc()
         
         # Get port from environment variable (Render will set this)
         port = int(os.environ.get('PORT', 10000))
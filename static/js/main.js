@@ -163,20 +163,23 @@ class AcademiaValidator {
             formData.append('certificate', this.selectedFile);
 
             // Show progress
-            this.updateProgress(10);
+            this.updateProgress(5);
+            this.showMessage('Uploading certificate...', 'info');
 
-            const response = await fetch('/api/verify', {
+            // Queue the verification and follow its progress instead of blocking on OCR
+            const response = await fetch('/api/verify?async=1', {
                 method: 'POST',
                 body: formData
             });
 
-            this.updateProgress(70);
-
-            if (!response.ok) {
+            if (!response.ok && response.status !== 202) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
 
-            const data = await response.json();
+            let data = await response.json();
+            if (response.status === 202 && data.job_id) {
+                data = await this.followJob(data);
+            }
             this.updateProgress(100);
 
             setTimeout(() => {
@@ -204,6 +207,108 @@ class AcademiaValidator {
         }
     }
 
+    // Resolve with the final result of a queued verification, showing its stages as they happen
+    followJob(job) {
+        if (!window.EventSource || !job.events_url) {
+            return this.pollJob(job.status_url);
+        }
+
+        return new Promise((resolve) => {
+            const source = new EventSource(job.events_url);
+            const progress = { percent: 10 };
+            const listen = (name, handler) => {
+                source.addEventListener(name, (e) => handler(JSON.parse(e.data)));
+            };
+
+            listen('status', (data) => {
+                if (data.status === 'queued') {
+                    this.showMessage(`Waiting for a free OCR worker (position ${data.queue_position})...`, 'info');
+                } else if (data.status === 'running') {
+                    this.setStage(progress, 20, 'Reading certificate...');
+                }
+            });
+            listen('hashed', () => this.setStage(progress, 10, 'Upload received, waiting for OCR...'));
+            listen('cache', (data) => {
+                if (data.hit) {
+                    this.setStage(progress, 70, 'Certificate seen before, reusing its OCR result...');
+                } else {
+                    this.setStage(progress, 25, 'Running OCR...');
+                }
+            });
+            listen('escalated', () => this.setStage(progress, 25, 'Low confidence, running a thorough OCR pass...'));
+            listen('ocr_variant', (data) => {
+                const page = data.page ? `page ${data.page}, ` : '';
+                this.setStage(progress, Math.min(progress.percent + 7, 70),
+                    `OCR pass '${data.method}' finished (${page}${data.confidence}% confidence)`);
+            });
+            listen('partial', (data) => {
+                const percent = data.source === 'page' ? 25 + Math.round(45 * data.page / data.page_count) : 70;
+                this.setStage(progress, percent, data.source === 'page'
+                    ? `Read page ${data.page} of ${data.page_count}...`
+                    : 'Read the PDF text layer...');
+                this.showPartialDetails(data.details);
+            });
+            listen('parsed', (data) => {
+                this.setStage(progress, 80, 'Details extracted, checking the certificate database...');
+                this.showPartialDetails(data.details);
+            });
+            listen('deadline_exceeded', () => this.setStage(progress, 80, 'OCR time limit reached, using the best result so far...'));
+            listen('matched', (data) => this.setStage(progress, 95, `Database check: ${data.status}`));
+            listen('result', (data) => {
+                source.close();
+                resolve(data);
+            });
+
+            // The stream was lost for good (EventSource retries transient drops itself)
+            source.onerror = () => {
+                if (source.readyState === EventSource.CLOSED) {
+                    resolve(this.pollJob(job.status_url));
+                }
+            };
+        });
+    }
+
+    async pollJob(statusUrl) {
+        while (true) {
+            const response = await fetch(statusUrl);
+            const data = await response.json();
+            if (!response.ok || data.status === 'done' || data.status === 'failed') {
+                return data;
+            }
+            await new Promise((resolve) => setTimeout(resolve, 1000));
+        }
+    }
+
+    setStage(progress, percent, message) {
+        // Never move the bar backwards, whatever order events arrive in
+        progress.percent = Math.max(progress.percent, percent);
+        this.updateProgress(progress.percent);
+        this.showMessage(message, 'info');
+    }
+
+    showPartialDetails(details) {
+        if (!details) return;
+
+        const statusElement = document.getElementById('verificationStatus');
+        if (statusElement) {
+            statusElement.textContent = 'Processing...';
+            statusElement.className = 'result-status';
+        }
+
+        this.updateResultField('studentName', details.student_name);
+        this.updateResultField('certNumber', details.certificate_number);
+        this.updateResultField('institution', details.institution_name);
+        this.updateResultField('gradYear', details.graduation_year);
+        this.updateResultField('course', details.course_name);
+        this.updateResultField('rollNumber', details.roll_number);
+        this.updateResultField('cgpaGrade', details.cgpa_percentage);
+
+        const results = document.getElementById('results');
+        if (results) {
+            results.style.display = 'block';
+        }
+    }
+
     startProcessing() {
         const verifyBtn = document.getElementById('verifyBtn');
         if (verifyBtn) {
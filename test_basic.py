@@ -7,11 +7,71 @@ Tests core functionality without requiring Tesseract OCR
 import sys
 import os
 import json
+import shutil
+import time
+from contextlib import contextmanager
 from datetime import datetime, date
 
 # Add the current directory to the Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+class FakeOCRLoader:
+    """Stands in for app_fixed.ocr_loader so the routes run without Tesseract"""
+    engine_version = 'test-ocr-1'
+    available = True
+    
+    def load(self):
+        return True
+
+def fake_ocr(filepath, file_type, progress=None, quality='full', deadline=None):
+    """process_certificate_file() result for a clean scan of a known certificate"""
+    if progress:
+        progress('parsed', {'details': {'student_name': 'Anjali Kumari'}, 'confidence_score': 85.0})
+    return {'confidence_score': 85.0, 'parsed_details': {'student_name': 'Anjali Kumari'}}
+
+@contextmanager
+def isolated_app(workdir, recognise=fake_ocr):
+    """app_fixed with its database, uploads, OCR cache and job queue inside workdir
+    
+    recognise replaces process_certificate_file; everything is put back afterwards.
+    """
+    import app_fixed
+    from sqlalchemy import create_engine
+    from backend.job_queue import JobQueue
+    from backend.models import db
+    from backend.name_index import certificate_name_index
+    from backend.ocr_cache import OCRResultCache
+    from backend.upload_store import UploadStore
+    from backend.validation import certificate_number_lookup
+    
+    app = app_fixed.app
+    saved_folder = app.config['UPLOAD_FOLDER']
+    saved_globals = {name: getattr(app_fixed, name) for name in
+                     ('upload_store', 'job_queue', 'ocr_cache', 'ocr_loader', 'process_certificate_file')}
+    
+    app.config['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+    app_fixed.upload_store = UploadStore(app.config['UPLOAD_FOLDER'])
+    app_fixed.job_queue = JobQueue(os.path.join(workdir, 'jobs.db'))
+    app_fixed.ocr_cache = OCRResultCache(os.path.join(workdir, 'ocr'))
+    app_fixed.ocr_loader = FakeOCRLoader()
+    app_fixed.process_certificate_file = recognise
+    with app.app_context():
+        # The engine was built from the config at import; point the app at a scratch database
+        engines = db.engines
+        saved_engine = engines[None]
+        engines[None] = create_engine(f"sqlite:///{os.path.join(workdir, 'app.db')}")
+        db.create_all()
+    try:
+        yield app_fixed
+    finally:
+        engines[None].dispose()
+        engines[None] = saved_engine
+        app.config['UPLOAD_FOLDER'] = saved_folder
+        for name, value in saved_globals.items():
+            setattr(app_fixed, name, value)
+        certificate_name_index.clear()
+        certificate_number_lookup.clear()
+
 def test_imports():
     """Test that all required modules can be imported"""
     print("Testing imports...")
@@ -41,12 +101,14 @@ def test_database_models():
     """Test database model creation"""
     print("\nTesting database models...")
     try:
+        import tempfile
         from flask import Flask
         from backend.models import db, Institution, Certificate
         
-        # Create a test Flask app
+        # Create a test Flask app (on a scratch database, not the tracked instance/test.db)
+        workdir = tempfile.mkdtemp()
         app = Flask(__name__)
-        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'test.db')}"
         app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
         
         db.init_app(app)
@@ -82,8 +144,9 @@ def test_database_models():
             print(f"✓ Certificate hash generated: {cert_hash[:16]}...")
             
         # Clean up test database
-        if os.path.exists('test.db'):
-            os.remove('test.db')
+        with app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
             
         return True
     except Exception as e:
@@ -124,6 +187,949 @@ def test_validation_logic():
         print(f"✗ Validation logic error: {e}")
         return False
 
+def test_ocr_cache():
+    """Test the two-tier OCR result cache"""
+    print("\nTesting OCR result cache...")
+    import tempfile
+    from backend.ocr_cache import OCRResultCache
+    
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = OCRResultCache(cache_dir, max_memory_items=1)
+        key = cache.make_key('a' * 64, 'test-engine-1')
+        
+        assert cache.get(key) is None
+        cache.set(key, {'extracted_text': 'John Doe', 'confidence_score': 80.0})
+        assert cache.get(key)['extracted_text'] == 'John Doe'
+        print("✓ Memory tier returns stored results")
+        
+        # Push the entry out of the memory tier; it must come back from disk
+        cache.set(cache.make_key('b' * 64, 'test-engine-1'), {'extracted_text': 'Other'})
+        assert cache.get(key)['confidence_score'] == 80.0
+        assert cache.stats['disk_hits'] == 1
+        print("✓ Disk tier survives memory eviction")
+        
+        assert cache.make_key('a' * 64, 'test-engine-2') != key
+        print("✓ Engine version is part of the cache key")
+    
+    return True
+
+def test_verify_cache_tiers():
+    """Test that only full-tier OCR results are reused for identical uploads"""
+    print("\nTesting OCR result caching by tier...")
+    import io
+    import tempfile
+    from backend.quality_tiers import QualityTierSelector, FAST, FULL
+    
+    backlog = [5]
+    with tempfile.TemporaryDirectory() as workdir, isolated_app(workdir) as app_fixed:
+        saved_tiers = app_fixed.quality_tiers
+        app_fixed.quality_tiers = QualityTierSelector(lambda: backlog[0], fast_at_backlog=1, escalate_below=0)
+        try:
+            with app_fixed.app.test_client() as client:
+                def verify():
+                    response = client.post('/api/verify', data={'certificate': (io.BytesIO(b'same scan'), 'scan.png')})
+                    body = response.get_json()
+                    return body['quality_tier'], body['cache_hit']
+                
+                assert verify() == (FAST, False)
+                assert verify() == (FAST, False)
+                print("✓ Fast-tier results are not cached")
+                
+                backlog[0] = 0
+                assert verify() == (FULL, False)
+                backlog[0] = 5
+                assert verify() == (FULL, True)
+                print("✓ A full sweep is cached and reused even under load")
+        finally:
+            app_fixed.quality_tiers = saved_tiers
+    
+    return True
+
+def test_pdf_page_pipeline():
+    """Test that closing the page generator early waits for pages still reading their pixmaps"""
+    print("\nTesting concurrent PDF page OCR...")
+    import threading
+    from contextlib import closing
+    try:
+        import fitz
+        from backend.enhanced_ocr import EnhancedCertificateOCR
+    except ImportError:
+        print("⚠️ PyMuPDF or OpenCV not installed, skipped")
+        return True
+    
+    doc = fitz.open()
+    for page_num in range(4):
+        doc.new_page().insert_text((72, 72), f"Certificate page {page_num}", fontsize=20)
+    
+    running = set()
+    finished = []
+    def recognise(img, progress=None, method_names=None, deadline=None):
+        running.add(threading.get_ident())
+        # The first page comes back quickly, the second is still being read when it does
+        time.sleep(0.05 if not finished and len(running) == 1 else 0.3)
+        finished.append(int(img.sum()))
+        running.discard(threading.get_ident())
+        return {'text': 'page', 'confidence': 90.0}
+    
+    ocr = EnhancedCertificateOCR(page_workers=2)
+    ocr.extract_text_from_image = recognise
+    with closing(ocr.iter_pdf_page_texts(doc)) as pages:
+        for page_num, result in pages:
+            break
+    assert page_num == 0 and not running
+    assert len(finished) == 2
+    doc.close()
+    print("✓ Early stop returns only after the running pages are done with their pixels")
+    
+    return True
+
+def test_field_extraction():
+    """Test that prefiltered field patterns behave like plain regex searches"""
+    print("\nTesting certificate field extraction...")
+    from backend.field_extraction import ENHANCED_EXTRACTOR
+    
+    text = "This is to certify that Priya Sharma has completed Roll No: 2019CS001 CGPA: 8.5 Year: 2019"
+    scan = ENHANCED_EXTRACTOR.scan(text)
+    
+    for field in ('student_name', 'roll_number', 'graduation_year', 'cgpa_percentage', 'course_name'):
+        for pattern in ENHANCED_EXTRACTOR.patterns(field):
+            expected = pattern.regex.search(text)
+            match = ENHANCED_EXTRACTOR.search(pattern, scan)
+            assert (match and match.span()) == (expected and expected.span())
+            assert ENHANCED_EXTRACTOR.findall(pattern, scan) == pattern.regex.findall(text)
+    print("✓ Prefiltered search matches re.search and re.findall")
+    
+    certify = ENHANCED_EXTRACTOR.patterns('student_name')[1]
+    assert ENHANCED_EXTRACTOR.search(certify, scan).group(1) == 'Priya Sharma'
+    assert ENHANCED_EXTRACTOR.search(certify, ENHANCED_EXTRACTOR.scan("no keywords here")) is None
+    print("✓ Patterns are skipped when their keyword is absent")
+    
+    return True
+
+def test_engine_registry():
+    """Test that OCR engines are built once and warmed on request"""
+    print("\nTesting OCR engine registry...")
+    from backend.engine_registry import register_engine, get_engine, warm_engines
+    
+    class DummyEngine:
+        built = 0
+        
+        def __init__(self):
+            DummyEngine.built += 1
+            self.warmed = False
+        
+        def warm_up(self):
+            self.warmed = True
+    
+    register_engine('test-dummy', DummyEngine)
+    engine = get_engine('test-dummy')
+    assert get_engine('test-dummy') is engine
+    assert DummyEngine.built == 1
+    print("✓ Engine is built once and shared")
+    
+    timings = warm_engines(['test-dummy'])
+    assert engine.warmed and 'test-dummy' in timings
+    print("✓ Warm-up runs on the shared engine")
+    
+    return True
+
+def test_lazy_ocr_loading():
+    """Test that the OCR stack is only imported when first needed"""
+    print("\nTesting lazy OCR loading...")
+    from backend.ocr_loader import LazyOCR
+    from backend.startup_report import parse_importtime
+    
+    loader = LazyOCR([('backend.no_such_ocr_module', 'process_certificate_file')])
+    assert not loader.loaded
+    result = loader.process_certificate_file('missing.png', 'png')
+    assert loader.loaded and not loader.available
+    assert result['confidence_score'] == 0.0 and loader.engine_version == 'unavailable'
+    print("✓ Falls back cleanly when no OCR implementation is installed")
+    
+    entries = parse_importtime("import time: self [us] | cumulative | imported package\n"
+                               "import time:       120 |        120 |   numpy.core\n"
+                               "import time:       300 |        420 | numpy\n")
+    assert [(e['module'], e['depth']) for e in entries] == [('numpy.core', 1), ('numpy', 0)]
+    print("✓ Start-up report parses -X importtime output")
+    
+    return True
+
+def test_verify_batch():
+    """Test the NDJSON batch endpoint: ZIP expansion, size limit and per-file errors"""
+    print("\nTesting batch verification endpoint...")
+    import io
+    import tempfile
+    import zipfile
+    
+    def recognise(filepath, file_type, progress=None, quality='full', deadline=None):
+        with open(filepath, 'rb') as f:
+            if f.read().startswith(b'crash'):
+                raise RuntimeError('OCR engine crashed')
+        return fake_ocr(filepath, file_type, progress, quality, deadline)
+    
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        zf.writestr('scans/b.png', b'scan b')
+        zf.writestr('scans/', b'')
+        zf.writestr('__MACOSX/scans/._b.png', b'metadata')
+        zf.writestr('c.jpg', b'scan c')
+        zf.writestr('huge.png', b'x' * 4096)
+    archive.seek(0)
+    
+    with tempfile.TemporaryDirectory() as workdir, isolated_app(workdir, recognise) as app_fixed:
+        app = app_fixed.app
+        saved_limit = app.config['MAX_CONTENT_LENGTH']
+        app.config['MAX_CONTENT_LENGTH'] = 1024
+        try:
+            with app.test_client() as client:
+                response = client.post('/api/verify/batch', data={'certificates': [
+                    (io.BytesIO(b'scan a'), 'a.png'),
+                    (io.BytesIO(b'notes'), 'notes.txt'),
+                    (archive, 'scans.zip'),
+                    (io.BytesIO(b'not a zip'), 'broken.zip'),
+                    (io.BytesIO(b'y' * 4096), 'big.png'),
+                    (io.BytesIO(b'crash please'), 'crash.png'),
+                ]})
+                body = response.get_data(as_text=True)
+        finally:
+            app.config['MAX_CONTENT_LENGTH'] = saved_limit
+    
+    assert response.status_code == 200 and response.mimetype == 'application/x-ndjson'
+    assert body.endswith('\n')
+    lines = [json.loads(line) for line in body.splitlines()]
+    assert sorted(line['index'] for line in lines) == list(range(8))
+    print("✓ One JSON line per file, each with its index")
+    
+    results = {line['filename']: line for line in lines}
+    assert set(results) == {'a.png', 'notes.txt', 'b.png', 'c.jpg', 'huge.png', 'broken.zip', 'big.png', 'crash.png'}
+    for name in ('a.png', 'b.png', 'c.jpg'):
+        assert results[name]['success'] and results[name]['validation_result']['status']
+    print("✓ ZIP archives are expanded, skipping folders and OS metadata")
+    
+    assert 'not allowed' in results['notes.txt']['error']
+    assert results['broken.zip']['error'] == 'Not a valid ZIP archive'
+    assert 'too large' in results['huge.png']['error'] and 'too large' in results['big.png']['error']
+    print("✓ Files and ZIP members over the per-file limit fail on their own")
+    
+    assert not results['crash.png']['success'] and 'error' in results['crash.png']
+    assert sum(line['success'] for line in lines) == 3
+    print("✓ A failing verification only fails its own line")
+    
+    return True
+
+def test_job_queue():
+    """Test the durable verification job queue"""
+    print("\nTesting verification job queue...")
+    import os
+    import tempfile
+    from backend.job_queue import JobQueue
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        queue = JobQueue(os.path.join(tmp_dir, 'jobs.db'), visibility_timeout=0, max_attempts=2)
+        first = queue.enqueue({'filename': 'a.png'})
+        second = queue.enqueue({'filename': 'b.png'})
+        assert queue.get(second)['queue_position'] == 2
+        
+        job = queue.claim('worker-1')
+        assert job['id'] == first and job['payload']['filename'] == 'a.png'
+        queue.complete(first, {'success': True})
+        assert queue.get(first)['status'] == 'done'
+        assert queue.get(first)['result'] == {'success': True}
+        print("✓ Jobs are claimed in order and keep their results")
+        
+        report = queue.reporter(first)
+        report('cache', {'hit': False})
+        report('parsed', {'confidence_score': 80.0})
+        events = queue.events(first)
+        assert [event['event'] for event in events] == ['cache', 'parsed']
+        assert events[0]['data'] == {'hit': False}
+        assert queue.events(first, after=events[0]['id'])[0]['event'] == 'parsed'
+        assert queue.events(second) == []
+        print("✓ Progress events are recorded per job, in order")
+        
+        # A claimed job whose worker vanished is handed out again, then given up on
+        assert queue.claim('worker-1')['id'] == second
+        assert queue.claim('worker-2')['attempts'] == 2
+        assert queue.claim('worker-3') is None
+        assert queue.get(second)['status'] == 'failed'
+        print("✓ Abandoned jobs are retried, then failed")
+    
+    return True
+
+def test_async_verification():
+    """Test ?async=1 queuing and the job's Server-Sent Events stream"""
+    print("\nTesting asynchronous verification and its event stream...")
+    import io
+    import tempfile
+    from backend.job_worker import work
+    
+    def parse_events(body):
+        events = []
+        for block in body.strip().split('\n\n'):
+            fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+            events.append((fields.get('id'), fields['event'], json.loads(fields['data'])))
+        return events
+    
+    with tempfile.TemporaryDirectory() as workdir, isolated_app(workdir) as app_fixed:
+        with app_fixed.app.test_client() as client:
+            response = client.post('/api/verify?async=1', data={'certificate': (io.BytesIO(b'queued scan'), 'scan.png')})
+            assert response.status_code == 202
+            job = response.get_json()
+            assert job['status'] == 'queued' and response.headers['Location'] == job['status_url']
+            assert client.get(job['status_url']).get_json()['queue_position'] == 1
+            print("✓ ?async=1 answers 202 with the job's status and event URLs")
+            
+            assert work(app_fixed.job_queue, app_fixed.process_verification_job, until_empty=True) == 1
+            
+            response = client.get(job['events_url'])
+            assert response.mimetype == 'text/event-stream'
+            events = parse_events(response.get_data(as_text=True))
+            names = [name for _, name, _ in events]
+            assert names[0] == 'hashed' and names[-1] == 'result'
+            assert {'cache', 'tier', 'parsed', 'matched'} <= set(names)
+            result = events[-1][2]
+            assert result['status'] == 'done' and result['filename'] == 'scan.png'
+            assert result == client.get(job['status_url']).get_json()
+            print("✓ A finished job streams its stage events, then a terminal result event")
+            
+            resumed = parse_events(client.get(job['events_url'], headers={'Last-Event-ID': events[0][0]}).get_data(as_text=True))
+            assert resumed == events[1:]
+            print("✓ Reconnecting with Last-Event-ID resumes after that event")
+            
+            assert client.get('/api/verify/missing/events').status_code == 404
+    
+    return True
+
+def test_upload_store():
+    """Test the content-addressed upload store"""
+    print("\nTesting upload store...")
+    import hashlib
+    import tempfile
+    from backend.upload_store import UploadStore
+    
+    with tempfile.TemporaryDirectory() as root:
+        store = UploadStore(root)
+        data = b'%PDF-1.4 test certificate'
+        file_hash = hashlib.sha256(data).hexdigest()
+        
+        paths = []
+        for _ in range(2):
+            temp_path = os.path.join(root, '.incoming-test.part')
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            paths.append(store.put(temp_path, file_hash))
+            assert not os.path.exists(temp_path)
+        
+        assert paths[0] == (os.path.join(root, file_hash[:2], file_hash[2:4], file_hash), True)
+        assert paths[1] == (paths[0][0], False)
+        print("✓ Identical uploads are stored once under ab/cd/<sha256>")
+        
+        assert store.remove(file_hash) == len(data)
+        assert not os.path.exists(paths[0][0])
+        print("✓ Blobs can be removed by hash")
+    
+    return True
+
+def test_upload_hashing():
+    """Test that uploads are hashed while parsed, deduplicated and size-checked"""
+    print("\nTesting upload hashing...")
+    import hashlib
+    import io
+    import tempfile
+    from werkzeug.exceptions import RequestEntityTooLarge
+    from backend.models import UploadBlob, UploadName
+    
+    with tempfile.TemporaryDirectory() as workdir, isolated_app(workdir) as app_fixed:
+        data = b'\x89PNG\r\n\x1a\n scanned certificate'
+        file_hash = hashlib.sha256(data).hexdigest()
+        
+        with app_fixed.app.test_client() as client:
+            for name in ('first.png', 'second.png'):
+                response = client.post('/api/verify', data={'certificate': (io.BytesIO(data), name)})
+                assert response.status_code == 200, response.get_json()
+                assert response.get_json()['file_hash'] == file_hash
+        
+        stored = [name for _, _, names in os.walk(app_fixed.upload_store.root) for name in names]
+        assert stored == [file_hash]
+        with app_fixed.app.app_context():
+            assert UploadBlob.query.count() == 1 and UploadName.query.count() == 2
+        print("✓ The digest is computed while parsing and identical uploads are stored once")
+        
+        upload = app_fixed.HashingUploadFile(app_fixed.app.config['UPLOAD_FOLDER'])
+        upload.write(data)
+        try:
+            app_fixed.receive_upload(upload, max_bytes=len(data) - 1)
+            assert False, 'oversized upload accepted'
+        except RequestEntityTooLarge:
+            pass
+        assert not os.path.exists(upload.path)
+        assert app_fixed.receive_upload(app_fixed.HashingUploadFile(workdir), max_bytes=0)[1] == hashlib.sha256().hexdigest()
+        print("✓ Parsed uploads over max_bytes are rejected and deleted")
+    
+    return True
+
+def test_upload_gc():
+    """Test upload retention: expired unnamed blobs go, recently used named ones stay"""
+    print("\nTesting upload garbage collection...")
+    import hashlib
+    import tempfile
+    from datetime import datetime, timedelta
+    from flask import Flask
+    from backend.models import db, UploadBlob, UploadName
+    from backend.upload_store import UploadStore, UploadGarbageCollector, collect_garbage, record_upload
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'gc.db')}"
+        db.init_app(app)
+        store = UploadStore(workdir)
+        
+        def stored(data: bytes) -> str:
+            file_hash = hashlib.sha256(data).hexdigest()
+            temp_path = os.path.join(store.root, '.incoming-test.part')
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            store.put(temp_path, file_hash)
+            return file_hash
+        
+        with app.app_context():
+            db.create_all()
+            orphan = stored(b'orphaned upload')
+            db.session.add(UploadBlob(sha256=orphan, size_bytes=15,
+                                      last_used_at=datetime.utcnow() - timedelta(days=100)))
+            db.session.commit()
+            kept = stored(b'referenced upload')
+            record_upload(kept, 'kept.png', 'certificate.png', 17)
+            
+            stats = collect_garbage(store, max_bytes=10 ** 9, max_age=timedelta(days=90))
+            assert stats['blobs_removed'] == 1 and stats['bytes_freed'] == 15
+            assert not os.path.exists(store.path_for(orphan))
+            assert db.session.get(UploadBlob, orphan) is None
+            assert os.path.exists(store.path_for(kept))
+            assert db.session.get(UploadName, 'kept.png').blob_sha256 == kept
+            print("✓ Expired unnamed blob deleted, referenced blob and its name kept")
+            
+            # The background collector applies the same budgets on its interval
+            db.session.query(UploadBlob).update({'last_used_at': datetime.utcnow() - timedelta(days=100)})
+            db.session.commit()
+            collector = UploadGarbageCollector(app, store, 0.05, max_bytes=10 ** 9, max_age=timedelta(days=90))
+            collector.start()
+            deadline = time.time() + 5
+            while os.path.exists(store.path_for(kept)) and time.time() < deadline:
+                time.sleep(0.05)
+            collector.stop()
+            collector.join(5)
+            assert not os.path.exists(store.path_for(kept))
+            assert UploadName.query.count() == 0
+            print("✓ Background collector removes blobs once they expire")
+            
+            db.session.remove()
+            db.engine.dispose()
+    
+    return True
+
+def test_admission_control():
+    """Test OCR admission control"""
+    print("\nTesting OCR admission control...")
+    import math
+    import time
+    import threading
+    from backend.admission import AdmissionController, OverloadedError
+    
+    admission = AdmissionController(1, max_queue=1, max_wait=30, initial_service_time=10)
+    admission.acquire()
+    
+    # The expected wait (one 10s run) is longer than this caller will wait
+    try:
+        admission.acquire(max_wait=5)
+        assert False, "expected the request to be rejected"
+    except OverloadedError as e:
+        assert e.retry_after == 10
+    print("✓ Requests that would miss their deadline are rejected with Retry-After")
+    
+    waiter = threading.Thread(target=lambda: admission.acquire(max_wait=math.inf))
+    waiter.start()
+    while admission.stats()['queue_depth'] == 0:
+        time.sleep(0.01)
+    try:
+        admission.acquire()
+        assert False, "expected the queue to be full"
+    except OverloadedError:
+        pass
+    
+    admission.release(2.0)
+    waiter.join(5)
+    stats = admission.stats()
+    assert stats['active'] == 1 and stats['queue_depth'] == 0
+    assert stats['rejected_deadline'] == 1 and stats['rejected_queue_full'] == 1
+    assert stats['service_time'] == 8.4
+    print("✓ Waiters are admitted in turn and the counters are exposed")
+    
+    from backend.quality_tiers import QualityTierSelector, FAST, FULL
+    backlog = [0]
+    tiers = QualityTierSelector(lambda: backlog[0], fast_at_backlog=2, escalate_below=60)
+    assert tiers.choose() == FULL
+    backlog[0] = 3
+    assert tiers.choose() == FAST
+    assert tiers.should_escalate({'confidence_score': 45.0})
+    assert not tiers.should_escalate({'confidence_score': 75.0})
+    assert tiers.stats()['escalated'] == 1
+    print("✓ Busy periods use the fast OCR tier, escalating weak results")
+    
+    return True
+
+def test_deadline():
+    """Test per-verification OCR time budgets"""
+    print("\nTesting OCR deadlines...")
+    from PIL import Image
+    from backend.deadline import Deadline
+    from backend.ocr_engine import OCRTimeoutError, PytesseractBackend
+    
+    assert Deadline().timeout() is None and not Deadline().expired
+    assert 0 < Deadline(30).timeout() <= 30
+    spent = Deadline(0)
+    assert spent.expired and spent.remaining() == 0
+    print("✓ Deadlines report their remaining budget")
+    
+    try:
+        PytesseractBackend().image_to_string(Image.new('RGB', (8, 8)), timeout=spent.timeout())
+        assert False, "expected a timeout"
+    except OCRTimeoutError:
+        pass
+    print("✓ Recognition is not started once the budget is spent")
+    
+    parent = Deadline()
+    child = parent.child()
+    child.cancel()
+    assert child.expired and child.timeout() == 0 and not parent.expired
+    assert Deadline(0).child().expired
+    print("✓ Child deadlines expire with their parent or when cancelled")
+    
+    try:
+        import numpy as np
+        from backend.enhanced_ocr import EnhancedCertificateOCR
+    except ImportError:
+        print("⚠️ OpenCV not installed, cascade check skipped")
+        return True
+    ocr = EnhancedCertificateOCR(variant_mode='cascade', cascade_depth=2)
+    built = []
+    build_variant = ocr._build_variant
+    ocr._build_variant = lambda name, gray, cache: built.append(name) or build_variant(name, gray, cache)
+    results = ocr._run_cascade(np.full((64, 64), 255, dtype=np.uint8), deadline=spent)
+    assert len(built) == 2 and all(result['timed_out'] for result in results.values())
+    print("✓ An expired cascade does not build the fallback sweep")
+    
+    return True
+
+def test_variant_win_tracking():
+    """Test that variant wins are only credited from full sweeps"""
+    print("\nTesting variant win tracking...")
+    try:
+        import numpy as np
+        from backend.enhanced_ocr import EnhancedCertificateOCR
+    except ImportError:
+        print("⚠️ OpenCV not installed, win tracking check skipped")
+        return True
+    
+    # 'original' is good enough to stop the cascade, 'bilateral_filter' reads best
+    confidences = {'original': 90.0, 'bilateral_filter': 95.0}
+    def recognise(method_name, processed_img, deadline):
+        confidence = confidences.get(method_name, 40.0)
+        return {'text': 'Anjali Kumari Ranchi University B.Sc 2022', 'confidence': confidence,
+                'word_count': 10, 'timed_out': False}
+    
+    saved = dict(EnhancedCertificateOCR._variant_wins), EnhancedCertificateOCR._cascade_runs
+    try:
+        EnhancedCertificateOCR._variant_wins = dict.fromkeys(EnhancedCertificateOCR.VARIANT_NAMES, 0)
+        EnhancedCertificateOCR._cascade_runs = 0
+        ocr = EnhancedCertificateOCR(variant_mode='cascade', cascade_sample_every=3,
+                                     use_text_regions=False, normalize_images=False)
+        ocr._ocr_variant = recognise
+        image = np.full((64, 64), 255, dtype=np.uint8)
+        
+        for _ in range(2):
+            result = ocr.extract_text_from_image(image)
+            assert result['best_method'] == 'original' and result['methods_tried'] == 1
+        assert not any(EnhancedCertificateOCR._variant_wins.values())
+        assert ocr.variant_order()[0] == 'original'
+        print("✓ A cascade that stopped early credits no wins")
+        
+        result = ocr.extract_text_from_image(image)
+        assert result['methods_tried'] == len(EnhancedCertificateOCR.VARIANT_NAMES)
+        assert EnhancedCertificateOCR._variant_wins['bilateral_filter'] == 1
+        assert ocr.variant_order()[0] == 'bilateral_filter'
+        print("✓ Sampled full sweeps credit the best variant and reorder the cascade")
+    finally:
+        EnhancedCertificateOCR._variant_wins, EnhancedCertificateOCR._cascade_runs = saved
+    
+    return True
+
+def test_name_index():
+    """Test fuzzy student-name candidate lookup and its sync with the certificates table"""
+    print("\nTesting name index...")
+    from flask import Flask
+    from sqlalchemy import text
+    from backend.models import db, Certificate
+    from backend.name_index import TrigramNameIndex, certificate_name_index
+    
+    index = TrigramNameIndex()
+    index.add(1, 'John Doe')
+    index.add(2, 'Jane Doe')
+    index.add(3, 'Mary Ann Smith')
+    index.add(4, 'John Doe')
+    
+    assert [certificate_id for certificate_id, _ in index.search('JOHN  DOE')][:2] == [1, 4]
+    assert index.search('Jhon Doe')[0][0] == 1
+    assert index.search('John Dae')[0][0] == 1
+    assert index.search('Mary Smith')[0][0] == 3
+    assert index.search('Mr Mary Ann Smith')[0][0] == 3
+    assert index.search('Zyx Qwv') == []
+    assert len(index.search('John Doe', limit=1)) == 1
+    print("✓ Misread, reordered and partial names find their certificates")
+    
+    index.add(1, 'Johnny Walker')
+    index.remove(4)
+    assert 4 not in [certificate_id for certificate_id, _ in index.search('John Doe')]
+    assert index.search('Johnny Walker')[0] == (1, 1.0)
+    print("✓ Renamed and removed certificates are re-indexed")
+    
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    try:
+        with app.app_context():
+            db.create_all()
+            db.session.add(Certificate(certificate_number='NI001', student_name='Priya Sharma',
+                                       course_name='B.Tech', graduation_year=2023, issue_date=date(2023, 6, 1),
+                                       institution_id=1))
+            db.session.commit()
+            assert certificate_name_index.find('Priya Sharma')
+            
+            added = Certificate(certificate_number='NI002', student_name='Rahul Verma',
+                                course_name='B.Sc', graduation_year=2022, issue_date=date(2022, 6, 1),
+                                institution_id=1)
+            db.session.add(added)
+            db.session.commit()
+            assert certificate_name_index.search('Rahul Varma')[0][0] == added.id
+            
+            added.is_valid = False
+            db.session.commit()
+            assert certificate_name_index.search('Rahul Verma') == []
+            print("✓ Committed certificate changes reach the index")
+            
+            # Plain SQL is what another process's writes look like: no session events here
+            def write(statement, **params):
+                db.session.execute(text(statement), params)
+                db.session.commit()
+            
+            def found(name):
+                certificate_name_index.refresh(force=True)
+                return [certificate_id for certificate_id, _ in certificate_name_index.search(name)]
+            
+            write("UPDATE certificates SET is_valid = 1, student_name = 'Rahul Mehta' WHERE id = :id", id=added.id)
+            write("UPDATE certificates SET student_name = 'Priya Patel' WHERE certificate_number = 'NI001'")
+            assert found('Rahul Mehta') == [added.id]
+            assert found('Priya Patel') and not found('Priya Sharma')
+            
+            write("DELETE FROM certificates WHERE id = :id", id=added.id)
+            assert found('Rahul Mehta') == []
+            print("✓ Renames, revalidations and deletes by other processes are applied from the change log")
+            
+            insert = ("INSERT INTO certificates (certificate_number, student_name, course_name, graduation_year, "
+                      "issue_date, institution_id, is_valid) VALUES (:number, :name, 'B.A', 2021, '2021-06-01', 1, 1)")
+            write(insert, number='NI003', name='Kavya Iyer')
+            write("DELETE FROM certificate_number_changes")
+            write(insert, number='NI004', name='Arjun Nair')
+            assert found('Kavya Iyer') and found('Arjun Nair')
+            print("✓ A change log pruned past the index's position triggers a rebuild")
+    finally:
+        certificate_name_index.clear()
+    
+    return True
+
+def test_certificate_fts():
+    """Test the FTS5 certificate search and the triggers that keep it current"""
+    print("\nTesting FTS5 certificate search...")
+    import tempfile
+    from flask import Flask
+    from backend import certificate_fts
+    from backend.models import db, Certificate, Institution
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'fts.db')}"
+        db.init_app(app)
+        
+        with app.app_context():
+            db.create_all()
+            if not certificate_fts.fts5_available():
+                print("⚠️ SQLite without FTS5, skipped")
+                return True
+            
+            ranchi = Institution(name='Ranchi University', code='RU')
+            delhi = Institution(name='Delhi University', code='DU')
+            db.session.add_all([ranchi, delhi])
+            db.session.flush()
+            for number, name, institution in [('F1', 'Anjali Kumari', delhi), ('F2', 'Anjali Kumari', ranchi),
+                                              ('F3', 'Rohit Kumar', ranchi)]:
+                db.session.add(Certificate(certificate_number=number, student_name=name, course_name='B.Sc',
+                                           graduation_year=2022, issue_date=date(2022, 6, 1),
+                                           institution_id=institution.id))
+            db.session.commit()
+            
+            # Existing rows are copied in when the table is created
+            assert certificate_fts.install()
+            found = certificate_fts.search({'student_name': 'Anjali Kumari', 'institution_name': 'Ranchi University'})
+            assert [c.certificate_number for c in found] == ['F2', 'F1']
+            print("✓ BM25 ranks the namesake from the same institution first")
+            
+            # Later writes reach it through the triggers
+            added = Certificate(certificate_number='F4', student_name='Priya Sharma', course_name='B.Sc',
+                                graduation_year=2022, issue_date=date(2022, 6, 1), institution_id=ranchi.id)
+            db.session.add(added)
+            db.session.commit()
+            assert [c.id for c in certificate_fts.search({'student_name': 'Priya'})] == [added.id]
+            added.student_name = 'Priya Verma'
+            db.session.commit()
+            assert [c.id for c in certificate_fts.search({'student_name': 'Verma'})] == [added.id]
+            added.is_valid = False
+            db.session.commit()
+            assert certificate_fts.search({'student_name': 'Priya Verma'}) == []
+            print("✓ Triggers keep the full-text table current")
+            
+            certificate_fts.drop()
+            db.session.remove()
+            db.engine.dispose()
+    
+    return True
+
+def test_candidate_scoring():
+    """Test that candidates are loaded with their institution and scored once"""
+    print("\nTesting candidate loading and scoring...")
+    import tempfile
+    from flask import Flask
+    from sqlalchemy import event
+    from backend.models import db, Certificate, Institution
+    from backend.name_index import certificate_name_index
+    from backend.match_scoring import score_candidates
+    from backend.validation import CertificateValidator
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'scoring.db')}"
+        db.init_app(app)
+        
+        with app.app_context():
+            db.create_all()
+            institutions = [Institution(name=f'University {i}', code=f'U{i}') for i in range(6)]
+            db.session.add_all(institutions)
+            db.session.flush()
+            for i, institution in enumerate(institutions):
+                db.session.add(Certificate(certificate_number=f'S{i}', student_name='Anjali Kumari',
+                                           course_name='B.Sc', graduation_year=2022,
+                                           issue_date=date(2022, 6, 1), institution_id=institution.id))
+            db.session.commit()
+            db.session.expunge_all()
+            certificate_name_index.rebuild()
+            
+            statements = []
+            def count(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+            event.listen(db.engine, 'before_cursor_execute', count)
+            
+            validator = CertificateValidator()
+            details = {'student_name': 'Anjali Kumari', 'institution_name': 'University 3',
+                       'graduation_year': '2022', 'course_name': 'B.Sc'}
+            candidates = score_candidates(validator._find_name_candidates(details), details)
+            event.remove(db.engine, 'before_cursor_execute', count)
+            
+            assert len(candidates) == 6
+            assert len(statements) == 1, statements
+            print("✓ Six namesakes and their institutions load in one query")
+            
+            best = max(candidates, key=lambda candidate: candidate['score'])
+            assert best['certificate'].certificate_number == 'S3'
+            assert best['breakdown'] == {'name': 1.0, 'institution': 1.0, 'year': 1.0, 'course': 1.0}
+            assert best['score'] == 1.0
+            print("✓ Each candidate is scored once with its per-field breakdown")
+            
+            certificate_name_index.clear()
+            db.session.remove()
+            db.engine.dispose()
+    
+    return True
+
+def test_match_score_formula():
+    """Test that a match score is the weighted average of the fields present"""
+    print("\nTesting match score formula...")
+    from backend.match_scoring import MATCH_WEIGHTS, score_candidate
+    from backend.models import Certificate, Institution
+    from backend.validation import CertificateValidator
+    
+    validator = CertificateValidator()
+    certificate = Certificate(certificate_number='S1', student_name='Anjali Kumari', course_name='B.Sc',
+                              graduation_year=2022, institution=Institution(name='Ranchi University'))
+    details = {'student_name': 'Anjali Kumari', 'institution_name': 'Ranchi University',
+               'graduation_year': '2022', 'course_name': 'B.Sc'}
+    
+    # The score used to be the weighted sum divided by the number of fields, which
+    # never exceeds 0.25: below the 0.6 match threshold, so nothing ever matched
+    def before(candidate):
+        breakdown = candidate['breakdown']
+        return sum(MATCH_WEIGHTS[field] * value for field, value in breakdown.items()) / len(breakdown)
+    
+    exact = score_candidate(certificate, details)
+    assert round(before(exact), 6) == 0.25 and validator._determine_status(before(exact)) == 'Invalid'
+    assert exact['score'] == 1.0 and validator._determine_status(exact['score']) == 'Valid'
+    best = validator._evaluate_matches([exact], details)
+    assert best['status'] == 'Valid' and best['issues'] == []
+    print("✓ An exact match scores 1.0 (Valid) instead of 0.25 (no match)")
+    
+    other = score_candidate(certificate, dict(details, institution_name='Delhi College'))
+    assert other['breakdown']['institution'] == 0.0
+    assert round(before(other), 6) == 0.175 and validator._determine_status(before(other)) == 'Invalid'
+    assert round(other['score'], 6) == 0.7 and validator._determine_status(other['score']) == 'Likely Valid'
+    
+    name_only = score_candidate(certificate, {'student_name': 'Anjali Kumari'})
+    assert name_only['score'] == 1.0 and round(before(name_only), 6) == 0.4
+    print("✓ Fields missing on either side do not count against the match")
+    
+    return True
+
+def test_batch_scoring():
+    """Test that the NumPy batch scorer matches the per-candidate scores exactly"""
+    print("\nTesting batch match scoring...")
+    from backend import match_scoring
+    from backend.models import Certificate, Institution
+    
+    institutions = [Institution(name='Ranchi University'), Institution(name='Delhi University'), None]
+    certificates = []
+    for i in range(60):
+        certificates.append(Certificate(
+            student_name=['Anjali Kumari', 'anjali  kumari', 'Rohit Kumar', '', None][i % 5],
+            course_name=['B.Sc', 'B.Sc Physics', None][i % 3],
+            graduation_year=[2022, 2019, None, 2030][i % 4],
+            institution=institutions[i % 3]
+        ))
+    details = {'student_name': 'Anjali Kumari', 'institution_name': 'Ranchi University',
+               'graduation_year': '2022', 'course_name': 'B.Sc'}
+    
+    expected = [match_scoring.score_candidate(certificate, details) for certificate in certificates]
+    assert match_scoring.score_candidates(certificates[:5], details) == expected[:5]
+    if match_scoring._numpy() is None:
+        print("⚠️ NumPy not installed, batch scorer skipped")
+        return True
+    
+    assert len(certificates) >= match_scoring.BATCH_MIN_CANDIDATES
+    assert match_scoring.score_candidates(certificates, details) == expected
+    assert match_scoring.score_candidates(certificates, details, min_score=0.1) == [
+        candidate for candidate in expected if candidate['score'] > 0.1
+    ]
+    print("✓ Batch scores, breakdowns and year differences equal the per-candidate ones")
+    
+    # NumPy is imported on the first batch, not when the app loads
+    import subprocess
+    probe = "import sys, app_fixed; print('numpy' in sys.modules)"
+    output = subprocess.run([sys.executable, '-c', probe], capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert output.stdout.strip().splitlines()[-1] == 'False', output.stderr
+    print("✓ Loading the app does not import NumPy")
+    
+    return True
+
+def test_certificate_number_lookup():
+    """Test the certificate-number Bloom filter and LRU and their invalidation"""
+    print("\nTesting certificate number lookup...")
+    import tempfile
+    from flask import Flask
+    from sqlalchemy import event
+    from backend.models import db, Certificate, Institution
+    from backend.validation import BloomFilter, CertificateNumberLookup, certificate_number_lookup
+    
+    bloom = BloomFilter(1000)
+    for i in range(1000):
+        bloom.add(f'N{i}')
+    assert all(f'N{i}' in bloom for i in range(1000))
+    assert sum(f'X{i}' in bloom for i in range(10000)) < 300
+    print("✓ Bloom filter has no false negatives and few false positives")
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(workdir, 'numbers.db')}"
+        db.init_app(app)
+        
+        with app.app_context():
+            db.create_all()
+            ranchi = Institution(name='Ranchi University', code='RU')
+            db.session.add(ranchi)
+            db.session.flush()
+            for number, is_valid in [('L1', True), ('L2', False)]:
+                db.session.add(Certificate(certificate_number=number, student_name='Anjali Kumari', course_name='B.Sc',
+                                           graduation_year=2022, issue_date=date(2022, 6, 1),
+                                           institution_id=ranchi.id, is_valid=is_valid))
+            db.session.commit()
+            certificate_number_lookup.rebuild()
+            
+            statements = []
+            def count(conn, cursor, statement, parameters, context, executemany):
+                statements.append(statement)
+            event.listen(db.engine, 'before_cursor_execute', count)
+            assert certificate_number_lookup.find('FORGED-123') == []
+            assert certificate_number_lookup.find('L2') == []
+            assert statements == []
+            print("✓ Unknown and invalid numbers are turned away without a query")
+            
+            found = certificate_number_lookup.find('L1')
+            assert len(statements) == 1
+            again = certificate_number_lookup.find('L1')
+            assert len(statements) == 1
+            assert again[0] in db.session and again[0].institution.name == 'Ranchi University'
+            event.remove(db.engine, 'before_cursor_execute', count)
+            print("✓ Found certificates are served from the LRU, attached to the session")
+            
+            # Writes through the ORM apply on commit
+            again[0].is_valid = False
+            added = Certificate(certificate_number='L3', student_name='Rohit Kumar', course_name='B.Sc',
+                                graduation_year=2022, issue_date=date(2022, 6, 1), institution_id=ranchi.id)
+            db.session.add(added)
+            db.session.commit()
+            assert certificate_number_lookup.find('L1') == []
+            assert [c.id for c in certificate_number_lookup.find('L3')] == [added.id]
+            
+            # Other processes' writes are read from the trigger log after refresh_interval
+            with db.engine.begin() as connection:
+                connection.exec_driver_sql("UPDATE certificates SET is_valid = 1 WHERE certificate_number IN ('L1', 'L2')")
+                connection.exec_driver_sql("UPDATE institutions SET name = 'Ranchi University (RU)'")
+            db.session.remove()
+            refresh_interval, certificate_number_lookup.refresh_interval = certificate_number_lookup.refresh_interval, 0
+            try:
+                assert [c.certificate_number for c in certificate_number_lookup.find('L2')] == ['L2']
+                assert certificate_number_lookup.find('L3')[0].institution.name == 'Ranchi University (RU)'
+            finally:
+                certificate_number_lookup.refresh_interval = refresh_interval
+            print("✓ Inserts, invalidations and outside writes reach the filter and the LRU")
+            
+            # A filter built by another thread while the query runs is not used half-way
+            certificate_number_lookup.clear()
+            lookup = CertificateNumberLookup()
+            lookup.ensure_built = lambda: None
+            def rebuild_meanwhile(conn, cursor, statement, parameters, context, executemany):
+                if lookup._bloom is None:
+                    lookup.rebuild()
+            event.listen(db.engine, 'before_cursor_execute', rebuild_meanwhile)
+            try:
+                assert [c.certificate_number for c in lookup.find('L2')] == ['L2']
+            finally:
+                event.remove(db.engine, 'before_cursor_execute', rebuild_meanwhile)
+            assert lookup._bloom is not None and not lookup._recent
+            print("✓ A lookup racing a rebuild queries the database and caches nothing")
+            
+            certificate_number_lookup.clear()
+            db.session.remove()
+            db.engine.dispose()
+        
+    return True
+
 def test_app_creation():
     """Test Flask app creation and basic routes"""
     print("\nTesting Flask app creation...")
@@ -167,6 +1173,27 @@ def main():
         test_imports,
         test_database_models,
         test_validation_logic,
+        test_ocr_cache,
+        test_verify_cache_tiers,
+        test_pdf_page_pipeline,
+        test_field_extraction,
+        test_engine_registry,
+        test_lazy_ocr_loading,
+        test_verify_batch,
+        test_job_queue,
+        test_async_verification,
+        test_upload_store,
+        test_upload_hashing,
+        test_upload_gc,
+        test_admission_control,
+        test_deadline,
+        test_variant_win_tracking,
+        test_name_index,
+        test_certificate_fts,
+        test_candidate_scoring,
+        test_match_score_formula,
+        test_batch_scoring,
+        test_certificate_number_lookup,
         test_app_creation
     ]
     